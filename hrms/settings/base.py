@@ -88,6 +88,14 @@ TEMPLATES = [
 CELERY_BROKER_URL = config("CELERY_BROKER_URL")
 CELERY_RESULT_BACKEND = config("CELERY_RESULT_BACKEND")
 
+# Per-process cache for development and tests; production uses Redis
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "hrms",
+    }
+}
+
 
 
 WSGI_APPLICATION = "hrms.wsgi.application"
@@ -385,8 +385,24 @@ ATTENDANCE_TIMEZONE = 'Asia/Kolkata'  # Adjust to your timezone
 # Pagination settings for attendance views
 ATTENDANCE_PAGINATE_BY = 25
 
+# Biometric device polling (GetTransactionsLog)
+DEVICE_FETCH_MAX_WORKERS = 8
+DEVICE_FETCH_CONNECT_TIMEOUT = 5  # seconds
+DEVICE_FETCH_READ_TIMEOUT = 60  # seconds
+DEVICE_FETCH_RETRIES = 2
+DEVICE_FETCH_BACKOFF = 1.0  # seconds, doubled after each failed attempt
+PUNCH_CACHE_TIMEOUT = 20 * 60  # today's punches per device; refreshed every 5 minutes by Celery beat
+
 # Cache settings for attendance (optional - for performance)
 ATTENDANCE_CACHE_TIMEOUT = 300  # 5 minutes
+ATTENDANCE_CACHE_CHUNK_SIZE = 200  # employees recomputed per upsert
+ATTENDANCE_CACHE_SHARD_SIZE = 500  # employees per shard; parallel runs queue one Celery task per shard
+ATTENDANCE_CACHE_RECOMPUTE_DELAY = 10  # seconds to batch changes before recomputing stale cells
+REPORT_EXPORT_CHUNK_SIZE = 100  # employees generated per batch while streaming report exports
+REPORT_CACHE_TIMEOUT = 60 * 60 * 24  # rendered reports/exports, keyed by attendance revision
+REFERENCE_CACHE_TIMEOUT = 60 * 60  # leave types, status colours, settings; versioned per model
+REPORT_EXPORT_CACHE_MAX_SIZE = 5 * 1024 * 1024  # larger exports are streamed but not cached
+LEAVE_BALANCE_CACHE_TIMEOUT = 60 * 60 * 24  # dashboard balance widget, dropped on leave changes
 
 # Audit trail settings
 KEEP_ATTENDANCE_AUDIT_LOGS = True
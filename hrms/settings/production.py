@@ -15,6 +15,21 @@ DATABASES = {
         "PORT": config("DB_PORT", default="5432"),
     }
 }
+# Shared by every web and Celery worker: report caches, attendance revision,
+# reference data and task de-duplication flags must be seen by all of them
+CACHES = {
+    "default": {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": config("REDIS_CACHE_URL", default="redis://127.0.0.1:6379/1"),
+        "KEY_PREFIX": "hrms",
+        "OPTIONS": {
+            "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            "IGNORE_EXCEPTIONS": True,
+        },
+    }
+}
+DJANGO_REDIS_LOG_IGNORED_EXCEPTIONS = True
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -48,6 +63,14 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'hrms_app.tasks.populate_attendance_log',
         'schedule': crontab(minute=59, hour=22),
     },
+    'poll_attendance_devices': {
+        'task': 'hrms_app.tasks.poll_attendance_devices',
+        'schedule': crontab(minute='*/15', hour='7-21'),  # Every 15 minutes during the working day
+    },
+    'refresh_device_punch_cache': {
+        'task': 'hrms_app.tasks.refresh_device_punch_cache',
+        'schedule': crontab(minute='*/5', hour='6-22'),  # Today's punches for the dashboard
+    },
     'send_reminder_email': {
     'task': 'hrms_app.tasks.send_reminder_email',
     'schedule': crontab(minute=0, hour=10, day_of_month='18-25'),
@@ -57,12 +80,12 @@ CELERY_BEAT_SCHEDULE = {
         'schedule': crontab(minute=0, hour=3),    
         },
         'calculate-daily-attendance-cache': {
-        'task': 'myapp.tasks.calculate_daily_attendance_cache',
+        'task': 'hrms_app.tasks.calculate_daily_attendance_cache',
         'schedule': crontab(hour=2, minute=0),  # Run at 2:00 AM daily
         'args': (1,)  # Process yesterday's data
     },
     'recalculate-monthly-attendance': {
-        'task': 'myapp.tasks.recalculate_monthly_attendance_cache',
+        'task': 'hrms_app.tasks.recalculate_monthly_attendance_cache',
         'schedule': crontab(hour=3, minute=0, day_of_month=1),
     },
     "refresh-short-leave-monthly": {
@@ -22,6 +22,8 @@ from .filters import LeaveAllocationFilter,LeaveUnitFilter
 from datetime import timedelta
 from django.utils.timezone import localtime
 from hrms_app.hrms.managers import AttendanceStatusHandler
+from .services.leave_balance_summary import invalidate_leave_balance_summary
+from .services.reference_cache import bump_reference_version, get_attendance_setting, get_status_color
 from django.contrib import admin, messages
 from django.utils.html import format_html
 from django.urls import path
@@ -270,10 +272,14 @@ class LeaveTypeAdmin(admin.ModelAdmin):
 
     def enable_consecutive_restriction(self, request, queryset):
         updated = queryset.update(consecutive_restriction=True)
+        # update() skips post_save, so invalidate the cached leave types here
+        bump_reference_version(LeaveType)
         self.message_user(request, _(f"{updated} leave types updated."))
 
     def disable_consecutive_restriction(self, request, queryset):
         updated = queryset.update(consecutive_restriction=False)
+        # update() skips post_save, so invalidate the cached leave types here
+        bump_reference_version(LeaveType)
         self.message_user(request, _(f"{updated} leave types updated."))
 
     # =====================
@@ -398,12 +404,10 @@ class AttendanceLogAdmin(admin.ModelAdmin):
     def get_static_data(self):
         """Fetch static data used in attendance calculations."""
         return {
-            "half_day_color": AttendanceStatusColor.objects.get(
-                status=settings.HALF_DAY
-            ),
-            "present_color": AttendanceStatusColor.objects.get(status=settings.PRESENT),
-            "absent_color": AttendanceStatusColor.objects.get(status=settings.ABSENT),
-            "asettings": AttendanceSetting.objects.first(),
+            "half_day_color": get_status_color(settings.HALF_DAY),
+            "present_color": get_status_color(settings.PRESENT),
+            "absent_color": get_status_color(settings.ABSENT),
+            "asettings": get_attendance_setting(),
         }
 
     def get_user_shift(self, user):
@@ -521,14 +525,20 @@ from django.contrib import messages
 
 @admin.action(description="Mark selected leave balances as ACTIVE")
 def make_active(modeladmin, request, queryset):
+    # Read before the update, which may take rows out of a filtered queryset
+    user_ids = list(queryset.values_list("user_id", flat=True))
     queryset.update(
         is_active=True,
     )
+    # update() sends no post_save, so drop the cached widget summaries here
+    invalidate_leave_balance_summary(user_ids)
 @admin.action(description="Mark selected leave balances as INACTIVE")
 def make_inactive(modeladmin, request, queryset):
+    user_ids = list(queryset.values_list("user_id", flat=True))
     queryset.update(
         is_active=False,
     )
+    invalidate_leave_balance_summary(user_ids)
 
 
 @admin.register(AttendanceLogHistory)
@@ -847,6 +857,7 @@ class DeviceInformationAdmin(admin.ModelAdmin):
         "serial_number",
         "username",
         "password",
+        "last_punch_at",
     ]
     fields = (
         "device_location",
@@ -856,7 +867,9 @@ class DeviceInformationAdmin(admin.ModelAdmin):
         "serial_number",
         "username",
         "password",
+        "last_punch_at",
     )
+    readonly_fields = ("last_punch_at",)
     search_fields = ["serial_number", "username"]
 
 
@@ -23,6 +23,7 @@ from ..models import LeaveType, LeaveApplication
 # from ..manager.leave_policy import LeavePolicyManager
 from ..utility.leave_utils import LeavePolicyManager
 from ..services.leave_service import LeaveDomainService
+from ..services.reference_cache import get_leave_type
 
 
 class LeaveApplicationForm(forms.ModelForm):
@@ -97,7 +98,7 @@ class LeaveApplicationForm(forms.ModelForm):
         leave_type_id  = kwargs.pop("leave_type", None)
         super().__init__(*args, **kwargs)
 
-        leave_type_obj = LeaveType.objects.filter(id=leave_type_id).first()
+        leave_type_obj = get_leave_type(leave_type_id)
 
         # ── FIX 1: Resolve balance using period-aware LeaveDomainService ──
         # Previously used LeaveStatsManager directly with hardcoded year,
@@ -0,0 +1,177 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from hrms_app.hrms.utils import build_transactions_log_body, parse_transactions_log
+
+logger = logging.getLogger(__name__)
+
+STATUS_OK = "ok"
+STATUS_TIMEOUT = "timeout"
+STATUS_REQUEST_ERROR = "request_error"
+STATUS_PARSE_ERROR = "parse_error"
+
+CHUNK_SIZE = 64 * 1024
+
+
+class DeviceFetchEngine:
+    """
+    Polls biometric devices for GetTransactionsLog in parallel.
+
+    Responses are streamed and parsed incrementally, so a large backfill
+    payload is never buffered in full.
+
+    Each worker thread keeps its own keep-alive ``requests.Session`` so
+    repeated calls to the same device web service reuse connections. Every
+    request has a connect/read timeout, transient failures (timeouts,
+    connection errors, 5xx) are retried with exponential backoff, and each
+    device yields a result dict:
+
+        {
+            "device": <serial number>,
+            "status": "ok" | "timeout" | "request_error" | "parse_error",
+            "data": {emp_code: {date: [punches]}} or None,
+            "elapsed": <seconds>,
+            "bytes": <payload size>,
+            "attempts": <requests made>,
+            "error": <message or None>,
+        }
+
+    Use as a context manager so pooled sessions are closed afterwards.
+    """
+
+    def __init__(self, max_workers=None, timeout=None, retries=None, backoff=None):
+        self.max_workers = max_workers or settings.DEVICE_FETCH_MAX_WORKERS
+        self.timeout = timeout or (
+            settings.DEVICE_FETCH_CONNECT_TIMEOUT,
+            settings.DEVICE_FETCH_READ_TIMEOUT,
+        )
+        self.retries = settings.DEVICE_FETCH_RETRIES if retries is None else retries
+        self.backoff = settings.DEVICE_FETCH_BACKOFF if backoff is None else backoff
+        self._local = threading.local()
+        self._sessions = []
+        self._sessions_lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        with self._sessions_lock:
+            for session in self._sessions:
+                session.close()
+            self._sessions = []
+
+    def _get_session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update({"Content-Type": "text/xml"})
+            self._local.session = session
+            with self._sessions_lock:
+                self._sessions.append(session)
+        return session
+
+    def _download(self, device_instance, body, result):
+        """
+        POST the envelope and stream-parse the response, retrying transient
+        failures (timeouts, connection errors, 5xx) with exponential backoff.
+        """
+        session = self._get_session()
+        while True:
+            result["attempts"] += 1
+            result["bytes"] = 0
+            try:
+                with session.post(
+                    device_instance.api_link,
+                    params={"op": "GetTransactionsLog"},
+                    data=body,
+                    timeout=self.timeout,
+                    stream=True,
+                ) as response:
+                    response.raise_for_status()
+                    return parse_transactions_log(
+                        self._counted_chunks(response, result),
+                        device_instance.include_seconds,
+                    )
+            except requests.exceptions.RequestException as e:
+                status_code = getattr(e.response, "status_code", None)
+                transient = isinstance(
+                    e, (requests.exceptions.Timeout, requests.exceptions.ConnectionError)
+                ) or (status_code is not None and status_code >= 500)
+                if not transient or result["attempts"] > self.retries:
+                    raise
+                delay = self.backoff * (2 ** (result["attempts"] - 1))
+                logger.warning(
+                    f"Device {device_instance.serial_number} attempt {result['attempts']} failed: {e}. "
+                    f"Retrying in {delay:.1f}s"
+                )
+                time.sleep(delay)
+
+    @staticmethod
+    def _counted_chunks(response, result):
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            result["bytes"] += len(chunk)
+            yield chunk
+
+    def fetch(self, device_instance, from_date, to_date):
+        """Fetch and stream-parse one device's transaction log."""
+        result = {
+            "device": device_instance.serial_number,
+            "status": STATUS_OK,
+            "data": None,
+            "elapsed": 0.0,
+            "bytes": 0,
+            "attempts": 0,
+            "error": None,
+        }
+        body = build_transactions_log_body(device_instance, from_date, to_date)
+        started = time.monotonic()
+        try:
+            result["data"] = self._download(device_instance, body, result)
+        except requests.exceptions.Timeout as e:
+            result.update(status=STATUS_TIMEOUT, error=str(e))
+        except requests.exceptions.ConnectionError as e:
+            # Read timeouts raised while streaming the body surface as ConnectionError
+            status = STATUS_TIMEOUT if "timed out" in str(e) else STATUS_REQUEST_ERROR
+            result.update(status=status, error=str(e))
+        except requests.exceptions.RequestException as e:
+            result.update(status=STATUS_REQUEST_ERROR, error=str(e))
+        except Exception as e:
+            result.update(status=STATUS_PARSE_ERROR, error=str(e))
+        result["elapsed"] = time.monotonic() - started
+
+        if result["status"] != STATUS_OK:
+            logger.error(f"Device {result['device']} fetch {result['status']}: {result['error']}")
+        return result
+
+    def fetch_all(self, devices, from_date=None, to_date=None, windows=None):
+        """
+        Fetch every device concurrently.
+
+        ``devices`` is a mapping of caller-chosen keys to DeviceInformation
+        instances; the return value maps the same keys to result dicts.
+        ``windows`` optionally maps a key to its own ``(from_date, to_date)``,
+        overriding the shared range for that device.
+        Total time is bounded by the slowest device, not the sum of all.
+        """
+        if not devices:
+            return {}
+        windows = windows or {}
+        workers = min(self.max_workers, len(devices))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="device-fetch") as pool:
+            futures = {
+                key: pool.submit(self.fetch, device, *windows.get(key, (from_date, to_date)))
+                for key, device in devices.items()
+            }
+            return {key: future.result() for key, future in futures.items()}
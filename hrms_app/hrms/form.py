@@ -10,6 +10,7 @@ from django.contrib.sites.shortcuts import get_current_site
 from django.core.exceptions import ValidationError
 from django.core.mail import EmailMultiAlternatives
 from hrms_app.utility.leave_utils import LeavePolicyManager, LeaveStatsManager
+from hrms_app.services.reference_cache import get_app_setting, get_leave_type
 from django.template import loader
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_encode
@@ -756,7 +757,7 @@ class TourForm(forms.ModelForm):
         non_working_days = get_non_working_days(start=end_date, end=current_date)
         gap = (current_date - end_date).days + 1
         gap -= non_working_days
-        app_setting = AppSetting.objects.filter(key="TOUR_LIMIT").first()
+        app_setting = get_app_setting("TOUR_LIMIT")
         if not app_setting:
             return
         if gap <= int(app_setting.value):
@@ -932,7 +933,7 @@ class LeaveApplicationForm(forms.ModelForm):
         self.user = kwargs.pop("user", None)
         leave_type = kwargs.pop("leave_type", None)
         super(LeaveApplicationForm, self).__init__(*args, **kwargs)
-        leave_type_obj = LeaveType.objects.filter(id=leave_type).first()
+        leave_type_obj = get_leave_type(leave_type)
         stats = LeaveStatsManager(self.user, leave_type_obj)
         self.fields["balanceLeave"].initial = stats.get_remaining_balance(
             year=timezone.now().year
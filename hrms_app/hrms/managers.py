@@ -2,8 +2,30 @@ from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 from datetime import datetime, timedelta
 from django.utils.timezone import is_naive, make_aware
+import numpy as np
 import pytz
 
+MICROSECONDS_PER_DAY = 24 * 3600 * 10**6
+KOLKATA_OFFSET = timedelta(hours=5, minutes=30)
+
+
+def _time_to_microseconds(value):
+    return ((value.hour * 60 + value.minute) * 60 + value.second) * 10**6 + value.microsecond
+
+
+def _wall_clock_microseconds(value):
+    """Microseconds since 0001-01-01 on the datetime's own wall clock."""
+    return value.toordinal() * MICROSECONDS_PER_DAY + _time_to_microseconds(value)
+
+
+def _duration_microseconds(value):
+    return (value.days * 86400 + value.seconds) * 10**6 + value.microseconds
+
+
+def _microseconds_to_time(value):
+    """Same as ``(datetime.min + timedelta(microseconds=value)).time()``."""
+    return (datetime.min + timedelta(microseconds=int(value) % MICROSECONDS_PER_DAY)).time()
+
 class AttendanceStatusHandler:
     def __init__(self, user_shift, full_day_hours, half_day_color, present_color, absent_color):
         self.user_shift = user_shift
@@ -214,3 +236,228 @@ class AttendanceStatusHandler:
             "H",
         )
 
+
+class AttendanceStatusBatchClassifier:
+    """
+    Column-wise counterpart of ``AttendanceStatusHandler`` for a batch of
+    employee-days, such as every punch day of a month backfill.
+
+    Times of day, durations and expected logouts are compared as NumPy
+    microsecond arrays, so the branch each row takes is decided in a few
+    vectorised passes instead of per-row ``.time()`` chains and
+    ``strptime`` calls. ``classify`` returns the same 9-tuples as
+    ``AttendanceStatusHandler.determine_attendance_status``.
+
+    Rows the column-wise path cannot reproduce exactly (regularization
+    windows that would be negative, or datetimes aware in a zone other than
+    Asia/Kolkata) are passed to the scalar handler.
+    """
+
+    MIS_PUNCHING = 0
+    SHORT_DAY = 1
+    FULL_DAY = 2
+    LATE_COMING = 3
+    EARLY_GOING = 4
+    HALF_DAY = 5
+    UNCLASSIFIED = 6
+
+    def __init__(self, full_day_hours, half_day_color, present_color, absent_color):
+        self.full_day_hours = full_day_hours
+        self.half_day_color = half_day_color
+        self.present_color = present_color
+        self.absent_color = absent_color
+        self.full_day = timedelta(hours=full_day_hours)
+        self.kolkata_tz = pytz.timezone("Asia/Kolkata")
+        self._handlers = {}
+        # The tzinfo pytz's localize() attaches to present-day dates
+        self.kolkata_tzinfo = self.kolkata_tz.localize(datetime(2000, 1, 1)).tzinfo
+        # Read the status labels once rather than per row
+        self.absent = settings.ABSENT
+        self.half_day = settings.HALF_DAY
+        self.pending = settings.PENDING
+        self.mis_punching = settings.MIS_PUNCHING
+        self.early_going = settings.EARLY_GOING
+        self.late_coming = settings.LATE_COMING
+        self.full_day_status = (
+            settings.PRESENT, present_color.color_hex, None, False, None, None, None, None, "P"
+        )
+        # Mirrors the scalar handler's fallback tuple, field order included
+        self.unclassified_status = (
+            settings.ABSENT, absent_color.color_hex, None, False, None, None, None, "A", None
+        )
+
+    def classify(self, login_date_times, logout_date_times, shifts, total_durations=None):
+        """
+        Classify every row, where row ``i`` is one employee-day made of
+        ``login_date_times[i]``, ``logout_date_times[i]`` and the
+        ShiftTiming ``shifts[i]``. ``total_durations`` defaults to
+        logout minus login. The expected logout is login plus
+        ``full_day_hours``, as in ``pop_att`` and the approval views.
+        """
+        if not login_date_times:
+            return []
+        if total_durations is None:
+            total_durations = [
+                logout - login for login, logout in zip(login_date_times, logout_date_times)
+            ]
+
+        login_us = np.array([_wall_clock_microseconds(value) for value in login_date_times], dtype=np.int64)
+        logout_us = np.array([_wall_clock_microseconds(value) for value in logout_date_times], dtype=np.int64)
+        duration_us = np.array([_duration_microseconds(value) for value in total_durations], dtype=np.int64)
+        grace_start_us, grace_end_us, end_us = self._shift_columns(shifts)
+
+        expected_us = login_us + _duration_microseconds(self.full_day)
+        login_tod = login_us % MICROSECONDS_PER_DAY
+        logout_tod = logout_us % MICROSECONDS_PER_DAY
+        expected_tod = expected_us % MICROSECONDS_PER_DAY
+        total_hours = duration_us / 1e6 / 3600
+
+        codes = np.select(
+            [
+                total_hours == 0,
+                (total_hours > 0) & (total_hours < 4),
+                (login_tod <= grace_start_us)
+                & (total_hours >= self.full_day_hours)
+                & (logout_tod >= expected_tod),
+                (login_tod > grace_start_us)
+                & ((logout_tod <= grace_end_us) | (logout_tod >= end_us)),
+                (login_tod <= grace_start_us) & (logout_tod < expected_tod),
+                (login_tod >= grace_start_us) & (logout_tod < end_us),
+            ],
+            [
+                self.MIS_PUNCHING,
+                self.SHORT_DAY,
+                self.FULL_DAY,
+                self.LATE_COMING,
+                self.EARLY_GOING,
+                self.HALF_DAY,
+            ],
+            default=self.UNCLASSIFIED,
+        )
+        # Regularization windows: grace start -> login for late coming,
+        # logout -> shift end (or expected logout if later) for early going
+        shift_end_first = expected_tod < end_us
+        early_to_us = np.where(shift_end_first, logout_us - logout_tod + end_us, expected_us)
+        reg_us = np.where(
+            codes == self.LATE_COMING, login_tod - grace_start_us, early_to_us - logout_us
+        )
+
+        return [
+            self._build_status(
+                int(codes[i]),
+                login_date_times[i],
+                logout_date_times[i],
+                total_durations[i],
+                shifts[i],
+                bool(shift_end_first[i]),
+                int(reg_us[i]),
+            )
+            for i in range(len(codes))
+        ]
+
+    @staticmethod
+    def _shift_columns(shifts):
+        cache = {}
+        columns = []
+        for shift in shifts:
+            row = cache.get(id(shift))
+            if row is None:
+                row = cache[id(shift)] = (
+                    _time_to_microseconds(shift.grace_start_time),
+                    _time_to_microseconds(shift.grace_end_time),
+                    _time_to_microseconds(shift.end_time),
+                )
+            columns.append(row)
+        return np.array(columns, dtype=np.int64).reshape(-1, 3).T
+
+    def handler_for(self, shift):
+        """Scalar handler for ``shift``, built once and shared by every row on it."""
+        handler = self._handlers.get(id(shift))
+        if handler is None:
+            handler = self._handlers[id(shift)] = AttendanceStatusHandler(
+                shift,
+                self.full_day_hours,
+                self.half_day_color,
+                self.present_color,
+                self.absent_color,
+            )
+        return handler
+
+    def _make_aware(self, value):
+        return value.replace(tzinfo=self.kolkata_tzinfo) if value.tzinfo is None else value
+
+    @staticmethod
+    def _is_local(value):
+        return value.tzinfo is None or value.utcoffset() == KOLKATA_OFFSET
+
+    def _build_status(self, code, login, logout, total_duration, shift, shift_end_first, reg_us):
+        expected = login + self.full_day
+        if code in (self.LATE_COMING, self.EARLY_GOING) and (
+            reg_us < 0 or not (self._is_local(login) and self._is_local(logout))
+        ):
+            return self.handler_for(shift).determine_attendance_status(
+                login, logout, total_duration, expected.time(), expected
+            )
+
+        if code == self.MIS_PUNCHING:
+            return (
+                self.absent,
+                self.absent_color.color_hex,
+                self.mis_punching,
+                True,
+                login,
+                expected,
+                None,
+                self.pending,
+                "A",
+            )
+        if code == self.SHORT_DAY:
+            return (
+                self.absent,
+                self.absent_color.color_hex,
+                self.early_going,
+                True,
+                logout,
+                expected,
+                None,
+                self.pending,
+                "H",
+            )
+        if code == self.FULL_DAY:
+            return self.full_day_status
+        if code == self.LATE_COMING:
+            rto_date = self._make_aware(login)
+            rfrom_date = datetime.combine(
+                rto_date.date(), shift.grace_start_time, tzinfo=self.kolkata_tzinfo
+            )
+            return (
+                self.half_day,
+                self.half_day_color.color_hex,
+                self.late_coming,
+                True,
+                rfrom_date,
+                rto_date,
+                _microseconds_to_time(reg_us),
+                self.pending,
+                "H",
+            )
+        if code == self.EARLY_GOING:
+            rfrom_date = self._make_aware(logout)
+            if shift_end_first:
+                rto_date = datetime.combine(rfrom_date.date(), shift.end_time, tzinfo=self.kolkata_tzinfo)
+            else:
+                rto_date = self._make_aware(expected)
+            return (
+                self.half_day,
+                self.half_day_color.color_hex,
+                self.early_going,
+                True,
+                rfrom_date,
+                rto_date,
+                _microseconds_to_time(reg_us),
+                self.pending,
+                "H",
+            )
+        if code == self.HALF_DAY:
+            return (self.half_day, self.half_day_color.color_hex, None, False, None, expected, None, None, "H")
+        return self.unclassified_status
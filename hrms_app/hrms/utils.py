@@ -1,4 +1,5 @@
-import xml.etree.ElementTree as ET
+import xml.sax
+import xml.sax.handler
 from collections import defaultdict
 from datetime import datetime, timedelta
 from django.core.mail import send_mail
@@ -8,7 +9,6 @@ from hrms_app.models import Holiday, LockStatus
 from rest_framework.response import Response
 from django.core.exceptions import PermissionDenied
 import logging
-import requests
 
 
 # Set up logging configuration
@@ -46,13 +46,14 @@ def send_email(subject, template_name, context, from_email, recipient_list):
 
 
 
-def call_soap_api(device_instance, from_date, to_date):
-    url = device_instance.api_link
-    headers = {"Content-Type": "text/xml"}
-    params = {"op": "GetTransactionsLog"}
+def build_transactions_log_body(device_instance, from_date, to_date):
+    """
+    Build the SOAP envelope for a GetTransactionsLog request.
+    Falls back to the device's configured window when no dates are given.
+    """
     attendance_start_date = device_instance.from_date if from_date is None else from_date
     attendance_to_date = device_instance.to_date if to_date is None else to_date
-    body = f"""<?xml version="1.0" encoding="utf-8"?>
+    return f"""<?xml version="1.0" encoding="utf-8"?>
     <soap:Envelope xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xmlns:xsd="http://www.w3.org/2001/XMLSchema" xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">
         <soap:Body>
             <GetTransactionsLog xmlns="http://tempuri.org/">
@@ -67,55 +68,130 @@ def call_soap_api(device_instance, from_date, to_date):
     </soap:Envelope>
     """
 
-    try:
-        response = requests.post(url, params=params, data=body, headers=headers)
-        response.raise_for_status()  # This will raise an exception if the response status code is not 200
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Request failed: {e}")
-        return None
 
-    if response.status_code == 200:
+class _StrDataListHandler(xml.sax.handler.ContentHandler):
+    """
+    SAX handler that emits complete lines of the ``strDataList`` element as
+    its text arrives, so the transaction list is never held in memory whole.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+        self.found = False
+        self._inside = False
+        self._partial = ""
+
+    def startElementNS(self, name, qname, attrs):
+        if name[1] == "strDataList":
+            self.found = True
+            self._inside = True
+
+    def endElementNS(self, name, qname):
+        if name[1] == "strDataList":
+            self._inside = False
+            if self._partial:
+                self.lines.append(self._partial)
+                self._partial = ""
+
+    def characters(self, content):
+        if not self._inside:
+            return
+        chunk = self._partial + content
+        *complete, self._partial = chunk.split("\n")
+        self.lines.extend(complete)
+
+
+def iter_transaction_lines(chunks):
+    """
+    Incrementally parse a GetTransactionsLog envelope fed as byte ``chunks``
+    and yield the raw lines of ``strDataList`` as soon as they are complete.
+    """
+    handler = _StrDataListHandler()
+    parser = xml.sax.make_parser()
+    parser.setFeature(xml.sax.handler.feature_namespaces, True)
+    parser.setFeature(xml.sax.handler.feature_external_ges, False)
+    parser.setContentHandler(handler)
+    for chunk in chunks:
+        parser.feed(chunk)
+        if handler.lines:
+            yield from handler.lines
+            handler.lines = []
+    parser.close()
+    yield from handler.lines
+    if not handler.found:
+        raise ValueError("strDataList element not found in GetTransactionsLog response")
+
+
+def parse_punch_time(log_time_str, include_seconds):
+    """
+    Parse a device timestamp (``YYYY-MM-DD HH:MM[:SS]``) by fixed offsets,
+    falling back to ``strptime`` for anything not in the expected shape.
+    Seconds are dropped unless the device is configured to include them.
+    """
+    s = log_time_str
+    if not include_seconds:
+        # Remove the seconds part if present
+        s = s.rsplit(":", 1)[0]
+        if len(s) == 16 and s[4] == "-" and s[7] == "-" and s[10] == " " and s[13] == ":":
+            try:
+                return datetime(int(s[0:4]), int(s[5:7]), int(s[8:10]), int(s[11:13]), int(s[14:16]))
+            except ValueError:
+                pass
+        return datetime.strptime(s, "%Y-%m-%d %H:%M")
+
+    if len(s) == 19 and s[4] == "-" and s[7] == "-" and s[10] == " " and s[13] == ":" and s[16] == ":":
         try:
-            root = ET.fromstring(response.content)
-
-            # Extracting data from the response
-            log_result = root.find(".//{http://tempuri.org/}GetTransactionsLogResult").text
-            str_data_list = root.find(".//{http://tempuri.org/}strDataList").text
-
-            # Dictionary to store grouped data
-            grouped_data = defaultdict(lambda: defaultdict(list))
-
-            # Splitting and processing each line of str_data_list
-            for line in str_data_list.strip().split("\n"):
-                parts = line.split()
-                if len(parts) >= 2:
-                    emp_code = parts[0]
-                    log_time_str = " ".join(parts[1:])  # Join the remaining parts as log_time_str
-
-                    try:
-                        if not device_instance.include_seconds:
-                            # Remove the seconds part if present
-                            log_time_str = log_time_str.rsplit(":", 1)[0]
-                            time_format = "%Y-%m-%d %H:%M"
-                        else:
-                            time_format = "%Y-%m-%d %H:%M:%S"
-
-                        log_time = datetime.strptime(log_time_str, time_format)
-
-                        date_key = log_time.date()
-                        grouped_data[emp_code][date_key].append(log_time)
-                    except ValueError as e:
-                        logging.warning(f"Issue parsing line: {line}. Error: {e}")
-                else:
-                    logging.warning(f"Issue parsing line: {line}. Insufficient data.")
-
-            return grouped_data
-        except Exception as e:
-            logging.error(f"Error processing XML response: {e}")
-            return None
-    else:
-        logging.error(f"Error: Response returned with status code {response.status_code}")
-        return None
+            return datetime(
+                int(s[0:4]), int(s[5:7]), int(s[8:10]), int(s[11:13]), int(s[14:16]), int(s[17:19])
+            )
+        except ValueError:
+            pass
+    return datetime.strptime(s, "%Y-%m-%d %H:%M:%S")
+
+
+def iter_punches(lines, include_seconds):
+    """Yield ``(emp_code, punch_datetime)`` pairs from raw transaction lines."""
+    for line in lines:
+        parts = line.split()
+        if not parts:
+            continue
+        if len(parts) >= 2:
+            emp_code = parts[0]
+            log_time_str = " ".join(parts[1:])  # Join the remaining parts as log_time_str
+            try:
+                yield emp_code, parse_punch_time(log_time_str, include_seconds)
+            except ValueError as e:
+                logging.warning(f"Issue parsing line: {line}. Error: {e}")
+        else:
+            logging.warning(f"Issue parsing line: {line}. Insufficient data.")
+
+
+def group_punches(punches):
+    """Group ``(emp_code, punch)`` pairs into {emp_code: {date: [punches]}}."""
+    grouped_data = defaultdict(lambda: defaultdict(list))
+    for emp_code, log_time in punches:
+        grouped_data[emp_code][log_time.date()].append(log_time)
+    return grouped_data
+
+
+def parse_transactions_log(content, include_seconds):
+    """
+    Parse a GetTransactionsLog response into {emp_code: {date: [punch datetimes]}}.
+
+    ``content`` may be the whole payload as bytes or an iterable of byte
+    chunks (e.g. ``response.iter_content()``); either way the payload is
+    parsed as a stream.
+    """
+    chunks = [content] if isinstance(content, (bytes, str)) else content
+    return group_punches(iter_punches(iter_transaction_lines(chunks), include_seconds))
+
+
+def call_soap_api(device_instance, from_date, to_date):
+    from hrms_app.hrms.device_fetch import DeviceFetchEngine
+
+    with DeviceFetchEngine(max_workers=1) as engine:
+        return engine.fetch(device_instance, from_date, to_date)["data"]
 
 
 def is_weekend(date):
@@ -123,14 +199,19 @@ def is_weekend(date):
 
 
 def is_holiday(date):
-    return Holiday.objects.filter(start_date=date).exists()
+    from hrms_app.services.holiday_calendar import is_holiday as starts_holiday
+
+    return starts_holiday(date)
 
 
 def get_non_working_days(start, end):
+    from hrms_app.services.holiday_calendar import get_holiday_start_days
+
+    holiday_days = get_holiday_start_days(start, end)
     non_working_days = 0
     for n in range((end - start).days + 1):
         day = start + timedelta(n)
-        if is_weekend(day) or is_holiday(day):
+        if is_weekend(day) or (day.date() if isinstance(day, datetime) else day) in holiday_days:
             non_working_days += 1
     return non_working_days
 
@@ -0,0 +1,99 @@
+# management/commands/benchmark_attendance_grid.py
+import random
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+from django.utils.timezone import make_aware
+
+from ...utility.attendance_mapper import AttendanceMapper
+
+
+class _OfflineAttendanceMapper(AttendanceMapper):
+    """AttendanceMapper without its two database lookups, for synthetic input."""
+
+    def _get_office_closures(self):
+        return set()
+
+    def _get_stl_cache(self, attendance_logs):
+        return {}
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark AttendanceMapper on synthetic data: time to map and convert to the "
+        "legacy dict shape, and memory of the grid versus that dict"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=1000, help='Number of employees (default: 1000)')
+        parser.add_argument('--days', type=int, default=365, help='Number of days (default: 365)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the synthetic data')
+
+    def build_inputs(self, employee_ids, days, seed):
+        rnd = random.Random(seed)
+        leave_types = [
+            SimpleNamespace(leave_type_short_code=code, half_day_short_code=f"{code}H", color_hex="#a2a2a2")
+            for code in ("CL", "SL", "EL", "LWP")
+        ]
+        attendance_logs, leave_logs = [], []
+        for employee_id in employee_ids:
+            employee = SimpleNamespace(id=employee_id)
+            for day in days:
+                if day.weekday() == 6:
+                    continue
+                roll = rnd.random()
+                if roll < 0.05:
+                    leave_logs.append(SimpleNamespace(
+                        leave_application=SimpleNamespace(appliedBy=employee, leave_type=rnd.choice(leave_types)),
+                        date=day,
+                        is_full_day=rnd.random() < 0.8,
+                    ))
+                elif roll < 0.95:
+                    attendance_logs.append(SimpleNamespace(
+                        applied_by=employee,
+                        start_date=make_aware(datetime.combine(day, datetime.min.time()).replace(hour=9)),
+                        att_status_short_code=rnd.choice(("P", "P", "P", "H", "A")),
+                        color_hex="#06B900",
+                    ))
+        holidays = [
+            SimpleNamespace(
+                start_date=day, end_date=day, short_code="FL", color_hex="#FFD700",
+                applicable_user_ids=frozenset(),
+            )
+            for day in rnd.sample(days, min(10, len(days)))
+        ]
+        return attendance_logs, leave_logs, holidays
+
+    def handle(self, *args, **options):
+        start_date = date(2024, 1, 1)
+        end_date = start_date + timedelta(days=options['days'] - 1)
+        days = [start_date + timedelta(days=i) for i in range(options['days'])]
+        employee_ids = list(range(1, options['employees'] + 1))
+        attendance_logs, leave_logs, holidays = self.build_inputs(employee_ids, days, options['seed'])
+        self.stdout.write(
+            f"{len(employee_ids)} employees x {len(days)} days: {len(attendance_logs)} attendance logs, "
+            f"{len(leave_logs)} leave days, {len(holidays)} holidays"
+        )
+
+        started = time.perf_counter()
+        mapper = _OfflineAttendanceMapper(start_date, end_date)
+        grid = mapper.map_attendance_grid(attendance_logs, leave_logs, holidays, [])
+        mapped = time.perf_counter()
+        legacy = grid.to_legacy()
+        converted = time.perf_counter()
+        cells = sum(len(cells) for cells in legacy.values())
+        del legacy
+
+        # Measured in a second conversion so tracing does not skew the timings
+        tracemalloc.start()
+        legacy = grid.to_legacy()
+        legacy_size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        self.stdout.write(f"map_attendance_grid: {mapped - started:.2f}s")
+        self.stdout.write(f"to_legacy:           {converted - mapped:.2f}s")
+        self.stdout.write(f"grid matrices:       {grid.nbytes / 2**20:.2f} MiB")
+        self.stdout.write(f"legacy dict:         {legacy_size / 2**20:.2f} MiB for {cells} cells")
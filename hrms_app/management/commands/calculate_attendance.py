@@ -35,6 +35,11 @@ class Command(BaseCommand):
             action='store_true',
             help='Force update existing cache entries'
         )
+        parser.add_argument(
+            '--parallel',
+            action='store_true',
+            help='Queue one Celery task per employee shard instead of processing here'
+        )
     
     def handle(self, *args, **options):
         try:
@@ -58,9 +63,18 @@ class Command(BaseCommand):
                 start_date=start_date,
                 end_date=end_date,
                 employee_ids=employee_ids,
-                force_update=options['force_update']
+                force_update=options['force_update'],
+                parallel=options['parallel']
             )
             
+            if result.get('queued'):
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"Queued {result['shards']} shards; progress is in attendance cache log {result['log_id']}"
+                    )
+                )
+                return
+            
             self.stdout.write(
                 self.style.SUCCESS(
                     f"Successfully processed attendance cache: "
@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 from hrms_app.models import CustomUser, LeaveType, LeaveBalanceOpenings
 from django.db import transaction
+from hrms_app.services.leave_balance_summary import invalidate_leave_balance_summary
 
 class Command(BaseCommand):
     help = 'Initialize leave balances for all users and all leave types for a particular year'
@@ -28,4 +29,6 @@ class Command(BaseCommand):
 
         with transaction.atomic():
             LeaveBalanceOpenings.objects.bulk_create(leave_balances)
+            # bulk_create skips the model signals
+            invalidate_leave_balance_summary(balance.user_id for balance in leave_balances)
         self.stdout.write(self.style.SUCCESS(f'Successfully initialized leave balances for the year {year}'))
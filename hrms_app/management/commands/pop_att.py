@@ -1,12 +1,14 @@
 from django.utils.text import slugify
-from hrms_app.models import AttendanceLog,AttendanceStatusColor,AttendanceSetting,EmployeeShift
-from hrms_app.hrms.managers import AttendanceStatusHandler
-from hrms_app.hrms.utils import call_soap_api
+from hrms_app.models import AttendanceLog,AttendanceStatusColor,AttendanceSetting,EmployeeShift,LockStatus
+from hrms_app.hrms.managers import AttendanceStatusBatchClassifier
+from hrms_app.hrms.device_fetch import DeviceFetchEngine
+from hrms_app.services import AttendanceCacheService, AttendanceRevision
 from hrms_app.models import (
     DeviceInformation,
 )
 from datetime import datetime, timedelta
-from django.utils.timezone import make_aware
+from django.db import transaction
+from django.utils.timezone import make_aware, localtime
 from django.core.management.base import BaseCommand
 import pytz
 from django.contrib.auth import get_user_model
@@ -27,76 +29,232 @@ class Command(BaseCommand):
         parser.add_argument(
             "--to-date", type=str, help="End date for the attendance log"
         )
-    def fetch_static_data(self):
-        half_day_color = AttendanceStatusColor.objects.get(status=settings.HALF_DAY)
-        present_color = AttendanceStatusColor.objects.get(status=settings.PRESENT)
-        absent_color = AttendanceStatusColor.objects.get(status=settings.ABSENT)
-        asettings = AttendanceSetting.objects.first()
-        return half_day_color, present_color, absent_color, asettings
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Only request punches after each device's last synced punch",
+        )
 
     def get_users(self, username):
         if username is not None and username != 'None':  # Check for None and 'None' string explicitly
             return User.objects.filter(username=username).select_related("personal_detail")
         return User.objects.all().select_related("personal_detail")
-    
-    def get_user_shift(self, user):
-        emp_shift = (
-            EmployeeShift.objects.filter(employee=user)
-            .select_related("shift_timing")
-            .first()
+
+    def get_fetch_windows(self, devices, to_date):
+        """
+        Per-device ``(from_date, to_date)`` for an incremental poll: from the
+        device's last synced punch (or the start of today if it has none) up
+        to ``to_date`` or now.
+        """
+        now = localtime()
+        to_date = to_date or now.strftime("%Y-%m-%d %H:%M:%S")
+        start_of_day = now.strftime("%Y-%m-%d 00:01:00")
+        windows = {}
+        for location_id, device in devices.items():
+            from_date = (
+                localtime(device.last_punch_at).strftime("%Y-%m-%d %H:%M:%S")
+                if device.last_punch_at
+                else start_of_day
+            )
+            windows[location_id] = (from_date, to_date)
+        return windows
+
+    def fetch_device_punches(self, devices, from_date, to_date, windows=None):
+        """
+        Download every device exactly once, in parallel, and index its
+        punches as ``location_id -> emp_code -> {date: [punches]}``,
+        reporting the fetch outcome and cost of each device.
+
+        Also returns ``location_id -> latest punch`` for the devices that
+        were fetched successfully, used to advance their watermarks.
+        """
+        with DeviceFetchEngine() as engine:
+            results = engine.fetch_all(devices, from_date, to_date, windows=windows)
+
+        punch_index = {}
+        latest_punches = {}
+        for location_id, result in results.items():
+            self.stdout.write(
+                f"Device {result['device']}: {result['status']}, {result['bytes']} bytes "
+                f"in {result['elapsed']:.2f}s ({result['attempts']} attempt(s))"
+            )
+            grouped_data = result["data"] or {}
+            punch_index[location_id] = grouped_data
+            punches = [
+                max(log_times)
+                for emp_logs in grouped_data.values()
+                for log_times in emp_logs.values()
+                if log_times
+            ]
+            if punches:
+                latest_punches[location_id] = max(punches)
+        return punch_index, latest_punches
+
+    def get_existing_logs(self, users, punch_index):
+        """
+        Load the AttendanceLog rows already stored for the users and days
+        present in this run, keyed by ``(user_id, local date)``.
+        """
+        dates = {
+            date
+            for device_punches in punch_index.values()
+            for emp_logs in device_punches.values()
+            for date in emp_logs
+        }
+        if not dates:
+            return {}
+        range_start = make_aware(datetime.combine(min(dates), datetime.min.time()))
+        range_end = make_aware(datetime.combine(max(dates) + timedelta(days=1), datetime.min.time()))
+        existing_logs = {}
+        for log in AttendanceLog.objects.filter(
+            applied_by_id__in=[user.id for user in users],
+            start_date__gte=range_start,
+            start_date__lt=range_end,
+        ):
+            existing_logs.setdefault((log.applied_by_id, localtime(log.start_date).date()), log)
+        return existing_logs
+
+    def update_watermarks(self, devices, latest_punches):
+        for location_id, latest_punch in latest_punches.items():
+            device = devices[location_id]
+            latest_punch = make_aware(latest_punch)
+            if device.last_punch_at is None or latest_punch > device.last_punch_at:
+                device.last_punch_at = latest_punch
+                device.save(update_fields=["last_punch_at"])
+
+    def get_locked_ranges(self):
+        """(from_date, to_date) of every locked period, as check_lock_status reads them."""
+        return list(
+            LockStatus.objects.filter(
+                is_locked="locked", from_date__isnull=False, to_date__isnull=False
+            ).values_list("from_date", "to_date")
         )
-        return emp_shift.shift_timing if emp_shift else None
+
+    def upsert_logs(self, attendance_logs, existing_logs):
+        """
+        Write the computed logs in one set-based upsert keyed on the slug.
+        New logs get a slug built from the employee's name, id and date, and
+        merged logs keep their stored slug, so each key is one employee's day.
+
+        Rows already stored for the (employee, local date) are only written
+        when a recomputed field differs. The upsert bypasses the pre_save
+        lock check, so stored rows inside a locked period are left as they
+        are. Returns the inserted, updated, unchanged and locked counts.
+        """
+        stored = {log.pk: log for log in existing_logs.values()}
+        compared_fields = [
+            field for field in AttendanceLogCreator.MERGED_FIELDS if field != "updated_at"
+        ]
+        locked_ranges = self.get_locked_ranges() if stored else []
+        to_write = []
+        inserted = updated = unchanged = locked = 0
+        for log in attendance_logs:
+            if log.pk is None:
+                inserted += 1
+            elif any(
+                getattr(log, field) != getattr(stored[log.pk], field) for field in compared_fields
+            ):
+                log_date = localtime(stored[log.pk].start_date).date()
+                if any(from_date <= log_date <= to_date for from_date, to_date in locked_ranges):
+                    locked += 1
+                    continue
+                updated += 1
+                # Let the slug conflict resolve to the stored row
+                log.pk = None
+            else:
+                unchanged += 1
+                continue
+            to_write.append(log)
+
+        AttendanceLog.objects.bulk_create(
+            to_write,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=["slug"],
+            update_fields=AttendanceLogCreator.MERGED_FIELDS,
+        )
+        # bulk_create skips the model signals, so invalidate the cache here
+        if to_write:
+            AttendanceRevision.bump_on_commit()
+        AttendanceCacheService.mark_stale_on_commit(self.get_changed_ranges(to_write))
+        return inserted, updated, unchanged, locked
+
+    def get_changed_ranges(self, attendance_logs):
+        """Per-employee (ids, first date, last date) covered by the written logs."""
+        dates = {}
+        for log in attendance_logs:
+            log_date = localtime(log.start_date).date()
+            first, last = dates.get(log.applied_by_id, (log_date, log_date))
+            dates[log.applied_by_id] = (min(first, log_date), max(last, log_date))
+        return [([employee_id], first, last) for employee_id, (first, last) in dates.items()]
 
     def handle(self, *args, **options):
         self.stdout.write("Starting to populate AttendanceLog data...")
-        half_day_color, present_color, absent_color, asettings = self.fetch_static_data()
-        users = self.get_users(options["username"])
+        users = list(self.get_users(options["username"]))
         from_date, to_date = options["from_date"], options["to_date"]
-        attendance_logs_to_create = []
         kolkata_tz = pytz.timezone("Asia/Kolkata")
         if users:
+            lookups = IngestionLookups(users)
+            devices = lookups.devices
+            windows = self.get_fetch_windows(devices, to_date) if options["incremental"] else None
+            punch_index, latest_punches = self.fetch_device_punches(
+                devices, from_date, to_date, windows=windows
+            )
+            existing_logs = self.get_existing_logs(users, punch_index)
+            log_creator = AttendanceLogCreator(kolkata_tz)
+            punch_days = []
+
             for user in users:
-                office_location = user.device_location
-                device_instance = DeviceInformation.objects.filter(device_location=office_location).first()
-                if device_instance is None:
+                device_punches = punch_index.get(user.device_location_id)
+                if device_punches is None:
                     continue
-                result = call_soap_api(device_instance=device_instance,from_date=from_date,to_date=to_date)
-                # Prepare to bulk insert attendance logs
 
                 emp_code = user.personal_detail.employee_code
-                if emp_code not in result:
+                if emp_code not in device_punches:
                     continue
-                user_shift = self.get_user_shift(user)
+                user_shift = lookups.shifts.get(user.id)
                 if not user_shift:
                     self.stdout.write(f"No shift found for user: {user.get_full_name()}")
                     continue
 
-                # Initialize the handler and creator objects
-                status_handler = AttendanceStatusHandler(
-                    user_shift,
-                    asettings.full_day_hours,
-                    half_day_color,
-                    present_color,
-                    absent_color,
-                )
-                log_creator = AttendanceLogCreator(kolkata_tz)
-
-                # Process the logs for the user
-                attendance_logs_to_create.extend(
+                # Collect the user's days; statuses are computed for the whole run at once
+                punch_days.extend(
                     self.process_user_attendance(
-                        user, asettings, result[emp_code], log_creator, status_handler
+                        user, user_shift, device_punches[emp_code], existing_logs
                     )
                 )
 
-            # Bulk create the attendance logs
-            AttendanceLog.objects.bulk_create(attendance_logs_to_create)
-            self.stdout.write("Completed populating AttendanceLog data.")
+            attendance_logs = self.build_logs(punch_days, lookups.classifier, log_creator)
+            with transaction.atomic():
+                inserted, updated, unchanged, locked = self.upsert_logs(attendance_logs, existing_logs)
+                # A watermark covers every employee on the device, so a
+                # single-user run must not advance it.
+                if not options["username"]:
+                    self.update_watermarks(devices, latest_punches)
+            self.stdout.write(
+                f"Completed populating AttendanceLog data: {inserted} inserted, "
+                f"{updated} updated, {unchanged} unchanged, {locked} skipped in locked periods."
+            )
         else:
             self.stdout.write("No Users found.")
-    def process_user_attendance(self, user, asettings, logs, log_creator, status_handler):
-        attendance_logs = []
-        full_day_hours = asettings.full_day_hours
+
+    def process_user_attendance(self, user, user_shift, logs, existing_logs=None):
+        """
+        Turn one user's punches into per-day login/logout pairs, merged with
+        the log already stored for the day where it may still be changed.
+        """
+        punch_days = []
+        existing_logs = existing_logs or {}
         for date, log_times in logs.items():
+            existing_log = existing_logs.get((user.id, date))
+            if existing_log is not None:
+                if not AttendanceLogCreator.can_merge(existing_log):
+                    continue
+                # Merge with the punches already stored for the day
+                log_times = list(log_times) + [
+                    localtime(existing_log.start_date).replace(tzinfo=None),
+                    localtime(existing_log.end_date).replace(tzinfo=None),
+                ]
             sorted_log_times = sorted(log_times)
             login_date_time, logout_date_time = sorted_log_times[0], sorted_log_times[-1]
             total_duration = logout_date_time - login_date_time
@@ -104,29 +262,116 @@ class Command(BaseCommand):
                 total_duration = timedelta(0)
             elif total_duration >= timedelta(days=1):
                 total_duration = timedelta(days=1) - timedelta(microseconds=1)
-            duration = (datetime.min + total_duration).time()
-            user_expected_logout_date_time = login_date_time + timedelta(hours=full_day_hours)
-            user_expected_logout_time = user_expected_logout_date_time.time()
-
-            status_data = status_handler.determine_attendance_status(
-                login_date_time,
-                logout_date_time,
-                total_duration,
-                user_expected_logout_time,
-                user_expected_logout_date_time,
+            punch_days.append(
+                {
+                    "user": user,
+                    "shift": user_shift,
+                    "date": date,
+                    "login": login_date_time,
+                    "logout": logout_date_time,
+                    "total_duration": total_duration,
+                    "existing_log": existing_log,
+                }
             )
+        return punch_days
 
-            attendance_logs.append(
-                log_creator.create_logs(
-                    user, date, login_date_time, logout_date_time, duration, status_data
-                )
+    def build_logs(self, punch_days, classifier, log_creator):
+        """Classify every collected day in one batch and build its AttendanceLog."""
+        statuses = classifier.classify(
+            [day["login"] for day in punch_days],
+            [day["logout"] for day in punch_days],
+            [day["shift"] for day in punch_days],
+            [day["total_duration"] for day in punch_days],
+        )
+        attendance_logs = []
+        for day, status_data in zip(punch_days, statuses):
+            duration = (datetime.min + day["total_duration"]).time()
+            attendance_log = log_creator.create_logs(
+                day["user"], day["date"], day["login"], day["logout"], duration, status_data
             )
+            existing_log = day["existing_log"]
+            if existing_log is not None:
+                attendance_log.pk = existing_log.pk
+                attendance_log.slug = existing_log.slug
+            attendance_logs.append(attendance_log)
         return attendance_logs
 
+class IngestionLookups:
+    """
+    Reference data for one pop_att run, loaded up front in a fixed number
+    of queries so that nothing is looked up per user: status colors,
+    the attendance setting, each user's shift timing and the device for
+    each location. ``classifier`` is the status classifier shared by the
+    whole run.
+    """
+
+    def __init__(self, users):
+        colors = {}
+        for color in AttendanceStatusColor.objects.filter(
+            status__in=[settings.HALF_DAY, settings.PRESENT, settings.ABSENT]
+        ).order_by("pk"):
+            colors.setdefault(color.status, color)
+        for status in (settings.HALF_DAY, settings.PRESENT, settings.ABSENT):
+            if status not in colors:
+                raise AttendanceStatusColor.DoesNotExist(f"No AttendanceStatusColor for {status}")
+        self.half_day_color = colors[settings.HALF_DAY]
+        self.present_color = colors[settings.PRESENT]
+        self.absent_color = colors[settings.ABSENT]
+        self.asettings = AttendanceSetting.objects.first()
+
+        # First shift per employee, as EmployeeShift.objects.filter(employee=user).first()
+        self.shifts = {}
+        for emp_shift in EmployeeShift.objects.filter(
+            employee_id__in=[user.id for user in users]
+        ).select_related("shift_timing").order_by("pk"):
+            self.shifts.setdefault(emp_shift.employee_id, emp_shift.shift_timing)
+
+        # First device per location
+        location_ids = {user.device_location_id for user in users if user.device_location_id}
+        self.devices = {}
+        for device in DeviceInformation.objects.filter(
+            device_location_id__in=location_ids
+        ).order_by("pk"):
+            self.devices.setdefault(device.device_location_id, device)
+
+        self.classifier = AttendanceStatusBatchClassifier(
+            self.asettings.full_day_hours,
+            self.half_day_color,
+            self.present_color,
+            self.absent_color,
+        )
+
+
 class AttendanceLogCreator:
+    # Fields recomputed from punches when an existing day's log is merged
+    MERGED_FIELDS = [
+        "title",
+        "start_date",
+        "end_date",
+        "duration",
+        "is_regularisation",
+        "reg_status",
+        "att_status",
+        "att_status_short_code",
+        "from_date",
+        "to_date",
+        "reg_duration",
+        "status",
+        "color_hex",
+        "updated_at",
+    ]
+
     def __init__(self, kolkata_tz):
         self.kolkata_tz = kolkata_tz
 
+    @staticmethod
+    def can_merge(log):
+        """
+        Logs a user has submitted for regularization, or that were
+        regularized, keep their state and are not rewritten by a poll.
+        """
+        return not (log.is_submitted or log.regularized or log.regularized_backend)
+
     def create_logs(self, user, date, login_date_time, logout_date_time, duration, status_data):
         att_status, color_hex_code, reg_status, is_regularization, rfrom_date, rto_date, reg_duration, status, att_status_short_code = status_data
         
@@ -157,6 +402,7 @@ class AttendanceLogCreator:
             to_date=rto_date_aware,
             reg_duration=str(reg_duration),
             status=status,
-            slug=slugify(f"{user.get_full_name()}-{date}"),
+            # The id keeps same-named employees apart; names alone collide
+            slug=slugify(f"{user.get_full_name()}-{user.id}-{date}"),
             color_hex=color_hex_code,
         )
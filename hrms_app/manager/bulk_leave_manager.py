@@ -1,8 +1,19 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.sites.models import Site
+from django.utils.text import slugify
+from django.utils.timezone import is_naive, localtime, make_aware
 from django.utils.translation import gettext_lazy as _
 from datetime import datetime, timedelta
-from django.db import models
-from ..models import LeaveApplication, LeaveDay
+from django.db import models, transaction
+import random
+import string
+from ..hrms.utils import check_lock_status
+from ..models import LeaveApplication, LeaveDay, LeaveLog, Notification
+from ..services import AttendanceCacheService, AttendanceRevision
+from ..services.leave_balance_summary import invalidate_leave_balance_summary
+from ..tasks import send_bulk_leave_application_notifications
 
 User = get_user_model()
 
@@ -58,69 +69,196 @@ class BulkLeaveApplicationManager(models.Manager):
             'skipped': []
         }
         
-        # Create leave applications for each employee
+        employees = list(employees.select_related("reports_to"))
+        start_date, end_date = self._make_aware(start_date), self._make_aware(end_date)
+
+        # Skip employees who already have leave in this date range
+        overlapping_ids = self._get_overlapping_employee_ids(employees, start_date, end_date)
+        to_create = []
         for employee in employees:
-            try:
-                # Check if employee already has leave in this date range
-                if self._has_overlapping_leave(employee, start_date, end_date):
-                    results['skipped'].append({
-                        'employee_id': employee.id,
-                        'employee_name': employee.get_full_name(),
-                        'reason': 'Already has leave in this date range'
-                    })
-                    continue
-                
-                # # Calculate balance leave
-                # balance_leave = self._calculate_balance_leave(
-                #     employee, 
-                #     leave_type, 
-                #     used_leave
-                # )
-
-                # # Check if employee has sufficient leave balance
-                # if balance_leave < 0:
-                #     results['skipped'].append({
-                #         'employee_id': employee.id,
-                #         'employee_name': employee.get_full_name(),
-                #         'reason': 'Insufficient leave balance'
-                #     })
-                #     continue
-                
-                # Create the leave application
-                leave_app = LeaveApplication.objects.create(
-                    appliedBy=employee,
-                    leave_type=leave_type,
-                    startDate=start_date,
-                    endDate=end_date,
-                    usedLeave=0,
-                    balanceLeave=0,
-                    reason=reason,
-                    startDayChoice=start_day_choice,
-                    endDayChoice=end_day_choice,
-                    status='approved',
-                )
-                
-                # Create corresponding leave days
-                self._create_leave_days(leave_app, start_date, end_date)
-                
-                results['success_count'] += 1
-                results['applications'].append({
-                    'application_no': leave_app.applicationNo,
+            if employee.id in overlapping_ids:
+                results['skipped'].append({
                     'employee_id': employee.id,
                     'employee_name': employee.get_full_name(),
-                    'status': leave_app.status
+                    'reason': 'Already has leave in this date range'
                 })
-                
-            except Exception as e:
+            else:
+                to_create.append(employee)
+
+        try:
+            with transaction.atomic():
+                applications = self._bulk_create_applications(
+                    to_create,
+                    leave_type,
+                    start_date,
+                    end_date,
+                    reason,
+                    start_day_choice,
+                    end_day_choice,
+                )
+        except Exception as e:
+            # One transaction: a failure leaves none of the applications behind
+            for employee in to_create:
                 results['failed_count'] += 1
                 results['errors'].append({
                     'employee_id': employee.id,
                     'employee_name': employee.get_full_name(),
                     'error': str(e)
                 })
-        
+            return results
+
+        for leave_app in applications:
+            results['success_count'] += 1
+            results['applications'].append({
+                'application_no': leave_app.applicationNo,
+                'employee_id': leave_app.appliedBy.id,
+                'employee_name': leave_app.appliedBy.get_full_name(),
+                'status': leave_app.status
+            })
+
         return results
-    
+
+    def _bulk_create_applications(
+        self,
+        employees,
+        leave_type,
+        start_date,
+        end_date,
+        reason,
+        start_day_choice,
+        end_day_choice,
+    ):
+        """
+        Insert one approved application per employee with bulk_create, and do
+        by hand what the LeaveApplication save path and signals would do for
+        each row: lock check, unique application no and slug, leave days,
+        leave log, notification and cache invalidation. Must run inside a
+        transaction.
+        """
+        if not employees:
+            return []
+
+        # The lock only depends on the start date, which every row shares
+        check_lock_status(instance_date=start_date)
+
+        application_nos = self._generate_application_nos(leave_type, len(employees))
+        slugs = self._generate_slugs(employees, start_date, start_day_choice)
+        applications = LeaveApplication.objects.bulk_create([
+            LeaveApplication(
+                appliedBy=employee,
+                leave_type=leave_type,
+                applicationNo=application_no,
+                slug=slug,
+                startDate=start_date,
+                endDate=end_date,
+                usedLeave=0,
+                balanceLeave=0,
+                reason=reason,
+                startDayChoice=start_day_choice,
+                endDayChoice=end_day_choice,
+                status=settings.APPROVED,
+            )
+            for employee, application_no, slug in zip(employees, application_nos, slugs)
+        ])
+
+        leave_days = self._build_leave_days(
+            leave_type, start_date, end_date, start_day_choice, end_day_choice
+        )
+        LeaveDay.objects.bulk_create([
+            LeaveDay(leave_application=leave_app, date=day, is_full_day=is_full_day)
+            for leave_app in applications
+            for day, is_full_day in leave_days
+        ])
+        LeaveLog.objects.bulk_create([
+            LeaveLog(
+                leave_application=leave_app,
+                action_by=leave_app.appliedBy,
+                action_by_name=f"{leave_app.appliedBy.first_name} {leave_app.appliedBy.last_name}",
+                action_by_email=leave_app.appliedBy.email,
+                action='Created',
+            )
+            for leave_app in applications
+        ])
+        content_type = ContentType.objects.get_for_model(LeaveApplication)
+        Notification.objects.bulk_create([
+            Notification(
+                sender=leave_app.appliedBy,
+                receiver=leave_app.appliedBy.reports_to,
+                message=f"Leave application '{leave_app.applicationNo}' has been {leave_app.status}.",
+                notification_type=settings.LEAVE_STATUS,
+                related_object_id=leave_app.id,
+                related_content_type=content_type,
+                target_url=f"/leave/{leave_app.slug}/",
+                go_route_mobile='leave-detail',
+            )
+            for leave_app in applications
+        ])
+
+        # bulk_create skips the model signals, so invalidate the caches here
+        employee_ids = [employee.id for employee in employees]
+        cache_range = (employee_ids, localtime(start_date).date(), localtime(end_date).date())
+        AttendanceRevision.bump_on_commit()
+        AttendanceCacheService.mark_stale_on_commit([cache_range])
+        invalidate_leave_balance_summary(employee_ids)
+
+        # One task for every email, sent once the applications are committed
+        application_ids = [leave_app.id for leave_app in applications]
+        domain = Site.objects.get_current().domain
+        transaction.on_commit(
+            lambda: send_bulk_leave_application_notifications.delay(application_ids, 'http', domain)
+        )
+        return applications
+
+    @staticmethod
+    def _make_aware(value):
+        return make_aware(value) if is_naive(value) else value
+
+    @staticmethod
+    def _generate_application_nos(leave_type, count):
+        """
+        ``count`` application numbers in the format of
+        LeaveApplication.generate_unique_application_no, checked against the
+        table in one query per round instead of one per number.
+        """
+        application_nos = set()
+        while len(application_nos) < count:
+            candidates = set()
+            while len(candidates) < count - len(application_nos):
+                random_str = "".join(random.choices(string.ascii_uppercase + string.digits, k=4))
+                application_no = f"Leave/{leave_type.leave_type}/{random_str}"
+                if application_no not in application_nos:
+                    candidates.add(application_no)
+            taken = set(
+                LeaveApplication.objects.filter(applicationNo__in=candidates)
+                .values_list("applicationNo", flat=True)
+            )
+            application_nos |= candidates - taken
+        return list(application_nos)
+
+    @staticmethod
+    def _generate_slugs(employees, start_date, start_day_choice):
+        """
+        Slugs as LeaveApplication.generate_unique_slug would assign them one
+        save at a time, resolved against a single query of the slugs taken.
+        """
+        suffix = slugify(f"{start_date.strftime('%Y-%m-%d')}-{start_day_choice}")
+        taken = set(
+            LeaveApplication.objects.filter(slug__contains=suffix).values_list("slug", flat=True)
+        )
+        slugs = []
+        for employee in employees:
+            base_slug = slugify(
+                f"{employee.get_full_name()}-{start_date.strftime('%Y-%m-%d')}-{start_day_choice}"
+            )
+            unique_slug = base_slug
+            num = 1
+            while unique_slug in taken:
+                unique_slug = f"{base_slug}-{num}"
+                num += 1
+            taken.add(unique_slug)
+            slugs.append(unique_slug)
+        return slugs
+
     @staticmethod
     def _calculate_leave_days(start_date, end_date, start_choice, end_choice):
         """Calculate number of leave days based on date range and half/full day choices."""
@@ -144,16 +282,17 @@ class BulkLeaveApplicationManager(models.Manager):
             return float(full_days)
     
     @staticmethod
-    def _has_overlapping_leave(employee, start_date, end_date):
-        """Check if employee already has approved/pending leave in date range."""
-        overlapping = LeaveApplication.objects.filter(
-            appliedBy=employee,
-            startDate__lte=end_date,
-            endDate__gte=start_date,
-            status__in=['approved', 'pending']
-        ).exists()
-        return overlapping
-    
+    def _get_overlapping_employee_ids(employees, start_date, end_date):
+        """IDs of employees who already have approved/pending leave in date range."""
+        return set(
+            LeaveApplication.objects.filter(
+                appliedBy__in=employees,
+                startDate__lte=end_date,
+                endDate__gte=start_date,
+                status__in=[settings.APPROVED, settings.PENDING]
+            ).values_list("appliedBy_id", flat=True)
+        )
+
     @staticmethod
     def _calculate_balance_leave(employee, leave_type, used_leave):
         """Calculate remaining leave balance for employee."""
@@ -178,16 +317,25 @@ class BulkLeaveApplicationManager(models.Manager):
             return allocation - used_leave
     
     @staticmethod
-    def _create_leave_days(leave_application, start_date, end_date):
-        """Create individual LeaveDay records for the leave period."""
-        current_date = start_date.date()
-        end_date_only = end_date.date()
-        
-        while current_date <= end_date_only:
-            LeaveDay.objects.get_or_create(
-                leave_application=leave_application,
-                date=current_date,
-                defaults={'is_full_day': True}
-            )
+    def _build_leave_days(leave_type, start_date, end_date, start_day_choice, end_day_choice):
+        """
+        (date, is_full_day) of every day in the leave period. Sundays of
+        non-EL leave are full days; other days follow the start/end day
+        choices, as the LeaveApplication post_save signal sets them.
+        """
+        first_day = localtime(start_date).date()
+        last_day = localtime(end_date).date()
+        leave_days = []
+        current_date = first_day
+        while current_date <= last_day:
+            if current_date.weekday() == 6 and leave_type.leave_type_short_code != "EL":
+                is_full_day = True
+            elif current_date == first_day:
+                is_full_day = start_day_choice == settings.FULL_DAY
+            elif current_date == last_day:
+                is_full_day = end_day_choice == settings.FULL_DAY
+            else:
+                is_full_day = True
+            leave_days.append((current_date, is_full_day))
             current_date += timedelta(days=1)
-
+        return leave_days
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-18 17:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hrms_app', '0041_alter_emailotp_unique_together_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deviceinformation',
+            name='last_punch_at',
+            field=models.DateTimeField(blank=True, help_text='Timestamp of the latest punch stored from this device. Incremental polls only request transactions after it.', null=True, verbose_name='Last Punch Synced'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-18 17:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hrms_app', '0042_deviceinformation_last_punch_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendancecache',
+            name='stale_since',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='When a change to the underlying data last invalidated this record; empty when current', null=True, verbose_name='Stale Since'),
+        ),
+    ]
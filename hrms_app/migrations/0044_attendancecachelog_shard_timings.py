@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-18 18:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hrms_app', '0043_attendancecache_stale_since'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendancecachelog',
+            name='shard_timings',
+            field=models.JSONField(blank=True, default=list, help_text='Per-shard employee count, records written, seconds taken and error, for runs split into shards', verbose_name='Shard Timings'),
+        ),
+    ]
@@ -53,6 +53,14 @@ class DeviceInformation(models.Model):
         default="http://1.22.197.176:99/iclock/WebAPIService.asmx",  # Default link can be modified if needed
     )
     include_seconds = models.BooleanField(default=False)
+    last_punch_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name=_("Last Punch Synced"),
+        help_text=_(
+            "Timestamp of the latest punch stored from this device. Incremental polls only request transactions after it."
+        ),
+    )
 
     def __str__(self):
         return f"{self.serial_number} from {self.from_date} to {self.to_date}"
@@ -482,6 +490,14 @@ class AttendanceCache(models.Model):
         verbose_name="Additional Metadata",
         help_text="Extra data stored as JSON for future extensions"
     )
+
+    stale_since = models.DateTimeField(
+        null=True,
+        blank=True,
+        db_index=True,
+        verbose_name="Stale Since",
+        help_text="When a change to the underlying data last invalidated this record; empty when current"
+    )
     
     # Tracking fields
     created_at = models.DateTimeField(
@@ -641,6 +657,13 @@ class AttendanceCacheLog(models.Model):
         help_text="Number of errors encountered during processing"
     )
     
+    shard_timings = models.JSONField(
+        default=list,
+        blank=True,
+        verbose_name="Shard Timings",
+        help_text="Per-shard employee count, records written, seconds taken and error, for runs split into shards"
+    )
+    
     # Additional context
     triggered_by = models.CharField(
         max_length=100,
@@ -397,20 +397,12 @@ class LeavePolicyConfig(models.Model):
             Returns None if no config exists for this leave type yet
             (LeavePolicyManager then falls back to LeaveType legacy fields).
         """
+        from .services.reference_cache import get_policy_index
+
         if reference_date is None:
             reference_date = timezone.now().date()
 
-        return (
-            cls.objects.filter(
-                leave_type=leave_type,
-                effective_from__lte=reference_date,
-            )
-            .filter(
-                Q(effective_to__isnull=True) | Q(effective_to__gte=reference_date)
-            )
-            .order_by("-effective_from")
-            .first()
-        )
+        return get_policy_index(leave_type).resolve(reference_date)
 
     @classmethod
     def close_current_policy(cls, leave_type, close_date):
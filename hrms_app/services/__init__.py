@@ -1,4 +1,4 @@
-from .attendance_service import AttendanceCacheService
+from .attendance_service import AttendanceCacheService, AttendanceRevision
 from .short_leave_refresh import refresh_monthly_short_leave
 
-__all__= [AttendanceCacheService,refresh_monthly_short_leave]
\ No newline at end of file
+__all__= [AttendanceCacheService,AttendanceRevision,refresh_monthly_short_leave]
\ No newline at end of file
@@ -1,165 +1,536 @@
 # services.py - Attendance Cache Service
+from django.conf import settings
+from django.core.cache import cache
 from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
-from datetime import datetime
+from django.utils.http import quote_etag
+from django.utils.timezone import make_aware
+from datetime import datetime, time, timedelta
 from collections import defaultdict
+import hashlib
+import json
 import logging
-from ..models import AttendanceCacheLog,AttendanceCache,CustomUser,AttendanceLog
+import time as clock
+from ..models import AttendanceCacheLog,AttendanceCache,CustomUser
 from hrms_app.utility import attendanceutils as at
+from hrms_app.utility.attendance_mapper import AttendanceMapper
 
 logger = logging.getLogger(__name__)
 
+# Set while a stale-cell recompute is queued so bursts of changes share one task
+RECOMPUTE_SCHEDULED_KEY = "attendance_cache:recompute_scheduled"
+
+# Attendance periods run from the 21st of one month to the 20th of the next
+PERIOD_START_DAY = 21
+
+
+def get_period_start(day):
+    """Start (the 21st) of the attendance period containing ``day``."""
+    if day.day >= PERIOD_START_DAY:
+        return day.replace(day=PERIOD_START_DAY)
+    return (day.replace(day=1) - timedelta(days=1)).replace(day=PERIOD_START_DAY)
+
+
+def get_period_end(day):
+    """End (the 20th) of the attendance period containing ``day``."""
+    period_start = get_period_start(day)
+    next_start = (period_start.replace(day=1) + timedelta(days=32)).replace(day=PERIOD_START_DAY)
+    return next_start - timedelta(days=1)
+
+
+def get_attendance_periods(start_date, end_date):
+    """
+    Whole attendance periods, as (start, end) date pairs, covering
+    ``start_date`` to ``end_date``.
+    """
+    periods = []
+    period_start = get_period_start(start_date)
+    while period_start <= end_date:
+        period_end = get_period_end(period_start)
+        periods.append((period_start, period_end))
+        period_start = period_end + timedelta(days=1)
+    return periods
+
+
+class AttendanceRevision:
+    """
+    Monotonic attendance data revision, bumped after every committed change
+    to logs, leaves, tours, holidays, office closures or the employee roster.
+
+    Rendered reports and export bytes are cached under keys that embed the
+    revision, so a change makes every older entry unreachable instead of
+    having to find and delete it.
+    """
+
+    KEY = "attendance:revision"
+    MODIFIED_KEY = "attendance:revision_modified"
+
+    @classmethod
+    def current(cls):
+        revision = cache.get(cls.KEY)
+        if revision is None:
+            # Seed from the clock so a lost counter never repeats an earlier revision
+            cache.add(cls.KEY, clock.time_ns() // 1000, timeout=None)
+            revision = cache.get(cls.KEY)
+        return revision
+
+    @classmethod
+    def last_modified(cls):
+        """Unix timestamp of the latest bump, for Last-Modified headers."""
+        modified = cache.get(cls.MODIFIED_KEY)
+        if modified is None:
+            cache.add(cls.MODIFIED_KEY, int(clock.time()), timeout=None)
+            modified = cache.get(cls.MODIFIED_KEY)
+        return modified
+
+    @classmethod
+    def bump(cls):
+        try:
+            revision = cache.incr(cls.KEY)
+        except ValueError:
+            cls.current()
+            revision = cache.incr(cls.KEY)
+        cache.set(cls.MODIFIED_KEY, int(clock.time()), timeout=None)
+        return revision
+
+    @classmethod
+    def bump_on_commit(cls):
+        """
+        Bump once the current transaction commits, so nothing rendered from
+        pre-commit data is cached under the new revision.
+        """
+        transaction.on_commit(cls.bump)
+
+    @classmethod
+    def make_key(cls, namespace, **parts):
+        """Cache key for ``namespace`` and the request ``parts`` at the current revision."""
+        digest = hashlib.md5(
+            json.dumps(parts, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        return f"{namespace}:{cls.current()}:{digest}"
+
+    @staticmethod
+    def make_etag(key):
+        return quote_etag(hashlib.md5(key.encode()).hexdigest())
+
+
 class AttendanceCacheService:
     """
-    Service to handle attendance cache operations
+    Service to handle attendance cache operations.
+
+    ``AttendanceCache`` holds one row per (employee, date) with the cell the
+    monthly report would render, computed by ``AttendanceMapper`` over whole
+    attendance periods (21st to 20th) so the Sunday/LWP rules see the same
+    neighbouring days as the report. Days without any status are stored as
+    empty cells so a fully cached period can be told apart from a partial one.
     """
-    
+
+    @staticmethod
+    def build_attendance_grid(employee_ids, start_date, end_date):
+        """Run AttendanceMapper for the employees exactly as the monthly report does."""
+        start_datetime = make_aware(datetime.combine(start_date, time.min))
+        end_datetime = make_aware(datetime.combine(end_date, time.min))
+        mapper = AttendanceMapper(start_date, end_date)
+        return mapper.map_attendance_data(
+            attendance_logs=at.get_attendance_logs(employee_ids, start_datetime, end_datetime),
+            leave_logs=at.get_non_stl_leave_logs(employee_ids, start_datetime, end_datetime),
+            holidays=at.get_holiday_logs(start_datetime, end_datetime, employee_ids),
+            tour_logs=at.get_tour_logs(employee_ids, start_datetime, end_datetime),
+            detailed=False,
+        )
+
     @staticmethod
-    def calculate_and_store_attendance(start_date, end_date, employee_ids=None, force_update=False):
+    def store_chunk(employee_ids, period_start, period_end):
+        """
+        Recompute one chunk of employees for one period and write every cell
+        with a single upsert. Returns (records_created, records_updated).
+        """
+        started_at = timezone.now()
+        grid = AttendanceCacheService.build_attendance_grid(employee_ids, period_start, period_end)
+        days = at.get_days_in_month(period_start, period_end)
+        existing = set(
+            AttendanceCache.objects.filter(
+                employee_id__in=employee_ids, date__range=[period_start, period_end]
+            ).values_list("employee_id", "date")
+        )
+
+        rows = []
+        for employee_id in employee_ids:
+            employee_data = grid.get(employee_id, {})
+            for day in days:
+                statuses = employee_data.get(day) or []
+                primary_status = statuses[0] if statuses else {}
+                rows.append(
+                    AttendanceCache(
+                        employee_id=employee_id,
+                        date=day,
+                        status=primary_status.get("status") or "",
+                        color_hex=primary_status.get("color") or "#000000",
+                        metadata={"statuses": statuses},
+                    )
+                )
+
+        AttendanceCache.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["employee", "date"],
+            update_fields=["status", "color_hex", "metadata", "updated_at"],
+        )
+        # Flags are stamped after their change commits (mark_stale_on_commit),
+        # so only those stamped before this run began are covered by the grid
+        AttendanceCache.objects.filter(
+            employee_id__in=employee_ids,
+            date__range=[period_start, period_end],
+            stale_since__lte=started_at,
+        ).update(stale_since=None)
+        records_updated = len(existing)
+        return len(rows) - records_updated, records_updated
+
+    @staticmethod
+    def store_shard(employee_ids, periods):
+        """
+        Recompute one shard of employees over ``periods``, one chunk per
+        transaction and upsert. Returns the shard's entry for
+        ``AttendanceCacheLog.shard_timings``.
+        """
+        started = clock.perf_counter()
+        chunk_size = settings.ATTENDANCE_CACHE_CHUNK_SIZE
+        records_created = 0
+        records_updated = 0
+        for period_start, period_end in periods:
+            for i in range(0, len(employee_ids), chunk_size):
+                with transaction.atomic():
+                    created, updated = AttendanceCacheService.store_chunk(
+                        employee_ids[i:i + chunk_size], period_start, period_end
+                    )
+                records_created += created
+                records_updated += updated
+        return {
+            'first_employee_id': employee_ids[0] if employee_ids else None,
+            'employees': len(employee_ids),
+            'records_created': records_created,
+            'records_updated': records_updated,
+            'seconds': round(clock.perf_counter() - started, 3),
+        }
+
+    @staticmethod
+    def queue_shards(log_entry, shards, periods):
+        """
+        Run the shards as a Celery chord, one task per shard, so they spread
+        over the worker processes; ``finish_attendance_cache_log`` closes
+        ``log_entry`` once every shard is done.
+        """
+        from celery import chord
+        from hrms_app.tasks import finish_attendance_cache_log, store_attendance_cache_shard
+
+        periods = [(period_start.isoformat(), period_end.isoformat()) for period_start, period_end in periods]
+        chord(
+            store_attendance_cache_shard.s(shard, periods) for shard in shards
+        )(finish_attendance_cache_log.s(log_entry.pk))
+
+    @staticmethod
+    def finish_log(log_entry, shard_timings):
+        """
+        Total the shard results into ``log_entry`` and close it; it fails if
+        any shard did. Returns the run's result dict.
+        """
+        errors = [timing['error'] for timing in shard_timings if timing.get('error')]
+        end_time = timezone.now()
+        log_entry.status = 'failed' if errors else 'completed'
+        log_entry.employees_processed = sum(
+            timing['employees'] for timing in shard_timings if not timing.get('error')
+        )
+        log_entry.records_created = sum(timing.get('records_created', 0) for timing in shard_timings)
+        log_entry.records_updated = sum(timing.get('records_updated', 0) for timing in shard_timings)
+        log_entry.shard_timings = shard_timings
+        log_entry.error_count = len(errors)
+        log_entry.error_message = "\n".join(errors)
+        log_entry.processing_time_seconds = (end_time - log_entry.started_at).total_seconds()
+        log_entry.completed_at = end_time
+        log_entry.save()
+        return {
+            'success': not errors,
+            'records_created': log_entry.records_created,
+            'records_updated': log_entry.records_updated,
+            'processing_time': log_entry.processing_time_seconds
+        }
+
+    @staticmethod
+    def calculate_and_store_attendance(start_date, end_date, employee_ids=None, force_update=False, process_type='daily', parallel=False):
         """
         Calculate and store attendance data in cache
-        
+
         Args:
             start_date: Start date for calculation
             end_date: End date for calculation
-            employee_ids: List of employee IDs (if None, process all)
-            force_update: Whether to update existing cache entries
+            employee_ids: List of employee IDs (if None, process all active employees)
+            force_update: Kept for existing callers; every cell of the affected
+                periods is always rewritten
+            process_type: AttendanceCacheLog process type
+            parallel: Queue the shards to the Celery workers instead of
+                running them here, and return once they are queued
+
+        The range is widened to whole attendance periods. Employees are split
+        into shards of ATTENDANCE_CACHE_SHARD_SIZE, and each shard is written
+        ATTENDANCE_CACHE_CHUNK_SIZE employees at a time, one transaction and
+        one upsert per chunk. Shards only share holidays and office closures,
+        which each one reads for itself, so they can run in any order or at
+        the same time. Each shard's timing is kept in the log entry.
         """
+        periods = get_attendance_periods(start_date, end_date)
         log_entry = AttendanceCacheLog.objects.create(
-            process_type='daily',
-            start_date=start_date,
-            end_date=end_date,
+            process_type=process_type,
+            start_date=periods[0][0],
+            end_date=periods[-1][1],
             status='processing'
         )
-        
+        shard_timings = []
+
         try:
-            start_time = timezone.now()
-            
             # Get employees to process
             if employee_ids:
                 employees = CustomUser.objects.filter(id__in=employee_ids)
             else:
                 employees = CustomUser.objects.filter(is_active=True)
-            
-            # Get all required data
-            attendance_logs = AttendanceLog.objects.filter(
-                start_date__date__range=[start_date, end_date]
-            ).select_related('applied_by')
-            
-            leave_logs = at.get_leave_logs(employee_ids)
-            tour_logs = at.get_tour_logs(employee_ids)
-            holidays = at.get_holiday_logs()
-
-            # Calculate attendance data using existing function
-            attendance_data = at.map_attendance_data(
-                attendance_logs, leave_logs, holidays, tour_logs, 
-                start_date, end_date
-            )
-            
-            records_created = 0
-            records_updated = 0
-            
-            # Store in cache
-            with transaction.atomic():
-                for employee_id, employee_data in attendance_data.items():
-                    for date_obj, status_data in employee_data.items():
-                        if isinstance(date_obj, str):
-                            date_obj = datetime.strptime(date_obj, '%Y-%m-%d').date()
-                        
-                        if status_data:
-                            primary_status = status_data[0]
-                            
-                            cache_obj, created = AttendanceCache.objects.update_or_create(
-                                employee_id=employee_id,
-                                date=date_obj,
-                                defaults={
-                                    'status': primary_status.get('status', 'A'),
-                                    'color_hex': primary_status.get('color', '#000000'),
-                                    'metadata': {
-                                        'all_statuses': status_data,
-                                        'calculated_at': timezone.now().isoformat()
-                                    }
-                                }
-                            )
-                            
-                            if created:
-                                records_created += 1
-                            else:
-                                records_updated += 1
-            
-            # Update log
-            end_time = timezone.now()
-            processing_time = (end_time - start_time).total_seconds()
-            
-            log_entry.status = 'completed'
-            log_entry.employees_processed = employees.count()
-            log_entry.records_created = records_created
-            log_entry.records_updated = records_updated
-            log_entry.processing_time_seconds = processing_time
-            log_entry.completed_at = end_time
-            log_entry.save()
-            
-            logger.info(f"Attendance cache updated: {records_created} created, {records_updated} updated")
-            
-            return {
-                'success': True,
-                'records_created': records_created,
-                'records_updated': records_updated,
-                'processing_time': processing_time
-            }
-            
+            employee_ids = list(employees.order_by("id").values_list("id", flat=True))
+            shard_size = settings.ATTENDANCE_CACHE_SHARD_SIZE
+            shards = [employee_ids[i:i + shard_size] for i in range(0, len(employee_ids), shard_size)]
+
+            if parallel and shards:
+                AttendanceCacheService.queue_shards(log_entry, shards, periods)
+                logger.info(f"Attendance cache run {log_entry.pk}: {len(shards)} shards queued")
+                return {'success': True, 'queued': True, 'log_id': log_entry.pk, 'shards': len(shards)}
+
+            for shard in shards:
+                shard_timings.append(AttendanceCacheService.store_shard(shard, periods))
+            result = AttendanceCacheService.finish_log(log_entry, shard_timings)
+
+            logger.info(f"Attendance cache updated: {result['records_created']} created, {result['records_updated']} updated")
+
+            return result
+
         except Exception as e:
             log_entry.status = 'failed'
             log_entry.error_message = str(e)
+            log_entry.shard_timings = shard_timings
             log_entry.completed_at = timezone.now()
             log_entry.save()
-            
+
             logger.error(f"Attendance cache calculation failed: {str(e)}")
             raise
-    
+
     @staticmethod
-    def get_cached_attendance(employee_ids, start_date, end_date):
+    def mark_stale(ranges):
+        """
+        Flag cached cells whose inputs changed, in a single UPDATE.
+
+        ``ranges`` is an iterable of ``(employee_ids, start_date, end_date)``;
+        ``employee_ids`` of None means every employee. Returns the number of
+        cells flagged.
+        """
+        condition = Q()
+        for employee_ids, start_date, end_date in ranges:
+            if start_date is None:
+                continue
+            cell_range = Q(date__range=[start_date, end_date or start_date])
+            if employee_ids is not None:
+                cell_range &= Q(employee_id__in=employee_ids)
+            condition |= cell_range
+        if not condition:
+            return 0
+        return AttendanceCache.objects.filter(condition).update(stale_since=timezone.now())
+
+    @staticmethod
+    def mark_stale_on_commit(ranges):
+        """
+        Flag the cells once the current transaction commits and queue their
+        recompute. Stamping after the commit means a recompute that started
+        later than ``stale_since`` has read the changed data, so
+        ``store_chunk`` can safely clear the flag.
+        """
+        ranges = list(ranges)
+
+        def flag():
+            if AttendanceCacheService.mark_stale(ranges):
+                AttendanceCacheService.schedule_recompute()
+
+        transaction.on_commit(flag)
+
+    @staticmethod
+    def schedule_recompute():
+        """
+        Queue ``recompute_stale_attendance_cache`` unless one is already
+        waiting; the flag expires with the delay, so a lost task only delays
+        the next recompute.
         """
-        Retrieve cached attendance data
+        from hrms_app.tasks import recompute_stale_attendance_cache
+
+        delay = settings.ATTENDANCE_CACHE_RECOMPUTE_DELAY
+        if cache.add(RECOMPUTE_SCHEDULED_KEY, True, timeout=delay + 60):
+            try:
+                recompute_stale_attendance_cache.apply_async(countdown=delay)
+            except Exception as e:
+                cache.delete(RECOMPUTE_SCHEDULED_KEY)
+                logger.error(f"Could not queue attendance cache recompute: {str(e)}")
+
+    @staticmethod
+    def recompute_stale_cells():
+        """
+        Recompute the employees and attendance periods that hold stale cells.
+
+        The mapper needs a whole period of context, so each affected
+        employee's period is rebuilt and written back with the same
+        chunked upsert as the nightly run.
         """
+        cache.delete(RECOMPUTE_SCHEDULED_KEY)
+        stale_cells = AttendanceCache.objects.filter(stale_since__isnull=False).values_list(
+            "employee_id", "date"
+        )
+        employees_by_period = defaultdict(set)
+        for employee_id, date in stale_cells:
+            employees_by_period[get_period_start(date)].add(employee_id)
+        if not employees_by_period:
+            return {'success': True, 'records_created': 0, 'records_updated': 0}
+
+        log_entry = AttendanceCacheLog.objects.create(
+            process_type='correction',
+            start_date=min(employees_by_period),
+            end_date=get_period_end(max(employees_by_period)),
+            status='processing'
+        )
+        start_time = timezone.now()
+        chunk_size = settings.ATTENDANCE_CACHE_CHUNK_SIZE
+        records_updated = 0
+        try:
+            for period_start, employee_ids in sorted(employees_by_period.items()):
+                period_end = get_period_end(period_start)
+                employee_ids = sorted(employee_ids)
+                for i in range(0, len(employee_ids), chunk_size):
+                    with transaction.atomic():
+                        _, updated = AttendanceCacheService.store_chunk(
+                            employee_ids[i:i + chunk_size], period_start, period_end
+                        )
+                    records_updated += updated
+        except Exception as e:
+            log_entry.status = 'failed'
+            log_entry.error_message = str(e)
+            log_entry.completed_at = timezone.now()
+            log_entry.save()
+            raise
+
+        end_time = timezone.now()
+        log_entry.status = 'completed'
+        log_entry.employees_processed = len(set().union(*employees_by_period.values()))
+        log_entry.records_updated = records_updated
+        log_entry.processing_time_seconds = (end_time - start_time).total_seconds()
+        log_entry.completed_at = end_time
+        log_entry.save()
+        return {'success': True, 'records_created': 0, 'records_updated': records_updated}
+
+    @staticmethod
+    def is_period_range(start_date, end_date):
+        """Whether the range is made of whole attendance periods."""
+        periods = get_attendance_periods(start_date, end_date)
+        return bool(periods) and periods[0][0] == start_date and periods[-1][1] == end_date
+
+    @staticmethod
+    def load_fresh_cells(employee_ids, start_date, end_date):
+        """
+        Cached cells of the employees whose every cell in the range is
+        present and not stale, as ``{employee_id: {date: statuses}}``.
+        """
+        day_count = (end_date - start_date).days + 1
         cache_entries = AttendanceCache.objects.filter(
             employee_id__in=employee_ids,
             date__range=[start_date, end_date]
-        ).select_related('employee')
-        
-        # Organize data similar to original function
-        attendance_data = defaultdict(lambda: defaultdict(list))
-        
-        for entry in cache_entries:
-            employee_id = entry.employee.id
-            attendance_data[employee_id][entry.date] = [{
-                'status': entry.status,
-                'color': entry.color_hex
-            }]
-        
+        ).values_list("employee_id", "date", "metadata", "stale_since")
+
+        cells = defaultdict(dict)
+        cell_counts = defaultdict(int)
+        stale_employees = set()
+        for employee_id, date, metadata, stale_since in cache_entries:
+            cell_counts[employee_id] += 1
+            if stale_since is not None:
+                stale_employees.add(employee_id)
+            statuses = metadata.get("statuses")
+            if statuses:
+                cells[employee_id][date] = statuses
+
+        return {
+            employee_id: cells[employee_id]
+            for employee_id, count in cell_counts.items()
+            if count == day_count and employee_id not in stale_employees
+        }
+
+    @staticmethod
+    def get_cached_attendance(employee_ids, start_date, end_date):
+        """
+        Retrieve cached attendance data in the shape returned by
+        ``AttendanceMapper.map_attendance_data``.
+
+        Returns None unless the range is made of whole attendance periods
+        and every (employee, date) cell in it is cached and fresh, so
+        callers can fall back to computing the grid.
+        """
+        if not AttendanceCacheService.is_period_range(start_date, end_date):
+            return None
+
+        employee_ids = set(employee_ids)
+        attendance_data = AttendanceCacheService.load_fresh_cells(employee_ids, start_date, end_date)
+        if len(attendance_data) != len(employee_ids):
+            return None
+        return {employee_id: cells for employee_id, cells in attendance_data.items() if cells}
+
+    @staticmethod
+    def get_attendance_grid(employee_ids, start_date, end_date):
+        """
+        The (employee x day) attendance grid for a report.
+
+        For whole attendance periods, employees whose cells are all cached
+        and fresh are served from AttendanceCache; the rest are mapped on
+        the fly per period, with the same context the cache uses, and
+        merged in. Any other range is mapped on the fly as before.
+        """
+        if not AttendanceCacheService.is_period_range(start_date, end_date):
+            return AttendanceCacheService.build_attendance_grid(employee_ids, start_date, end_date)
+
+        attendance_data = AttendanceCacheService.load_fresh_cells(employee_ids, start_date, end_date)
+        missing_ids = [employee_id for employee_id in employee_ids if employee_id not in attendance_data]
+        if missing_ids:
+            for period_start, period_end in get_attendance_periods(start_date, end_date):
+                grid = AttendanceCacheService.build_attendance_grid(missing_ids, period_start, period_end)
+                for employee_id in missing_ids:
+                    attendance_data.setdefault(employee_id, {}).update(
+                        (date, statuses)
+                        for date, statuses in grid.get(employee_id, {}).items()
+                        if period_start <= date <= period_end and statuses
+                    )
+        logger.debug(
+            f"Attendance grid: {len(employee_ids) - len(missing_ids)} employees cached, "
+            f"{len(missing_ids)} mapped"
+        )
         return attendance_data
-    
+
     @staticmethod
     def invalidate_cache(employee_ids=None, start_date=None, end_date=None):
         """
         Invalidate cache entries for specific criteria
         """
         queryset = AttendanceCache.objects.all()
-        
+
         if employee_ids:
             queryset = queryset.filter(employee_id__in=employee_ids)
-        
+
         if start_date and end_date:
             queryset = queryset.filter(date__range=[start_date, end_date])
         elif start_date:
             queryset = queryset.filter(date__gte=start_date)
         elif end_date:
             queryset = queryset.filter(date__lte=end_date)
-        
+
         deleted_count = queryset.count()
         queryset.delete()
-        
+
         logger.info(f"Invalidated {deleted_count} cache entries")
         return deleted_count
-
-
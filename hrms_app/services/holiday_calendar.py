@@ -0,0 +1,112 @@
+# services/holiday_calendar.py - Holiday applicability index
+"""
+A holiday applies either to everyone (no applicable users) or to the users
+listed on it. Reading each holiday's user list took one query per holiday.
+Instead, ``get_holiday_calendar(year)`` loads a year of holidays together
+with their users in one query over the applicable-users join. It caches the
+result at the Holiday reference version, which moves on every Holiday save
+or delete and every applicable-users change (see signals.py).
+
+Holidays come back as Holiday instances carrying ``applicable_user_ids``, a
+frozenset of user ids. The set is empty for a holiday that applies to
+everyone.
+"""
+from datetime import date, datetime
+from functools import partial
+from typing import Dict, Iterable, List, Optional
+
+from django.db.models import Q
+from django.utils.timezone import is_aware, localtime
+
+from ..models import Holiday
+from .reference_cache import ReferenceCache
+
+
+def _as_date(value) -> date:
+    """Dates as the ORM compares them against a DateField."""
+    if isinstance(value, datetime):
+        return (localtime(value) if is_aware(value) else value).date()
+    return value
+
+
+class HolidayCalendar:
+    """The holidays touching one year, ordered by start date, and the days they start on."""
+
+    __slots__ = ("holidays", "start_days")
+
+    def __init__(self, holidays: List[Holiday]) -> None:
+        self.holidays = holidays
+        self.start_days: Dict[date, List[Holiday]] = {}
+        for holiday in holidays:
+            self.start_days.setdefault(holiday.start_date, []).append(holiday)
+
+
+def _load_calendar(year: int) -> HolidayCalendar:
+    first_day, last_day = date(year, 1, 1), date(year, 12, 31)
+    fields = [field.attname for field in Holiday._meta.concrete_fields]
+    rows = (
+        Holiday.objects.filter(start_date__lte=last_day)
+        .filter(Q(start_date__gte=first_day) | Q(end_date__gte=first_day))
+        .order_by("start_date", "pk")
+        .values_list(*fields, "applicable_users__id")
+    )
+    pk_index = fields.index(Holiday._meta.pk.attname)
+    holidays: Dict[int, Holiday] = {}
+    user_ids: Dict[int, set] = {}
+    # One row per (holiday, user), or a single row with no user for a global holiday
+    for *values, user_id in rows:
+        pk = values[pk_index]
+        if pk not in holidays:
+            holidays[pk] = Holiday.from_db(Holiday.objects.db, fields, values)
+            user_ids[pk] = set()
+        if user_id is not None:
+            user_ids[pk].add(user_id)
+    for pk, holiday in holidays.items():
+        holiday.applicable_user_ids = frozenset(user_ids[pk])
+    return HolidayCalendar(list(holidays.values()))
+
+
+def get_holiday_calendar(year: int) -> HolidayCalendar:
+    return ReferenceCache(Holiday, f"calendar:{year}", partial(_load_calendar, year)).get()
+
+
+def get_holidays(start_date, end_date, employee_ids: Optional[Iterable[int]] = None, starting_in_range: bool = False) -> List[Holiday]:
+    """
+    Holidays that touch ``start_date``..``end_date``, ordered by start date.
+    With ``starting_in_range``, only holidays that start in the range are
+    returned. Given ``employee_ids``, only holidays that apply to everyone
+    or to one of those employees are returned.
+    """
+    start_date, end_date = _as_date(start_date), _as_date(end_date)
+    employee_ids = set(employee_ids or ())
+    holidays = {}
+    for year in range(start_date.year, end_date.year + 1):
+        for holiday in get_holiday_calendar(year).holidays:
+            if holiday.start_date > end_date:
+                break
+            if starting_in_range:
+                if holiday.start_date < start_date:
+                    continue
+            elif (holiday.end_date or holiday.start_date) < start_date:
+                continue
+            if employee_ids and holiday.applicable_user_ids and not holiday.applicable_user_ids & employee_ids:
+                continue
+            holidays[holiday.pk] = holiday
+    return sorted(holidays.values(), key=lambda holiday: (holiday.start_date, holiday.pk))
+
+
+def is_holiday(day) -> bool:
+    """Whether any holiday starts on ``day``."""
+    day = _as_date(day)
+    return day in get_holiday_calendar(day.year).start_days
+
+
+def get_holiday_start_days(start_date, end_date) -> set:
+    """The days in ``start_date``..``end_date`` on which a holiday starts."""
+    start_date, end_date = _as_date(start_date), _as_date(end_date)
+    return {
+        day
+        for year in range(start_date.year, end_date.year + 1)
+        for day in get_holiday_calendar(year).start_days
+        if start_date <= day <= end_date
+    }
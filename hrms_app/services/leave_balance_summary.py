@@ -0,0 +1,149 @@
+# services/leave_balance_summary.py - Dashboard leave balance widget
+"""
+Leave balances of one user for the dashboard widget. The balance rows for the
+current year, along with the approved and pending days applied against each
+leave type, come from one query: the user's own applications are joined through
+a FilteredRelation and summed with conditional aggregates.
+
+The summary is cached per user until one of their leave applications or
+balances changes (see signals.py) or the month rolls over.
+"""
+from typing import Dict, Iterable, List
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import FilteredRelation, Q, Sum
+from django.urls import reverse
+from django.utils.timezone import now
+
+from ..choices.leave import LeaveAccrualPeriod
+from ..models import LeaveBalanceOpenings, LeaveType
+from .reference_cache import get_leave_types, get_reference_version
+
+
+def _cache_key(user_id) -> str:
+    return f"leave_balance_summary:{user_id}"
+
+
+def invalidate_leave_balance_summary(user_ids: Iterable[int]) -> None:
+    """Drop the cached summaries of ``user_ids``, now and again on commit."""
+    keys = [_cache_key(user_id) for user_id in set(user_ids) if user_id is not None]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def _get_balances(user, year: int, month: int) -> List[LeaveBalanceOpenings]:
+    applications = "leave_type__leave_applications"
+    return list(
+        LeaveBalanceOpenings.objects.filter(user=user, year=year)
+        .filter(Q(month__isnull=True) | Q(month=month))
+        .annotate(
+            own_applications=FilteredRelation(
+                applications,
+                condition=Q(
+                    **{
+                        f"{applications}__appliedBy": user,
+                        f"{applications}__endDate__year": year,
+                        f"{applications}__status__in": [settings.APPROVED, settings.PENDING],
+                    }
+                ),
+            )
+        )
+        .annotate(
+            approved_in_year=Sum(
+                "own_applications__usedLeave",
+                filter=Q(own_applications__status=settings.APPROVED),
+            ),
+            pending_in_year=Sum(
+                "own_applications__usedLeave",
+                filter=Q(own_applications__status=settings.PENDING),
+            ),
+            approved_in_month=Sum(
+                "own_applications__usedLeave",
+                filter=Q(own_applications__status=settings.APPROVED, own_applications__endDate__month=month),
+            ),
+            pending_in_month=Sum(
+                "own_applications__usedLeave",
+                filter=Q(own_applications__status=settings.PENDING, own_applications__endDate__month=month),
+            ),
+        )
+        .select_related("leave_type")
+    )
+
+
+def _summary_row(balance: LeaveBalanceOpenings, leave_type: LeaveType, monthly: bool, url: str, color: str) -> Dict:
+    if monthly:
+        used_leave, on_hold_leave = balance.approved_in_month, balance.pending_in_month
+    else:
+        used_leave, on_hold_leave = balance.approved_in_year, balance.pending_in_year
+    used_leave, on_hold_leave = used_leave or 0, on_hold_leave or 0
+    return {
+        "pk": balance.pk,
+        "balance": balance.remaining_leave_balances,
+        "used_leave": used_leave,
+        "on_hold": on_hold_leave,
+        "total_balance": balance.remaining_leave_balances - on_hold_leave,
+        "is_active": balance.is_active,
+        "leave_type": leave_type,
+        "url": url,
+        "color": color,
+    }
+
+
+def _build_summary(user, year: int, month: int) -> List[Dict]:
+    # First row in Meta ordering wins, as with the former .first() lookups
+    monthly_balances, yearly_balances = {}, {}
+    for balance in _get_balances(user, year, month):
+        by_leave_type = yearly_balances if balance.month is None else monthly_balances
+        by_leave_type.setdefault(balance.leave_type_id, balance)
+
+    summary = []
+    for leave_type in get_leave_types():
+        monthly = leave_type.accrual_period == LeaveAccrualPeriod.MONTHLY
+        balance = (monthly_balances if monthly else yearly_balances).get(leave_type.pk)
+        if not balance:
+            continue
+        if leave_type.leave_type_short_code == "STL":
+            apply_url = reverse("short_leave_create")
+        else:
+            apply_url = reverse("apply_leave_with_id", args=[leave_type.pk])
+        summary.append(_summary_row(balance, leave_type, monthly, apply_url, leave_type.color_hex))
+
+    # Female-only ML logic (yearly based)
+    personal_detail = getattr(user, "personal_detail", None)
+    gender = getattr(personal_detail, "gender", None)
+    if getattr(gender, "gender", None) == "Female":
+        ml_balance = next(
+            (
+                balance
+                for balance in yearly_balances.values()
+                if balance.leave_type.leave_type_short_code == settings.ML
+            ),
+            None,
+        )
+        if ml_balance:
+            apply_url = reverse("apply_leave_with_id", args=[ml_balance.leave_type.pk])
+            summary.append(_summary_row(ml_balance, ml_balance.leave_type, False, apply_url, "#ff9447"))
+    return summary
+
+
+def get_leave_balance_summary(user) -> List[Dict]:
+    """
+    Rows for ``leave_balances/leave_balance_list.html``: yearly leave types use
+    the year's balance and usage, monthly ones the current month's.
+    """
+    today = now().date()
+    # A new month or an edited leave type starts a fresh summary
+    period = (today.year, today.month, get_reference_version(LeaveType))
+    key = _cache_key(user.pk)
+    cached = cache.get(key)
+    if cached is not None and cached["period"] == period:
+        return cached["rows"]
+
+    rows = _build_summary(user, today.year, today.month)
+    if not connection.in_atomic_block:
+        cache.set(key, {"period": period, "rows": rows}, settings.LEAVE_BALANCE_CACHE_TIMEOUT)
+    return rows
@@ -0,0 +1,61 @@
+# services/punch_cache.py - Today's device punches, shared by every page view
+"""
+The dashboard shows an employee's first and last punch of the day. Instead
+of downloading the device's day log on each page view, the periodic
+``refresh_device_punch_cache`` task fetches every device once per interval
+and stores each device's punches for the day under one cache key. Page views
+only read that key. If the cache is cold, they show no punches rather than
+calling the device.
+"""
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.timezone import localtime
+
+from ..hrms.device_fetch import STATUS_OK, DeviceFetchEngine
+from ..models import DeviceInformation
+
+
+def _cache_key(device_id, day: date) -> str:
+    return f"device_punches:{device_id}:{day.isoformat()}"
+
+
+def refresh_device_punches(devices: Optional[Iterable[DeviceInformation]] = None) -> Dict[str, int]:
+    """
+    Fetch today's punches from ``devices`` (default: all) in parallel and
+    cache them per device. A device that fails keeps its previous entry until
+    that entry expires. Returns the number of devices per fetch status.
+    """
+    day = localtime().date()
+    devices = {device.pk: device for device in (devices or DeviceInformation.objects.all())}
+    with DeviceFetchEngine() as engine:
+        results = engine.fetch_all(devices, f"{day} 00:01", f"{day} 23:59")
+
+    statuses: Dict[str, int] = {}
+    for device_id, result in results.items():
+        statuses[result["status"]] = statuses.get(result["status"], 0) + 1
+        if result["status"] != STATUS_OK:
+            continue
+        punches = {
+            emp_code: by_date[day]
+            for emp_code, by_date in (result["data"] or {}).items()
+            if by_date.get(day)
+        }
+        cache.set(_cache_key(device_id, day), punches, settings.PUNCH_CACHE_TIMEOUT)
+    return statuses
+
+
+def get_cached_punches(device_id, emp_code: str, day: Optional[date] = None) -> List:
+    """The employee's punches on ``day`` (default: today) as last fetched; never calls the device."""
+    day = day or localtime().date()
+    return (cache.get(_cache_key(device_id, day)) or {}).get(emp_code, [])
+
+
+def get_today_check_in_out(device_id, emp_code: str) -> Tuple[Optional[object], Optional[object]]:
+    """(first punch, last punch) of today; the last is None until a second punch."""
+    punches = get_cached_punches(device_id, emp_code)
+    if not punches:
+        return None, None
+    return punches[0], punches[-1] if len(punches) > 1 else None
@@ -0,0 +1,206 @@
+# services/reference_cache.py - Cached reference data
+"""
+Small, rarely edited tables (leave types, status colours, attendance and app
+settings, shift timings, leave policy versions, holidays) are read on nearly
+every request. Each accessor here caches its result under a per-model version
+that ``bump_reference_version`` moves on every save or delete of that model
+(see signals.py), so edits show up on the next read without tracking keys.
+
+Values read inside a transaction are never stored: the transaction may still
+roll back, and its uncommitted rows must not outlive it in the cache.
+"""
+from bisect import bisect_right
+from datetime import date
+from typing import Callable, Dict, Generic, List, Optional, Tuple, TypeVar
+import time as clock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Model
+
+from ..models import AppSetting, AttendanceSetting, AttendanceStatusColor, Holiday, LeaveType, ShiftTiming
+from ..models_leave_policy_config import LeavePolicyConfig
+
+T = TypeVar("T")
+
+_MISSING = object()
+
+
+def _version_key(model) -> str:
+    return f"reference:{model._meta.label_lower}:version"
+
+
+def get_reference_version(model) -> int:
+    key = _version_key(model)
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock so a lost version never repeats an earlier one
+        cache.add(key, clock.time_ns() // 1000, timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _bump(key: str) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, clock.time_ns() // 1000, timeout=None)
+
+
+def bump_reference_version(model) -> None:
+    """
+    Invalidate every cached value of ``model``, now and again on commit, so
+    a reader that loaded the pre-commit rows in between cannot keep them.
+    """
+    key = _version_key(model)
+    _bump(key)
+    transaction.on_commit(lambda: _bump(key))
+
+
+class ReferenceCache(Generic[T]):
+    """One value derived from ``model``, cached at the model's current version."""
+
+    def __init__(self, model, name: str, loader: Callable[[], T]) -> None:
+        self.model = model
+        self.name = name
+        self.loader = loader
+
+    def get(self) -> T:
+        key = f"reference:{self.model._meta.label_lower}:{get_reference_version(self.model)}:{self.name}"
+        value = cache.get(key, _MISSING)
+        if value is _MISSING:
+            value = self.loader()
+            if not connection.in_atomic_block:
+                cache.set(key, value, settings.REFERENCE_CACHE_TIMEOUT)
+        return value
+
+
+_leave_types: ReferenceCache[List[LeaveType]] = ReferenceCache(
+    LeaveType, "all", lambda: list(LeaveType.objects.all())
+)
+_status_colors: ReferenceCache[Dict[str, AttendanceStatusColor]] = ReferenceCache(
+    AttendanceStatusColor,
+    "by_status",
+    lambda: {color.status: color for color in AttendanceStatusColor.objects.all()},
+)
+_attendance_setting: ReferenceCache[Optional[AttendanceSetting]] = ReferenceCache(
+    AttendanceSetting, "first", lambda: AttendanceSetting.objects.first()
+)
+_app_settings: ReferenceCache[Dict[str, AppSetting]] = ReferenceCache(
+    AppSetting, "by_key", lambda: {setting.key: setting for setting in AppSetting.objects.all()}
+)
+_default_shift_timing: ReferenceCache[Optional[ShiftTiming]] = ReferenceCache(
+    ShiftTiming, "first", lambda: ShiftTiming.objects.first()
+)
+
+
+def _load_policy_versions() -> Dict[int, List[LeavePolicyConfig]]:
+    versions: Dict[int, List[LeavePolicyConfig]] = {}
+    # Meta.ordering is -effective_from, so each list is newest first
+    for config in LeavePolicyConfig.objects.select_related("leave_type"):
+        versions.setdefault(config.leave_type_id, []).append(config)
+    return versions
+
+
+_policy_versions: ReferenceCache[Dict[int, List[LeavePolicyConfig]]] = ReferenceCache(
+    LeavePolicyConfig, "by_leave_type", _load_policy_versions
+)
+
+
+class PolicyIntervalIndex:
+    """
+    The policy versions of one leave type sorted by ``effective_from``, so the
+    version covering a date is found by bisection instead of a query.
+    """
+
+    __slots__ = ("starts", "versions")
+
+    def __init__(self, versions: List[LeavePolicyConfig]) -> None:
+        self.versions = sorted(versions, key=lambda config: config.effective_from)
+        self.starts = [config.effective_from for config in self.versions]
+
+    def resolve(self, reference_date: date) -> Optional[LeavePolicyConfig]:
+        # Walk back from the latest version starting on or before the date;
+        # with non-overlapping windows the first candidate is the answer
+        position = bisect_right(self.starts, reference_date)
+        while position:
+            position -= 1
+            config = self.versions[position]
+            if config.effective_to is None or config.effective_to >= reference_date:
+                return config
+        return None
+
+
+# (version, indexes by leave type id), swapped as one tuple so concurrent
+# readers never pair a version with another version's indexes
+_policy_indexes: Tuple[Optional[int], Dict[int, PolicyIntervalIndex]] = (None, {})
+
+
+def get_policy_index(leave_type) -> PolicyIntervalIndex:
+    """
+    The interval index of ``leave_type`` (instance or pk), kept in process
+    memory until a LeavePolicyConfig save or delete moves the version.
+    """
+    global _policy_indexes
+    leave_type_id = leave_type.pk if isinstance(leave_type, Model) else leave_type
+    version = get_reference_version(LeavePolicyConfig)
+    cached_version, indexes = _policy_indexes
+    if cached_version != version:
+        indexes = {}
+    index = indexes.get(leave_type_id)
+    if index is None:
+        index = PolicyIntervalIndex(get_policy_versions(leave_type_id))
+        if not connection.in_atomic_block:
+            _policy_indexes = (version, {**indexes, leave_type_id: index})
+    return index
+
+
+def get_leave_types() -> List[LeaveType]:
+    return _leave_types.get()
+
+
+def get_leave_type(pk) -> Optional[LeaveType]:
+    """``LeaveType.objects.filter(id=pk).first()`` from the cache."""
+    try:
+        pk = int(pk)
+    except (TypeError, ValueError):
+        return None
+    return next((leave_type for leave_type in get_leave_types() if leave_type.pk == pk), None)
+
+
+def get_status_color(status: str) -> AttendanceStatusColor:
+    """``AttendanceStatusColor.objects.get(status=status)`` from the cache."""
+    try:
+        return _status_colors.get()[status]
+    except KeyError:
+        raise AttendanceStatusColor.DoesNotExist(f"No AttendanceStatusColor for {status}")
+
+
+def get_attendance_setting() -> Optional[AttendanceSetting]:
+    return _attendance_setting.get()
+
+
+def get_app_setting(key: str) -> Optional[AppSetting]:
+    return _app_settings.get().get(key)
+
+
+def get_default_shift_timing() -> Optional[ShiftTiming]:
+    return _default_shift_timing.get()
+
+
+def get_policy_versions(leave_type) -> List[LeavePolicyConfig]:
+    """All LeavePolicyConfig versions of ``leave_type`` (instance or pk), newest first."""
+    leave_type_id = leave_type.pk if isinstance(leave_type, Model) else leave_type
+    return _policy_versions.get().get(leave_type_id, [])
+
+
+REFERENCE_MODELS = (
+    AppSetting,
+    AttendanceSetting,
+    AttendanceStatusColor,
+    Holiday,
+    LeavePolicyConfig,
+    LeaveType,
+    ShiftTiming,
+)
@@ -10,6 +10,7 @@ from django.conf import settings
 from hrms_app.models import *
 from django.core.exceptions import ImproperlyConfigured
 from hrms_app.hrms.utils import check_lock_status
+from .services.reference_cache import get_default_shift_timing
 
 # @receiver(post_save, sender=CustomUser)
 # def initialize_leave_balance(sender, instance, created, **kwargs):
@@ -152,7 +153,7 @@ def create_employee_shift(sender, instance, created, **kwargs):
     """
     if created:  # Only create shifts for newly created users
         try:
-            default_shift_timing = ShiftTiming.objects.first()  # Replace with your logic for default shift
+            default_shift_timing = get_default_shift_timing()  # Replace with your logic for default shift
             if default_shift_timing:
                 EmployeeShift.objects.create(
                     employee=instance,
@@ -210,3 +211,154 @@ from .tasks import send_announcement_email_task
 def send_announcement_signal(sender, instance, created, **kwargs):
     send_announcement_email_task.delay(instance.id, created)
 
+
+
+# Attendance cache invalidation
+from django.db.models.signals import post_delete, m2m_changed
+from .services import AttendanceCacheService, AttendanceRevision
+
+
+def get_attendance_cache_range(instance):
+    """
+    The (employee_ids, start_date, end_date) of AttendanceCache cells an
+    instance feeds into; employee_ids of None means every employee.
+    """
+    if isinstance(instance, LeaveApplication):
+        if not instance.startDate or not instance.endDate:
+            return None
+        return (
+            [instance.appliedBy_id],
+            localtime(instance.startDate).date(),
+            localtime(instance.endDate).date(),
+        )
+    if isinstance(instance, AttendanceLog):
+        log_date = localtime(instance.start_date).date()
+        return ([instance.applied_by_id], log_date, log_date)
+    if isinstance(instance, UserTour):
+        return (
+            [instance.applied_by_id],
+            instance.start_date,
+            instance.extended_end_date or instance.end_date,
+        )
+    if isinstance(instance, Holiday):
+        # Global holidays reach everyone, and applicable_users is saved
+        # after the holiday itself, so invalidate all employees
+        return (None, instance.start_date, instance.end_date or instance.start_date)
+    if isinstance(instance, OfficeClosure):
+        return (None, instance.date, instance.date)
+    return None
+
+
+def invalidate_attendance_cache(ranges):
+    """
+    Flag the affected cells and queue their recompute once the change
+    commits, and move cached reports to a new attendance revision.
+    """
+    ranges = [cell_range for cell_range in ranges if cell_range is not None]
+    if ranges:
+        AttendanceRevision.bump_on_commit()
+    if ranges:
+        AttendanceCacheService.mark_stale_on_commit(ranges)
+
+
+@receiver(pre_save, sender=LeaveApplication)
+@receiver(pre_save, sender=AttendanceLog)
+@receiver(pre_save, sender=UserTour)
+@receiver(pre_save, sender=Holiday)
+@receiver(pre_save, sender=OfficeClosure)
+def remember_attendance_cache_range(sender, instance, **kwargs):
+    """Keep the range a row covered before the save, in case its dates move."""
+    previous = sender.objects.filter(pk=instance.pk).first() if instance.pk else None
+    instance._previous_attendance_cache_range = (
+        get_attendance_cache_range(previous) if previous else None
+    )
+
+
+@receiver(post_save, sender=LeaveApplication)
+@receiver(post_save, sender=AttendanceLog)
+@receiver(post_save, sender=UserTour)
+@receiver(post_save, sender=Holiday)
+@receiver(post_save, sender=OfficeClosure)
+def invalidate_attendance_cache_on_save(sender, instance, **kwargs):
+    invalidate_attendance_cache(
+        [
+            getattr(instance, "_previous_attendance_cache_range", None),
+            get_attendance_cache_range(instance),
+        ]
+    )
+
+
+@receiver(post_delete, sender=LeaveApplication)
+@receiver(post_delete, sender=AttendanceLog)
+@receiver(post_delete, sender=UserTour)
+@receiver(post_delete, sender=Holiday)
+@receiver(post_delete, sender=OfficeClosure)
+def invalidate_attendance_cache_on_delete(sender, instance, **kwargs):
+    invalidate_attendance_cache([get_attendance_cache_range(instance)])
+
+
+@receiver(m2m_changed, sender=Holiday.applicable_users.through)
+def invalidate_attendance_cache_on_holiday_users(sender, instance, action, pk_set=None, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if isinstance(instance, Holiday):
+        holidays = [instance]
+    else:
+        # Changed from the user side; pk_set holds the holidays
+        holidays = Holiday.objects.filter(pk__in=pk_set or [])
+    invalidate_attendance_cache([get_attendance_cache_range(holiday) for holiday in holidays])
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_save, sender=PersonalDetails)
+@receiver(post_delete, sender=CustomUser)
+@receiver(post_delete, sender=PersonalDetails)
+def bump_attendance_revision_on_roster_change(sender, instance, update_fields=None, **kwargs):
+    """Reports list employees too; logins only touch last_login and are ignored."""
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    AttendanceRevision.bump_on_commit()
+
+
+# Leave balance summary invalidation
+from .services.leave_balance_summary import invalidate_leave_balance_summary
+
+
+@receiver(post_save, sender=LeaveApplication)
+@receiver(post_delete, sender=LeaveApplication)
+def invalidate_leave_balance_summary_on_application(sender, instance, **kwargs):
+    invalidate_leave_balance_summary([instance.appliedBy_id])
+
+
+@receiver(post_save, sender=LeaveBalanceOpenings)
+@receiver(post_delete, sender=LeaveBalanceOpenings)
+@receiver(post_save, sender=PersonalDetails)
+@receiver(post_delete, sender=PersonalDetails)
+def invalidate_leave_balance_summary_on_balance(sender, instance, **kwargs):
+    invalidate_leave_balance_summary([instance.user_id])
+
+
+# Reference data cache invalidation
+from .services.reference_cache import REFERENCE_MODELS, bump_reference_version
+
+
+def invalidate_reference_cache(sender, **kwargs):
+    bump_reference_version(sender)
+
+
+for reference_model in REFERENCE_MODELS:
+    label = reference_model._meta.label_lower
+    post_save.connect(invalidate_reference_cache, sender=reference_model, dispatch_uid=f"reference_save_{label}")
+    post_delete.connect(invalidate_reference_cache, sender=reference_model, dispatch_uid=f"reference_delete_{label}")
+
+
+@receiver(m2m_changed, sender=Holiday.applicable_users.through)
+def invalidate_holiday_calendar_on_users(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        bump_reference_version(Holiday)
+
+
+@receiver(post_delete, sender=CustomUser)
+def invalidate_holiday_calendar_on_user_delete(sender, **kwargs):
+    """Deleting a user drops their holiday rows without an m2m_changed signal."""
+    bump_reference_version(Holiday)
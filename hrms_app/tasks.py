@@ -17,6 +17,7 @@ from webpush import send_user_notification
 from django.utils import timezone
 from datetime import timedelta, date
 from .services import AttendanceCacheService
+from .services.punch_cache import refresh_device_punches
 import logging
 
 logger = logging.getLogger(__name__)
@@ -90,6 +91,16 @@ def send_leave_application_notifications(application_id, protocol, domain):
     )
 
 
+@shared_task
+def send_bulk_leave_application_notifications(application_ids, protocol, domain):
+    """Notify employees and managers of bulk-created leave applications in one task."""
+    for application_id in application_ids:
+        try:
+            send_leave_application_notifications(application_id, protocol, domain)
+        except Exception:
+            logger.exception("Failed to send notifications for leave application %s", application_id)
+
+
 @shared_task
 def send_leave_application_email(subject, message, recipient_list):
     # print(f"Mail sent")
@@ -221,6 +232,19 @@ def populate_attendance_log():
     call_command('pop_att', '--from-date', from_date, '--to-date', to_date)
 
 
+@shared_task
+def poll_attendance_devices():
+    """Pull only the punches recorded since each device's last sync."""
+    call_command('pop_att', '--incremental')
+
+
+@shared_task
+def refresh_device_punch_cache():
+    """Cache today's punches per device for the dashboard check-in/out widget."""
+    statuses = refresh_device_punches()
+    logger.info(f"Device punch cache refreshed: {statuses}")
+
+
 @shared_task
 def send_reminder_email():
     subject = 'Reminder For Attendance Regularization'
@@ -479,13 +503,49 @@ def calculate_daily_attendance_cache(self, days_back=1):
         raise self.retry(exc=exc, countdown=60 * 5)  # Retry after 5 minutes
 
 @shared_task
-def recalculate_monthly_attendance_cache(year, month):
+def recompute_stale_attendance_cache():
+    """
+    Recompute the attendance cache cells invalidated by recent changes
+    """
+    result = AttendanceCacheService.recompute_stale_cells()
+    logger.info(f"Stale attendance cache recompute completed: {result}")
+    return result
+
+@shared_task
+def store_attendance_cache_shard(employee_ids, periods):
+    """
+    Recompute one shard of a parallel attendance cache run. A failure is
+    returned rather than raised so the run's log is still closed.
+    """
+    periods = [(date.fromisoformat(period_start), date.fromisoformat(period_end)) for period_start, period_end in periods]
+    try:
+        return AttendanceCacheService.store_shard(employee_ids, periods)
+    except Exception as exc:
+        logger.error(f"Attendance cache shard starting at employee {employee_ids[0]} failed: {str(exc)}")
+        return {'first_employee_id': employee_ids[0], 'employees': len(employee_ids), 'error': str(exc)}
+
+@shared_task
+def finish_attendance_cache_log(shard_timings, log_id):
+    """
+    Close a parallel attendance cache run once all its shards are done
+    """
+    log_entry = AttendanceCacheLog.objects.get(pk=log_id)
+    result = AttendanceCacheService.finish_log(log_entry, shard_timings)
+    logger.info(f"Attendance cache run {log_id} finished: {result}")
+    return result
+
+@shared_task
+def recalculate_monthly_attendance_cache(year=None, month=None):
     """
     Monthly task to recalculate entire month's attendance
+    (the previous month when no month is given), sharded over the workers
     """
     try:
         from calendar import monthrange
         
+        if year is None or month is None:
+            previous_month = date.today().replace(day=1) - timedelta(days=1)
+            year, month = previous_month.year, previous_month.month
         start_date = date(year, month, 1)
         _, last_day = monthrange(year, month)
         end_date = date(year, month, last_day)
@@ -493,10 +553,12 @@ def recalculate_monthly_attendance_cache(year, month):
         result = AttendanceCacheService.calculate_and_store_attendance(
             start_date=start_date,
             end_date=end_date,
-            force_update=True
+            force_update=True,
+            process_type='monthly',
+            parallel=True
         )
         
-        logger.info(f"Monthly attendance cache recalculation completed: {result}")
+        logger.info(f"Monthly attendance cache recalculation queued: {result}")
         return result
         
     except Exception as exc:
@@ -0,0 +1,181 @@
+from datetime import date, datetime
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils.timezone import make_aware
+from hrms_app.models import AttendanceCache, AttendanceCacheLog, AttendanceLog
+from hrms_app.services.attendance_service import AttendanceCacheService, get_attendance_periods
+from hrms_app.tasks import finish_attendance_cache_log, store_attendance_cache_shard
+
+
+class AttendanceCacheServiceTest(TestCase):
+    def setUp(self):
+        self.users = [get_user_model().objects.create(username=f"emp{i}") for i in range(3)]
+        for user, day in ((self.users[0], 22), (self.users[1], 23)):
+            AttendanceLog.objects.create(
+                applied_by=user,
+                title=f"Attendance {user.username}",
+                slug=f"attendance-{user.username}-{day}",
+                start_date=make_aware(datetime(2024, 5, day, 9, 30)),
+                end_date=make_aware(datetime(2024, 5, day, 18, 0)),
+                att_status_short_code="P",
+                color_hex="#06B900",
+            )
+        self.employee_ids = [user.id for user in self.users]
+
+    def test_attendance_periods(self):
+        self.assertEqual(
+            get_attendance_periods(date(2024, 5, 2), date(2024, 5, 25)),
+            [(date(2024, 4, 21), date(2024, 5, 20)), (date(2024, 5, 21), date(2024, 6, 20))],
+        )
+        self.assertEqual(
+            get_attendance_periods(date(2024, 12, 21), date(2024, 12, 31)),
+            [(date(2024, 12, 21), date(2025, 1, 20))],
+        )
+
+    def test_cached_grid_matches_mapper(self):
+        start, end = date(2024, 5, 21), date(2024, 6, 20)
+        result = AttendanceCacheService.calculate_and_store_attendance(
+            start, end, employee_ids=self.employee_ids
+        )
+        self.assertEqual(result["records_created"], 3 * 31)
+        self.assertEqual(AttendanceCache.objects.count(), 3 * 31)
+
+        expected = AttendanceCacheService.build_attendance_grid(self.employee_ids, start, end)
+        cached = AttendanceCacheService.get_cached_attendance(self.employee_ids, start, end)
+        for employee_id in self.employee_ids:
+            expected_cells = {
+                day: statuses
+                for day, statuses in expected.get(employee_id, {}).items()
+                if start <= day <= end and statuses
+            }
+            self.assertEqual(cached.get(employee_id, {}), expected_cells)
+        self.assertEqual(cached[self.users[0].id][date(2024, 5, 22)][0]["status"], "P")
+
+        # A second run updates the same cells in place
+        result = AttendanceCacheService.calculate_and_store_attendance(
+            start, end, employee_ids=self.employee_ids
+        )
+        self.assertEqual((result["records_created"], result["records_updated"]), (0, 3 * 31))
+        self.assertEqual(AttendanceCache.objects.count(), 3 * 31)
+
+    @override_settings(ATTENDANCE_CACHE_SHARD_SIZE=2)
+    @patch.object(AttendanceCacheService, "queue_shards")
+    def test_parallel_run_records_each_shard(self, queue_shards):
+        start, end = date(2024, 5, 21), date(2024, 6, 20)
+        result = AttendanceCacheService.calculate_and_store_attendance(
+            start, end, employee_ids=self.employee_ids, parallel=True
+        )
+        self.assertEqual(result["shards"], 2)
+        log_entry, shards, periods = queue_shards.call_args.args
+        self.assertEqual(shards, [self.employee_ids[:2], self.employee_ids[2:]])
+        self.assertEqual(log_entry.status, "processing")
+
+        # What the chord runs on the workers
+        periods = [(period_start.isoformat(), period_end.isoformat()) for period_start, period_end in periods]
+        shard_timings = [store_attendance_cache_shard(shard, periods) for shard in shards]
+        finish_attendance_cache_log(shard_timings, log_entry.pk)
+
+        log_entry = AttendanceCacheLog.objects.get(pk=log_entry.pk)
+        self.assertEqual(log_entry.status, "completed")
+        self.assertEqual((log_entry.employees_processed, log_entry.records_created), (3, 3 * 31))
+        self.assertEqual([timing["employees"] for timing in log_entry.shard_timings], [2, 1])
+        self.assertEqual(log_entry.shard_timings[1]["records_created"], 31)
+        self.assertEqual(
+            AttendanceCache.objects.get(employee=self.users[0], date=date(2024, 5, 22)).status, "P"
+        )
+
+        # A failed shard is recorded and fails the run
+        with patch.object(AttendanceCacheService, "store_shard", side_effect=ValueError("boom")):
+            failed = store_attendance_cache_shard(shards[1], periods)
+        finish_attendance_cache_log([shard_timings[0], failed], log_entry.pk)
+        log_entry.refresh_from_db()
+        self.assertEqual((log_entry.status, log_entry.error_count, log_entry.error_message), ("failed", 1, "boom"))
+
+    def test_partial_or_unaligned_ranges_are_not_served(self):
+        start, end = date(2024, 5, 21), date(2024, 6, 20)
+        AttendanceCacheService.calculate_and_store_attendance(
+            start, end, employee_ids=self.employee_ids[:2]
+        )
+        self.assertIsNone(AttendanceCacheService.get_cached_attendance(self.employee_ids, start, end))
+        self.assertIsNone(
+            AttendanceCacheService.get_cached_attendance(self.employee_ids[:2], date(2024, 5, 1), date(2024, 5, 31))
+        )
+
+    @patch("hrms_app.tasks.recompute_stale_attendance_cache.apply_async")
+    def test_changes_mark_cells_stale_and_recompute_them(self, apply_async):
+        start, end = date(2024, 5, 21), date(2024, 6, 20)
+        AttendanceCacheService.calculate_and_store_attendance(start, end, employee_ids=self.employee_ids)
+        employee = self.users[2]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            AttendanceLog.objects.create(
+                applied_by=employee,
+                title="Attendance emp2",
+                slug="attendance-emp2-24",
+                start_date=make_aware(datetime(2024, 5, 24, 9, 30)),
+                end_date=make_aware(datetime(2024, 5, 24, 18, 0)),
+                att_status_short_code="P",
+                color_hex="#06B900",
+            )
+        stale = AttendanceCache.objects.filter(stale_since__isnull=False)
+        self.assertEqual(list(stale.values_list("employee_id", "date")), [(employee.id, date(2024, 5, 24))])
+        apply_async.assert_called_once()
+
+        result = AttendanceCacheService.recompute_stale_cells()
+        # Only the affected employee's period is rebuilt
+        self.assertEqual(result["records_updated"], 31)
+        self.assertFalse(stale.exists())
+        self.assertEqual(
+            AttendanceCache.objects.get(employee=employee, date=date(2024, 5, 24)).status, "P"
+        )
+
+    @patch("hrms_app.tasks.recompute_stale_attendance_cache.apply_async")
+    def test_edit_committing_during_a_recompute_stays_stale(self, apply_async):
+        start, end = date(2024, 5, 21), date(2024, 6, 20)
+        AttendanceCacheService.calculate_and_store_attendance(start, end, employee_ids=self.employee_ids)
+        employee = self.users[2]
+        AttendanceCache.objects.filter(employee=employee, date=date(2024, 5, 25)).update(
+            stale_since=make_aware(datetime(2024, 6, 1))
+        )
+        # What a recompute sees if it reads its inputs before the edit commits
+        old_grid = AttendanceCacheService.build_attendance_grid([employee.id], start, end)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            AttendanceLog.objects.create(
+                applied_by=employee,
+                title="Attendance emp2",
+                slug="attendance-emp2-24",
+                start_date=make_aware(datetime(2024, 5, 24, 9, 30)),
+                end_date=make_aware(datetime(2024, 5, 24, 18, 0)),
+                att_status_short_code="P",
+                color_hex="#06B900",
+            )
+            with patch.object(AttendanceCacheService, "build_attendance_grid", return_value=old_grid):
+                AttendanceCacheService.recompute_stale_cells()
+
+        cell = AttendanceCache.objects.get(employee=employee, date=date(2024, 5, 24))
+        self.assertIsNotNone(cell.stale_since)
+        AttendanceCacheService.recompute_stale_cells()
+        cell.refresh_from_db()
+        self.assertIsNone(cell.stale_since)
+        self.assertEqual(cell.status, "P")
+
+    def test_report_grid_merges_cached_and_mapped_employees(self):
+        start, end = date(2024, 5, 21), date(2024, 6, 20)
+        AttendanceCacheService.calculate_and_store_attendance(
+            start, end, employee_ids=self.employee_ids[:2]
+        )
+        AttendanceCache.objects.filter(employee=self.users[1], date=date(2024, 5, 23)).update(
+            status="X", metadata={"statuses": [{"status": "X", "color": "#000000"}]}, stale_since=make_aware(datetime(2024, 6, 1))
+        )
+
+        grid = AttendanceCacheService.get_attendance_grid(self.employee_ids, start, end)
+        # Stale and uncached employees are mapped again, fresh ones come from the cache
+        self.assertEqual(grid[self.users[1].id][date(2024, 5, 23)][0]["status"], "P")
+        self.assertIn(self.users[2].id, grid)
+        expected = AttendanceCacheService.build_attendance_grid(self.employee_ids, start, end)
+        self.assertEqual(
+            grid[self.users[0].id],
+            {day: statuses for day, statuses in expected[self.users[0].id].items() if start <= day <= end and statuses},
+        )
@@ -0,0 +1,32 @@
+from datetime import date
+from django.test import SimpleTestCase
+from hrms_app.utility.attendance_grid import AttendanceGrid
+from hrms_app.utility.attendance_mapper import AttendanceMapper
+
+
+class AttendanceGridTest(SimpleTestCase):
+    def setUp(self):
+        self.grid = AttendanceGrid(date(2024, 5, 1), date(2024, 5, 31), AttendanceMapper.STATUS_HIERARCHY)
+
+    def test_statuses_override_by_priority_and_empty_reads_as_absent(self):
+        day = date(2024, 5, 6)
+        self.assertEqual(self.grid.status_at(1, day), "A")
+        # An empty day ranks as "A", so "A" itself is not stored
+        self.assertFalse(self.grid.set_status(1, day, "A", "#f00"))
+        self.assertTrue(self.grid.set_status(1, day, "FL", "#FFD700"))
+        self.assertTrue(self.grid.set_status(1, day, "CL", "#a2a2a2"))
+        self.assertFalse(self.grid.set_status(1, day, "T", "#00f"))
+        self.assertEqual(self.grid.status_at(1, day), "CL")
+        self.assertEqual(int(self.grid.status_matrix()[0, 5]), self.grid.status_code("CL"))
+
+    def test_legacy_shape_keeps_row_order_and_days_outside_the_range(self):
+        self.grid.set_status(2, date(2024, 5, 2), "P", "#0f0")
+        self.grid.set_status(1, date(2024, 6, 1), "FL", "#FFD700")
+        self.grid.row(3)
+
+        legacy = self.grid.to_legacy()
+
+        self.assertEqual(list(legacy), [2, 1, 3])
+        self.assertEqual(legacy[2], {date(2024, 5, 2): [{"status": "P", "color": "#0f0"}]})
+        self.assertEqual(legacy[1], {date(2024, 6, 1): [{"status": "FL", "color": "#FFD700"}]})
+        self.assertEqual(legacy[3], {})
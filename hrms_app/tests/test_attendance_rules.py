@@ -0,0 +1,109 @@
+import random
+from datetime import date, timedelta
+from django.test import SimpleTestCase
+from hrms_app.utility.attendance_mapper import AttendanceMapper
+
+
+class _ScalarRules:
+    """The Sunday rules as they were written day by day, kept as the reference."""
+
+    def __init__(self, mapper):
+        self.mapper, self.grid = mapper, mapper.grid
+
+    def apply(self):
+        self.add_sundays()
+        self.saturday_lwp()
+        self.smart_sunday()
+
+    def add_sundays(self):
+        for employee_id in self.grid.employee_ids:
+            for sunday in self.mapper.sundays:
+                if not self.grid.has_status(employee_id, sunday):
+                    self.grid.put_status(employee_id, sunday, "OFF", "#CCCCCC")
+
+    def saturday_lwp(self):
+        for employee_id in self.grid.employee_ids:
+            outside = [day for day in self.grid.outside.get(employee_id, {}) if day.weekday() == 5]
+            for day in [day for day in self.grid.dates if day.weekday() == 5] + outside:
+                sunday = day + timedelta(days=1)
+                if self.grid.status_at(employee_id, day) == "LWP" and self.grid.has_status(employee_id, sunday):
+                    self.grid.set_status(employee_id, sunday, "LWP", "#a2a2a2")
+
+    def smart_sunday(self):
+        for employee_id in self.grid.employee_ids:
+            for day in self.grid.dates:
+                if day.weekday() == 6 and self.grid.status_at(employee_id, day) == "OFF":
+                    previous, following = self.nearby(employee_id, day, -1), self.nearby(employee_id, day, 1)
+                    if self.mapper._should_mark_absent(previous, following):
+                        self.grid.set_status(employee_id, day, "A", "#FF0000")
+
+    def nearby(self, employee_id, day, step, max_days=7):
+        check_date = day + timedelta(days=step)
+        for _ in range(max_days):
+            if not self.mapper.start_date <= check_date <= self.mapper.end_date:
+                break
+            if check_date.weekday() != 6:
+                status = self.grid.status_at(employee_id, check_date)
+                if status != "OFF":
+                    return status
+            check_date += timedelta(days=step)
+        return None
+
+
+class AttendanceRulesTest(SimpleTestCase):
+    STATUSES = ["P", "H", "A", "AWOL", "CL", "LWP", "LWP", "OFF", "FL", "T", "X"]
+
+    def _mappers(self, seed):
+        """Two mappers holding the same random base statuses."""
+        rnd = random.Random(seed)
+        start = date(2024, 4, 1) + timedelta(days=rnd.randint(0, 6))
+        end = start + timedelta(days=rnd.randint(0, 60))
+        days = [start + timedelta(days=i) for i in range(-2, (end - start).days + 3)]
+        cells = []
+        for employee_id in range(1, rnd.randint(2, 8)):
+            # Some employees are mostly OFF, which stretches the nearby-day lookups.
+            # OFF never outranks an empty day, so it is put in directly.
+            statuses = rnd.choice([self.STATUSES, ["OFF"] * 8 + ["P", "A", "LWP"]])
+            density = rnd.choice([0.1, 0.5, 0.95])
+            cells += [(employee_id, day, rnd.choice(statuses)) for day in days if rnd.random() < density]
+        mappers = AttendanceMapper(start, end), AttendanceMapper(start, end)
+        for mapper in mappers:
+            for employee_id, day, status in cells:
+                store = mapper.grid.put_status if status == "OFF" else mapper._set_status
+                store(employee_id, day, status, f"#{status}")
+        return mappers
+
+    def test_rule_passes_match_the_day_by_day_rules(self):
+        for seed in range(300):
+            with self.subTest(seed=seed):
+                mapper, reference = self._mappers(seed)
+                mapper._add_sundays()
+                mapper._apply_saturday_lwp_rule()
+                mapper._apply_smart_sunday_logic()
+                _ScalarRules(reference).apply()
+                self.assertEqual(mapper.grid.to_legacy(), reference.grid.to_legacy())
+
+    def test_sunday_rules(self):
+        # 2024-05-04 is a Saturday
+        mapper = AttendanceMapper(date(2024, 5, 1), date(2024, 5, 31))
+        entries = {
+            # Saturday LWP carries over to an OFF Sunday
+            1: {date(2024, 5, 4): "LWP", date(2024, 5, 6): "P"},
+            # Absent on both sides: the Sunday becomes A
+            2: {date(2024, 5, 11): "A", date(2024, 5, 13): "AWOL"},
+            # Present on one side: the Sunday stays OFF
+            3: {date(2024, 5, 18): "A", date(2024, 5, 20): "P"},
+        }
+        for employee_id, statuses in entries.items():
+            for day, status in statuses.items():
+                mapper._set_status(employee_id, day, status, "#000000")
+
+        mapper._add_sundays()
+        mapper._apply_saturday_lwp_rule()
+        mapper._apply_smart_sunday_logic()
+
+        self.assertEqual(mapper.grid.status_at(1, date(2024, 5, 5)), "LWP")
+        self.assertEqual(mapper.grid.status_at(2, date(2024, 5, 12)), "A")
+        self.assertEqual(mapper.grid.status_at(3, date(2024, 5, 19)), "OFF")
+        # Empty days read as absent, so a Sunday between them becomes A
+        self.assertEqual(mapper.grid.status_at(3, date(2024, 5, 26)), "A")
@@ -0,0 +1,85 @@
+from datetime import datetime
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.sites.models import Site
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import make_aware
+from hrms_app.manager.bulk_leave_manager import BulkLeaveApplicationManager
+from hrms_app.models import LeaveApplication, LeaveDay, LeaveLog, LeaveType, Notification
+
+
+class BulkLeaveManagerTest(TestCase):
+    def setUp(self):
+        self.leave_type = LeaveType.objects.create(leave_type="Casual Leave", leave_type_short_code="CL")
+        self.manager = get_user_model().objects.create(username="manager")
+        # Warm the per-process lookups so both runs issue the same statements
+        ContentType.objects.get_for_model(LeaveApplication)
+        Site.objects.get_current()
+
+    def _employees(self, count, prefix):
+        return [
+            get_user_model().objects.create(
+                username=f"{prefix}{i}", first_name="Same", last_name="Name", reports_to=self.manager
+            )
+            for i in range(count)
+        ]
+
+    def _create(self, employees):
+        # 2024-05-04 is a Saturday, so the period spans a Sunday
+        with self.captureOnCommitCallbacks() as callbacks:
+            with CaptureQueriesContext(connection) as queries:
+                result = BulkLeaveApplicationManager().create_bulk_leave_applications(
+                    leave_type=self.leave_type,
+                    start_date=datetime(2024, 5, 4),
+                    end_date=datetime(2024, 5, 6, 23, 59, 59),
+                    employee_ids=[employee.id for employee in employees],
+                    start_day_choice=settings.FULL_DAY,
+                    end_day_choice=settings.FIRST_HALF,
+                )
+        return result, len(queries), callbacks
+
+    def test_applications_are_created_in_a_constant_number_of_queries(self):
+        employees = self._employees(3, "emp")
+        # Existing pending leave overlapping the period; created without signals
+        LeaveApplication.objects.bulk_create([
+            LeaveApplication(
+                leave_type=self.leave_type,
+                applicationNo="Leave/Casual Leave/OLD1",
+                slug="same-name-2024-05-04-1",
+                appliedBy=employees[0],
+                startDate=make_aware(datetime(2024, 5, 5)),
+                endDate=make_aware(datetime(2024, 5, 5, 23, 59)),
+                usedLeave=1,
+                balanceLeave=0,
+                status=settings.PENDING,
+            )
+        ])
+
+        result, query_count, callbacks = self._create(employees)
+
+        self.assertEqual((result["success_count"], result["failed_count"]), (2, 0))
+        self.assertEqual([skipped["employee_id"] for skipped in result["skipped"]], [employees[0].id])
+        applications = LeaveApplication.objects.filter(appliedBy__in=employees[1:])
+        self.assertEqual(
+            sorted(applications.values_list("slug", flat=True)),
+            ["same-name-2024-05-04-1-1", "same-name-2024-05-04-1-2"],
+        )
+        self.assertEqual(len(set(applications.values_list("applicationNo", flat=True))), 2)
+        self.assertEqual(
+            list(
+                LeaveDay.objects.filter(leave_application=applications[0])
+                .order_by("date")
+                .values_list("date__day", "is_full_day")
+            ),
+            [(4, True), (5, True), (6, False)],
+        )
+        self.assertEqual(LeaveLog.objects.filter(leave_application__in=applications).count(), 2)
+        self.assertEqual(Notification.objects.filter(receiver=self.manager).count(), 2)
+        # Notifications are deferred to one task after commit
+        self.assertTrue(callbacks)
+
+        _, more_query_count, _ = self._create(self._employees(6, "more"))
+        self.assertEqual(more_query_count, query_count)
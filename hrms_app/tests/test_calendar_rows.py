@@ -0,0 +1,40 @@
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from django.test import SimpleTestCase
+from hrms_app.utility.attendance_mapper import AttendanceMapper
+
+
+def _entry(status, color="#000000"):
+    return [{"status": status, "color": color}]
+
+
+class CalendarRowsTest(SimpleTestCase):
+    def test_rows_are_aligned_to_days_with_neighbour_rule_applied(self):
+        employee, other = SimpleNamespace(id=1), SimpleNamespace(id=2)
+        attendance_data = {
+            1: {
+                date(2024, 5, 4): _entry("A"),
+                date(2024, 5, 5): _entry("OFF"),
+                date(2024, 5, 6): _entry("P"),
+                date(2024, 5, 7): _entry("P"),
+                date(2024, 5, 8): _entry("FL"),
+                date(2024, 5, 9): _entry("P"),
+                # Neighbour outside the displayed range still counts
+                date(2024, 5, 10): _entry("OFF"),
+            },
+        }
+        days = [datetime(2024, 5, 4) + timedelta(days=i) for i in range(7)]
+
+        rows = AttendanceMapper.build_calendar_rows(attendance_data, [employee, other], days)
+
+        self.assertEqual([row["employee"] for row in rows], [employee, other])
+        self.assertEqual([cell["date"] for cell in rows[0]["cells"]], [day.date() for day in days])
+        self.assertEqual(
+            [cell["statuses"][0]["status"] for cell in rows[0]["cells"]],
+            # A-OFF-P -> A, P-FL-P stays, OFF before a missing (absent) day -> A
+            ["A", "A", "P", "P", "FL", "P", "A"],
+        )
+        self.assertEqual(rows[0]["cells"][1]["statuses"][0]["color"], "#FF0000")
+        self.assertEqual(
+            {cell["statuses"][0]["status"] for cell in rows[1]["cells"]}, {"A"}
+        )
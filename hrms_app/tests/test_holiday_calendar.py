@@ -0,0 +1,44 @@
+from datetime import date
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TransactionTestCase
+from hrms_app.hrms.utils import get_non_working_days, is_holiday
+from hrms_app.models import Holiday
+from hrms_app.utility.attendance_mapper import get_holiday_logs
+
+
+class HolidayCalendarTest(TransactionTestCase):
+    # Outside a test transaction, so loaded calendars are actually stored
+    def setUp(self):
+        cache.clear()
+        self.alice, self.bob = (get_user_model().objects.create(username=name) for name in ("alice", "bob"))
+        self.labour_day = Holiday.objects.create(title="Labour Day", short_code="FL", start_date=date(2024, 5, 1), end_date=date(2024, 5, 1))
+        self.local = Holiday.objects.create(title="Local", short_code="FL", start_date=date(2024, 5, 10), end_date=date(2024, 5, 11))
+        self.local.applicable_users.add(self.alice)
+        self.new_year = Holiday.objects.create(title="New Year", short_code="FL", start_date=date(2024, 12, 31), end_date=date(2025, 1, 1))
+        self.new_year.applicable_users.add(self.alice, self.bob)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_holidays_and_their_users_come_from_one_cached_query(self):
+        with self.assertNumQueries(1):
+            holidays = get_holiday_logs(date(2024, 5, 1), date(2024, 12, 31), [self.bob.id])
+            get_holiday_logs(date(2024, 5, 1), date(2024, 12, 31))
+        self.assertEqual(holidays, [self.labour_day, self.new_year])
+        self.assertEqual(holidays[0].applicable_user_ids, frozenset())
+        self.assertEqual(holidays[1].applicable_user_ids, {self.alice.id, self.bob.id})
+
+        # A holiday running into the next year is in both calendars
+        self.assertEqual(get_holiday_logs(date(2025, 1, 1), date(2025, 1, 5)), [self.new_year])
+        self.assertEqual(get_holiday_logs(date(2024, 5, 11), date(2024, 5, 12)), [self.local])
+
+        self.local.applicable_users.add(self.bob)
+        self.assertEqual(get_holiday_logs(date(2024, 5, 1), date(2024, 5, 31), [self.bob.id]), [self.labour_day, self.local])
+
+    def test_non_working_days(self):
+        with self.assertNumQueries(1):
+            # 2024-05-05 is a Sunday; holidays count on the day they start
+            self.assertEqual(get_non_working_days(date(2024, 5, 1), date(2024, 5, 11)), 3)
+            self.assertTrue(is_holiday(date(2024, 5, 10)))
+            self.assertFalse(is_holiday(date(2024, 5, 11)))
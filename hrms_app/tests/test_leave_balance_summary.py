@@ -0,0 +1,85 @@
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TransactionTestCase
+from django.utils import timezone
+from hrms_app.admin import make_inactive
+from hrms_app.choices.leave import LeaveAccrualPeriod
+from hrms_app.models import LeaveApplication, LeaveBalanceOpenings, LeaveType
+from hrms_app.services.leave_balance_summary import get_leave_balance_summary
+
+
+class LeaveBalanceSummaryTest(TransactionTestCase):
+    # Outside a test transaction, so summaries are actually cached
+    def setUp(self):
+        cache.clear()
+        self.user, other = [get_user_model().objects.create(username=f"emp{i}") for i in range(2)]
+        self.casual = LeaveType.objects.create(
+            leave_type="Casual Leave", leave_type_short_code="CL", color_hex="#111111"
+        )
+        self.short = LeaveType.objects.create(
+            leave_type="Short Leave",
+            leave_type_short_code="STL",
+            accrual_period=LeaveAccrualPeriod.MONTHLY,
+            color_hex="#222222",
+        )
+        now = timezone.now()
+        self.casual_balance = LeaveBalanceOpenings.objects.create(
+            user=self.user, leave_type=self.casual, year=now.year, remaining_leave_balances=8
+        )
+        LeaveBalanceOpenings.objects.create(
+            user=self.user, leave_type=self.short, year=now.year, month=now.month, remaining_leave_balances=2
+        )
+        # No signals: the post_save receivers notify approvers
+        LeaveApplication.objects.bulk_create(
+            [
+                self._application(self.user, self.casual, settings.APPROVED, 2, now, "1"),
+                self._application(self.user, self.casual, settings.PENDING, 1, now, "2"),
+                self._application(self.user, self.casual, settings.REJECTED, 4, now, "3"),
+                self._application(other, self.casual, settings.APPROVED, 3, now, "4"),
+                self._application(self.user, self.short, settings.APPROVED, 0.5, now, "5"),
+                self._application(self.user, self.short, settings.APPROVED, 0.5, now - timedelta(days=40), "6"),
+            ]
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    def _application(self, user, leave_type, status, days, end, number):
+        return LeaveApplication(
+            leave_type=leave_type,
+            applicationNo=f"APP00{number}",
+            slug=f"app00{number}",
+            appliedBy=user,
+            startDate=end,
+            endDate=end,
+            usedLeave=days,
+            balanceLeave=0,
+            reason="Test leave",
+            status=status,
+        )
+
+    def test_summary_is_one_query_and_cached_until_balances_change(self):
+        with self.assertNumQueries(3):  # leave types, balances with usage, personal details
+            summary = get_leave_balance_summary(self.user)
+
+        rows = {row["leave_type"].leave_type_short_code: row for row in summary}
+        self.assertEqual(list(rows), ["CL", "STL"])
+        self.assertEqual(
+            (rows["CL"]["used_leave"], rows["CL"]["on_hold"], rows["CL"]["total_balance"]), (2, 1, 7)
+        )
+        # Monthly leave only counts the current month
+        self.assertEqual((rows["STL"]["used_leave"], rows["STL"]["on_hold"]), (0.5, 0))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_leave_balance_summary(self.user), summary)
+
+        self.casual_balance.remaining_leave_balances = 5
+        self.casual_balance.save()
+        self.assertEqual(get_leave_balance_summary(self.user)[0]["total_balance"], 4)
+
+    def test_admin_activation_drops_the_cached_summary(self):
+        summary = get_leave_balance_summary(self.user)
+        make_inactive(None, None, LeaveBalanceOpenings.objects.filter(is_active=True, leave_type=self.casual))
+        self.assertNotEqual(get_leave_balance_summary(self.user), summary)
@@ -0,0 +1,98 @@
+from datetime import date, datetime, time
+from types import SimpleNamespace
+import pytz
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.conf import settings
+from hrms_app.management.commands.pop_att import AttendanceLogCreator, Command, IngestionLookups
+from hrms_app.models import (
+    AttendanceLog,
+    AttendanceSetting,
+    AttendanceStatusColor,
+    EmployeeShift,
+    LockStatus,
+    ShiftTiming,
+)
+
+
+class _Classifier:
+    def __init__(self, att_status="Present"):
+        self.att_status = att_status
+
+    def classify(self, logins, *args):
+        return [(self.att_status, "#00ff00", None, False, None, None, None, "Pending", "P")] * len(logins)
+
+
+class PopAttUpsertTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(
+            username="emp1", first_name="Test", last_name="Employee"
+        )
+        self.command = Command()
+        self.log_creator = AttendanceLogCreator(pytz.timezone("Asia/Kolkata"))
+        self.punches = {
+            date(2024, 5, 1): [datetime(2024, 5, 1, 9, 0), datetime(2024, 5, 1, 18, 0)],
+            date(2024, 5, 2): [datetime(2024, 5, 2, 9, 30), datetime(2024, 5, 2, 18, 0)],
+        }
+
+    def _run(self, classifier, users=None):
+        users = users or [self.user]
+        existing_logs = self.command.get_existing_logs(
+            users, {None: {"E1": self.punches}}
+        )
+        punch_days = []
+        for user in users:
+            punch_days += self.command.process_user_attendance(
+                user, SimpleNamespace(), self.punches, existing_logs
+            )
+        logs = self.command.build_logs(punch_days, classifier, self.log_creator)
+        return self.command.upsert_logs(logs, existing_logs)
+
+    def test_rerun_is_idempotent(self):
+        self.assertEqual(self._run(_Classifier()), (2, 0, 0, 0))
+        self.assertEqual(self._run(_Classifier()), (0, 0, 2, 0))
+        self.assertEqual(AttendanceLog.objects.count(), 2)
+
+    def test_same_named_employees_keep_their_own_logs(self):
+        namesake = get_user_model().objects.create(
+            username="emp2", first_name="Test", last_name="Employee"
+        )
+        self._run(_Classifier())
+        self.assertEqual(self._run(_Classifier("Half Day"), users=[namesake]), (2, 0, 0, 0))
+        self.assertEqual(AttendanceLog.objects.filter(applied_by=self.user, att_status="Present").count(), 2)
+        self.assertEqual(AttendanceLog.objects.filter(applied_by=namesake, att_status="Half Day").count(), 2)
+
+    def test_changed_status_updates_in_place(self):
+        self._run(_Classifier())
+        self.assertEqual(self._run(_Classifier("Half Day")), (0, 2, 0, 0))
+        self.assertEqual(AttendanceLog.objects.count(), 2)
+        self.assertFalse(AttendanceLog.objects.exclude(att_status="Half Day").exists())
+
+    def test_locked_period_is_not_rewritten(self):
+        self._run(_Classifier())
+        LockStatus.objects.create(is_locked="locked", from_date=date(2024, 5, 1), to_date=date(2024, 5, 1))
+        self.assertEqual(self._run(_Classifier("Half Day")), (0, 1, 0, 1))
+        self.assertEqual(
+            dict(AttendanceLog.objects.values_list("start_date__date", "att_status")),
+            {date(2024, 5, 1): "Present", date(2024, 5, 2): "Half Day"},
+        )
+
+
+class IngestionLookupsTest(TestCase):
+    def test_query_count_does_not_grow_with_users(self):
+        for status in (settings.HALF_DAY, settings.PRESENT, settings.ABSENT):
+            AttendanceStatusColor.objects.create(status=status, color=status, color_hex="#000000")
+        AttendanceSetting.objects.create()
+        shift = ShiftTiming.objects.create(
+            start_time=time(9, 30), end_time=time(17, 30),
+            grace_start_time=time(9, 45), grace_end_time=time(17, 45),
+        )
+        # The post_save signal assigns the default shift to each new user
+        users = [get_user_model().objects.create(username=f"emp{i}") for i in range(5)]
+        self.assertEqual(EmployeeShift.objects.count(), 5)
+
+        # Colors, setting and shifts; no device locations means no device query
+        with self.assertNumQueries(3):
+            lookups = IngestionLookups(users)
+        self.assertEqual(lookups.shifts, {user.id: shift for user in users})
+        self.assertEqual(lookups.present_color.status, settings.PRESENT)
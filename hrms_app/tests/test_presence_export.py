@@ -0,0 +1,120 @@
+import io
+from datetime import date, datetime
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import make_aware
+import openpyxl
+import pandas as pd
+from unittest.mock import patch
+from hrms_app.models import AttendanceLog, AttendanceLogHistory, Department, Designation, OfficeLocation, PersonalDetails
+from hrms_app.utility import report_utils
+from hrms_app.utility.report_utils import (
+    generate_monthly_presence_data_detailed,
+    get_monthly_presence_html_table,
+    iter_monthly_presence_rows,
+    write_monthly_presence_xlsx,
+)
+
+
+class PresenceExportTest(TestCase):
+    def setUp(self):
+        department = Department.objects.create(department="Operations", slug="operations")
+        designation = Designation.objects.create(
+            department=department, designation="Operator", slug="operator"
+        )
+        for i, code in enumerate(("101", "102")):
+            user = get_user_model().objects.create(username=f"emp{i}", first_name=f"Emp{i}")
+            PersonalDetails.objects.create(
+                user=user, employee_code=code, doj=date(2020, 1, 1), designation=designation,
+                mobile_number=f"80000000{i}", official_mobile_number=f"90000000{i}",
+            )
+        self.user = user
+        AttendanceLog.objects.create(
+            applied_by=user,
+            title="Attendance emp1",
+            slug="attendance-emp1",
+            start_date=make_aware(datetime(2024, 5, 2, 9, 30)),
+            end_date=make_aware(datetime(2024, 5, 2, 18, 0)),
+            att_status_short_code="P",
+            color_hex="#06B900",
+        )
+        self.args = (date(2024, 5, 1), date(2024, 5, 7), True, None, "")
+
+    def test_xlsx_matches_html_round_trip(self):
+        expected = pd.read_html(io.StringIO(get_monthly_presence_html_table(*self.args)))[0]
+        expected = expected.astype(object).where(expected.notna(), None)
+
+        output = io.BytesIO()
+        write_monthly_presence_xlsx(output, iter_monthly_presence_rows(*self.args))
+        output.seek(0)
+        sheet = openpyxl.load_workbook(output).active
+        header, *rows = [list(row) for row in sheet.iter_rows(values_only=True)]
+
+        self.assertEqual(header, list(expected.columns))
+        # The trailing blank separator row is not materialised by openpyxl
+        expected_rows = [[None if v is None else str(v) for v in row] for row in expected.values.tolist()]
+        self.assertEqual(rows, expected_rows[: len(rows)])
+        self.assertEqual(len(rows), 2 * 8 - 1)
+        self.assertEqual(rows[8][:3], ["KMPCL-102", "Emp1", "Status"])
+
+    def test_chunked_rows_match_single_pass(self):
+        self.assertEqual(
+            list(iter_monthly_presence_rows(*self.args, chunk_size=1)),
+            list(iter_monthly_presence_rows(*self.args)),
+        )
+
+    def test_location_filter_applies_before_chunking(self):
+        office = OfficeLocation.objects.create(
+            location_name="Head Office", office_type="head_office", address="Main Road", latitude=0, longitude=0
+        )
+        get_user_model().objects.filter(pk=self.user.pk).update(device_location=office)
+        args = self.args[:3] + (OfficeLocation.objects.filter(pk=office.pk), "")
+        with patch.object(
+            report_utils,
+            "generate_monthly_presence_data_detailed",
+            wraps=generate_monthly_presence_data_detailed,
+        ) as generate:
+            header, *rows = iter_monthly_presence_rows(*args, chunk_size=1)
+        self.assertEqual({row[0] for row in rows if row[0]}, {"KMPCL-102"})
+        self.assertEqual(generate.call_count, 1)
+
+    def _add_backend_regularization(self, day):
+        log = AttendanceLog.objects.create(
+            applied_by=self.user,
+            title=f"Regularized {day}",
+            slug=f"regularized-{day}",
+            start_date=make_aware(datetime(2024, 5, day, 9, 30)),
+            end_date=make_aware(datetime(2024, 5, day, 18, 0)),
+            att_status_short_code="P",
+            color_hex="#06B900",
+            regularized_backend=True,
+        )
+        for minute, modified_at in ((5, datetime(2024, 5, day, 20)), (45, datetime(2024, 5, day, 21))):
+            history = AttendanceLogHistory.objects.create(
+                attendance_log=log,
+                previous_data={
+                    "start_date": f"2024-05-{day:02d}T04:{minute:02d}:00Z",
+                    "end_date": f"2024-05-{day:02d}T12:{minute:02d}:00Z",
+                    "att_status_short_code": "H",
+                    "duration": "8:00",
+                },
+            )
+            AttendanceLogHistory.objects.filter(pk=history.pk).update(modified_at=make_aware(modified_at))
+
+    def test_backend_regularizations_use_a_constant_number_of_queries(self):
+        self._add_backend_regularization(3)
+        with CaptureQueriesContext(connection) as single:
+            data = generate_monthly_presence_data_detailed(*self.args)
+        # The earliest history entry holds the punches before regularization
+        self.assertEqual(
+            data["102"]["2024-05-03"]["present"],
+            {"status": "H", "in_time": "09:35", "out_time": "05:35", "total_duration": "8:00", "reg": "R"},
+        )
+
+        self._add_backend_regularization(4)
+        self._add_backend_regularization(5)
+        with CaptureQueriesContext(connection) as several:
+            generate_monthly_presence_data_detailed(*self.args)
+        self.assertEqual(len(several), len(single))
@@ -0,0 +1,37 @@
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import patch
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from django.utils.timezone import localtime
+from hrms_app.hrms.device_fetch import STATUS_OK, STATUS_TIMEOUT
+from hrms_app.services.punch_cache import get_today_check_in_out, refresh_device_punches
+
+
+class PunchCacheTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.device = SimpleNamespace(pk=7)
+        today = localtime().date()
+        self.punches = [datetime.combine(today, datetime.min.time()).replace(hour=hour) for hour in (9, 13, 18)]
+
+    def tearDown(self):
+        cache.clear()
+
+    def _refresh(self, status, data=None):
+        result = {"status": status, "data": data}
+        with patch("hrms_app.services.punch_cache.DeviceFetchEngine.fetch_all", return_value={7: result}):
+            refresh_device_punches([self.device])
+
+    def test_page_reads_come_from_the_last_refresh(self):
+        self.assertEqual(get_today_check_in_out(7, "101"), (None, None))
+
+        self._refresh(STATUS_OK, {"101": {self.punches[0].date(): self.punches}})
+        with patch("hrms_app.services.punch_cache.DeviceFetchEngine.fetch_all") as fetch_all:
+            self.assertEqual(get_today_check_in_out(7, "101"), (self.punches[0], self.punches[-1]))
+            self.assertEqual(get_today_check_in_out(7, "102"), (None, None))
+        fetch_all.assert_not_called()
+
+        # A failed refresh keeps the previous punches
+        self._refresh(STATUS_TIMEOUT)
+        self.assertEqual(get_today_check_in_out(7, "101"), (self.punches[0], self.punches[-1]))
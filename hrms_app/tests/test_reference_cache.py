@@ -0,0 +1,70 @@
+from datetime import date
+from django.core.cache import cache
+from django.contrib.admin.sites import site
+from django.test import RequestFactory, TransactionTestCase
+from hrms_app.admin import LeaveTypeAdmin
+from hrms_app.models import LeaveType
+from hrms_app.models_leave_policy_config import LeavePolicyConfig
+from hrms_app.services.reference_cache import get_leave_type, get_leave_types
+
+
+class ReferenceCacheTest(TransactionTestCase):
+    # Outside a test transaction, so loaded values are actually stored
+    def setUp(self):
+        cache.clear()
+        self.casual = LeaveType.objects.create(
+            leave_type="Casual Leave", leave_type_short_code="CL", allowed_days_per_year=10
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_reads_are_cached_until_the_model_changes(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(get_leave_types(), [self.casual])
+            self.assertEqual(get_leave_type(str(self.casual.pk)), self.casual)
+
+        earned = LeaveType.objects.create(
+            leave_type="Earned Leave", leave_type_short_code="EL", allowed_days_per_year=20
+        )
+        with self.assertNumQueries(1):
+            self.assertEqual(get_leave_type(earned.pk), earned)
+
+        earned_pk = earned.pk
+        earned.delete()
+        self.assertIsNone(get_leave_type(earned_pk))
+
+    def test_admin_restriction_actions_refresh_the_cache(self):
+        self.assertFalse(get_leave_type(self.casual.pk).consecutive_restriction)
+        model_admin = LeaveTypeAdmin(LeaveType, site)
+        model_admin.message_user = lambda *args, **kwargs: None
+        queryset = LeaveType.objects.filter(pk=self.casual.pk)
+
+        model_admin.enable_consecutive_restriction(RequestFactory().post("/"), queryset)
+        self.assertTrue(get_leave_type(self.casual.pk).consecutive_restriction)
+        model_admin.disable_consecutive_restriction(RequestFactory().post("/"), queryset)
+        self.assertFalse(get_leave_types()[0].consecutive_restriction)
+
+    def test_unknown_leave_type(self):
+        self.assertIsNone(get_leave_type("not-a-pk"))
+        self.assertIsNone(get_leave_type(self.casual.pk + 1))
+
+    def test_active_policy_resolves_from_the_interval_index(self):
+        old = LeavePolicyConfig.objects.create(
+            leave_type=self.casual,
+            effective_from=date(2024, 1, 1),
+            effective_to=date(2024, 3, 31),
+            annual_entitlement=10,
+        )
+        LeavePolicyConfig.get_active_policy(self.casual, date(2024, 2, 1))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(LeavePolicyConfig.get_active_policy(self.casual, date(2024, 3, 31)), old)
+            self.assertIsNone(LeavePolicyConfig.get_active_policy(self.casual, date(2023, 12, 31)))
+            self.assertIsNone(LeavePolicyConfig.get_active_policy(self.casual, date(2024, 4, 1)))
+
+        new = LeavePolicyConfig.objects.create(
+            leave_type=self.casual, effective_from=date(2024, 4, 1), annual_entitlement=12
+        )
+        self.assertEqual(LeavePolicyConfig.get_active_policy(self.casual, date(2030, 1, 1)), new)
+        self.assertEqual(LeavePolicyConfig.get_active_policy(self.casual.pk, date(2024, 1, 1)), old)
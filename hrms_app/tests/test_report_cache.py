@@ -0,0 +1,62 @@
+from datetime import datetime
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+from django.utils.timezone import make_aware
+from hrms_app.models import AttendanceLog, OfficeLocation
+from hrms_app.services import AttendanceRevision
+from hrms_app.views.report_view import DetailedMonthlyPresenceView
+
+
+class ReportCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        # Inactive, so the active-only report has no rows to render
+        self.user = get_user_model().objects.create(username="hr", is_active=False)
+        self.location = OfficeLocation.objects.create(location_name="HQ", office_type="HO")
+
+    def _export(self, **headers):
+        request = RequestFactory().get(
+            "/",
+            {
+                "export": "csv",
+                "from_date": "2024-05-01",
+                "to_date": "2024-05-03",
+                "active": "True",
+                "location": [self.location.pk],
+            },
+            **headers,
+        )
+        request.user = self.user
+        return DetailedMonthlyPresenceView.as_view()(request)
+
+    def _add_log(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            AttendanceLog.objects.create(
+                applied_by=self.user,
+                title="Attendance hr",
+                slug="attendance-hr",
+                start_date=make_aware(datetime(2024, 5, 2, 9, 30)),
+                end_date=make_aware(datetime(2024, 5, 2, 18, 0)),
+                att_status_short_code="P",
+                color_hex="#06B900",
+            )
+
+    def test_attendance_changes_bump_the_revision_after_commit(self):
+        revision = AttendanceRevision.current()
+        key = AttendanceRevision.make_key("report", from_date="2024-05-01")
+        self._add_log()
+        self.assertGreater(AttendanceRevision.current(), revision)
+        self.assertNotEqual(AttendanceRevision.make_key("report", from_date="2024-05-01"), key)
+
+    def test_repeat_export_is_not_modified_until_data_changes(self):
+        response = self._export()
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+
+        self.assertEqual(self._export(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self._add_log()
+        response = self._export(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
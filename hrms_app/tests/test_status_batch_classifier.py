@@ -0,0 +1,72 @@
+import random
+from datetime import datetime, time, timedelta
+from types import SimpleNamespace
+import pytz
+from django.test import SimpleTestCase
+from hrms_app.hrms.managers import AttendanceStatusBatchClassifier, AttendanceStatusHandler
+
+
+class StatusBatchClassifierParityTest(SimpleTestCase):
+    def setUp(self):
+        self.colors = (
+            SimpleNamespace(color_hex="#ffa500"),
+            SimpleNamespace(color_hex="#00ff00"),
+            SimpleNamespace(color_hex="#ff0000"),
+        )
+        self.shifts = [
+            SimpleNamespace(grace_start_time=time(9, 45), grace_end_time=time(17, 45), end_time=time(17, 30)),
+            SimpleNamespace(grace_start_time=time(10, 15), grace_end_time=time(18, 15), end_time=time(18, 30)),
+            SimpleNamespace(grace_start_time=time(6, 15), grace_end_time=time(14, 0), end_time=time(14, 30)),
+        ]
+
+    def _rows(self, count, aware):
+        rng = random.Random(42)
+        kolkata = pytz.timezone("Asia/Kolkata")
+        rows = []
+        for _ in range(count):
+            login = datetime(2024, 5, 1) + timedelta(
+                days=rng.randint(0, 30), minutes=rng.randint(5 * 60, 13 * 60), seconds=rng.choice([0, rng.randint(0, 59)])
+            )
+            logout = login + timedelta(minutes=rng.choice([0, rng.randint(0, 13 * 60)]))
+            if aware:
+                login, logout = kolkata.localize(login), kolkata.localize(logout)
+            rows.append((login, logout, logout - login, rng.choice(self.shifts)))
+        return rows
+
+    def _scalar(self, row, full_day_hours):
+        login, logout, duration, shift = row
+        expected_logout = login + timedelta(hours=full_day_hours)
+        return AttendanceStatusHandler(shift, full_day_hours, *self.colors).determine_attendance_status(
+            login, logout, duration, expected_logout.time(), expected_logout
+        )
+
+    def _assert_parity(self, rows, full_day_hours=8):
+        classifier = AttendanceStatusBatchClassifier(full_day_hours, *self.colors)
+        batch = classifier.classify(
+            [row[0] for row in rows], [row[1] for row in rows], [row[3] for row in rows], [row[2] for row in rows]
+        )
+        for row, result in zip(rows, batch):
+            self.assertEqual(result, self._scalar(row, full_day_hours), msg=f"{row[0]} -> {row[1]}")
+
+    def test_matches_scalar_handler_for_naive_punches(self):
+        self._assert_parity(self._rows(2000, aware=False))
+
+    def test_matches_scalar_handler_for_aware_punches(self):
+        self._assert_parity(self._rows(2000, aware=True))
+
+    def test_matches_scalar_handler_for_other_timezones(self):
+        utc_rows = []
+        for login, logout, duration, shift in self._rows(300, aware=True):
+            row = (login.astimezone(pytz.utc), logout.astimezone(pytz.utc), duration, shift)
+            try:
+                self._scalar(row, 8)
+            except OverflowError:
+                # Negative regularization windows fail the same way in both paths
+                with self.assertRaises(OverflowError):
+                    AttendanceStatusBatchClassifier(8, *self.colors).classify([row[0]], [row[1]], [shift], [duration])
+                continue
+            utc_rows.append(row)
+        self._assert_parity(utc_rows)
+
+    def test_empty_batch(self):
+        self.assertEqual(AttendanceStatusBatchClassifier(8, *self.colors).classify([], [], []), [])
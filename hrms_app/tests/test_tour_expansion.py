@@ -0,0 +1,50 @@
+from datetime import date, datetime, time
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils.timezone import make_aware
+from hrms_app.models import AttendanceLog, UserTour
+from hrms_app.utility.report_utils import expand_tours
+
+
+class TourExpansionTest(TestCase):
+    def setUp(self):
+        self.users = [get_user_model().objects.create(username=f"emp{i}") for i in range(2)]
+        # Only the second employee worked on the tour day
+        AttendanceLog.objects.create(
+            applied_by=self.users[1],
+            title="Attendance emp1",
+            slug="attendance-emp1",
+            start_date=make_aware(datetime(2024, 5, 2, 9, 0)),
+            end_date=make_aware(datetime(2024, 5, 2, 16, 0)),
+            duration=time(7, 0),
+            att_status_short_code="P",
+            color_hex="#06B900",
+        )
+
+    def _tour(self, user):
+        return UserTour(
+            applied_by=user,
+            start_date=date(2024, 5, 2),
+            start_time=time(18, 0),
+            end_date=date(2024, 5, 3),
+            end_time=time(12, 0),
+        )
+
+    def test_log_durations_are_matched_per_employee(self):
+        tours = [self._tour(user) for user in self.users]
+        with self.assertNumQueries(1):
+            expanded = [(tour.applied_by_id, days) for tour, days in expand_tours(tours)]
+
+        codes = {
+            employee_id: [(day, code) for day, code, _ in days] for employee_id, days in expanded
+        }
+        self.assertEqual(
+            codes[self.users[0].id], [(date(2024, 5, 2), "TH"), (date(2024, 5, 3), "T")]
+        )
+        self.assertEqual(
+            codes[self.users[1].id], [(date(2024, 5, 2), "T"), (date(2024, 5, 3), "T")]
+        )
+
+    def test_no_tours_no_queries(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(list(expand_tours([])), [])
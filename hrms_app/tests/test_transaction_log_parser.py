@@ -0,0 +1,54 @@
+from datetime import date, datetime
+from django.test import SimpleTestCase
+from hrms_app.hrms.utils import parse_punch_time, parse_transactions_log
+
+
+def _envelope(lines):
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        '<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">'
+        "<soap:Body><GetTransactionsLogResponse xmlns=\"http://tempuri.org/\">"
+        "<GetTransactionsLogResult>ok</GetTransactionsLogResult>"
+        f"<strDataList>{chr(10).join(lines)}</strDataList>"
+        "</GetTransactionsLogResponse></soap:Body></soap:Envelope>"
+    ).encode()
+
+
+class TransactionLogParserTest(SimpleTestCase):
+    def test_chunked_stream_matches_whole_payload(self):
+        payload = _envelope(
+            [
+                "101 2024-05-01 09:01:12",
+                "101 2024-05-01 18:10:45",
+                "202 2024-05-02 09:30:00",
+                "broken",
+            ]
+        )
+        whole = parse_transactions_log(payload, include_seconds=True)
+        # Chunks small enough to split lines and tags across boundaries
+        chunked = parse_transactions_log(
+            (payload[i:i + 7] for i in range(0, len(payload), 7)), include_seconds=True
+        )
+        self.assertEqual(
+            {k: dict(v) for k, v in whole.items()},
+            {k: dict(v) for k, v in chunked.items()},
+        )
+        self.assertEqual(
+            whole["101"][date(2024, 5, 1)],
+            [datetime(2024, 5, 1, 9, 1, 12), datetime(2024, 5, 1, 18, 10, 45)],
+        )
+        self.assertNotIn("broken", whole)
+
+    def test_seconds_dropped_when_device_excludes_them(self):
+        self.assertEqual(
+            parse_punch_time("2024-05-01 09:01:59", include_seconds=False),
+            datetime(2024, 5, 1, 9, 1),
+        )
+
+    def test_invalid_timestamp_raises_like_strptime(self):
+        with self.assertRaises(ValueError):
+            parse_punch_time("2024-02-30 10:00:00", include_seconds=True)
+
+    def test_missing_data_list_is_an_error(self):
+        with self.assertRaises(ValueError):
+            parse_transactions_log(b"<root><other/></root>", include_seconds=False)
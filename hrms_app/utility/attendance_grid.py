@@ -0,0 +1,184 @@
+from array import array
+from collections import defaultdict
+from datetime import timedelta
+
+import numpy as np
+
+
+class AttendanceGrid:
+    """
+    Compact attendance state behind ``AttendanceMapper``.
+
+    Each employee is a row of a dense ``employees x days`` matrix of
+    unsigned 16-bit ints, indexed by day offset from ``start_date``. A cell
+    holds a small-int status code, and a parallel matrix holds a colour id.
+    Status strings and colours are interned once into code tables, and each
+    status code carries its priority, so overriding a cell is an integer
+    compare. The matrices are flat ``array('H')`` buffers, which keeps
+    per-cell access fast. ``status_matrix`` and ``color_matrix`` expose them
+    to NumPy without copying.
+
+    Code 0 means "no status". It ranks like ``empty_status`` ("A"), because
+    the mapper has always treated an empty day as absent when deciding
+    overrides. Days outside the range are rare: tours and holidays can run
+    past the end of the period. Those are kept in a small per-employee dict,
+    so nothing is dropped.
+
+    ``to_legacy`` converts to the ``{employee_id: {date: [{"status",
+    "color"}]}}`` shape the rest of the app consumes. Only the edge of the
+    mapper should call it.
+    """
+
+    EMPTY = 0
+
+    def __init__(self, start_date, end_date, priorities, empty_status="A"):
+        self.start_date = start_date
+        self.total_days = (end_date - start_date).days + 1
+        self.dates = [start_date + timedelta(days=i) for i in range(self.total_days)]
+        self.offsets = {date: offset for offset, date in enumerate(self.dates)}
+        self.empty_status = empty_status
+
+        self._priority_table = priorities
+        self.statuses = [None]
+        self.priorities = [priorities.get(empty_status, 0)]
+        self.status_codes = {}
+        self.colors = [None]
+        self.color_ids = {}
+
+        # Rows are handed out in first-seen order, which callers rely on
+        self.rows = {}
+        self.codes = array("H")
+        self.color_index = array("H")
+        self._empty_row = array("H", bytes(2 * self.total_days))
+        self.outside = defaultdict(dict)
+
+    # ------------------------------------------------------------------
+    # Interning
+    # ------------------------------------------------------------------
+
+    def status_code(self, status):
+        code = self.status_codes.get(status)
+        if code is None:
+            code = self.status_codes[status] = len(self.statuses)
+            self.statuses.append(status)
+            self.priorities.append(self._priority_table.get(status, 0))
+        return code
+
+    def color_id(self, color):
+        color_id = self.color_ids.get(color)
+        if color_id is None:
+            color_id = self.color_ids[color] = len(self.colors)
+            self.colors.append(color)
+        return color_id
+
+    # ------------------------------------------------------------------
+    # Rows
+    # ------------------------------------------------------------------
+
+    def row(self, employee_id):
+        """The employee's row, allocated (empty) on first use."""
+        row = self.rows.get(employee_id)
+        if row is None:
+            row = self.rows[employee_id] = len(self.rows)
+            self.codes.extend(self._empty_row)
+            self.color_index.extend(self._empty_row)
+        return row
+
+    @property
+    def employee_ids(self):
+        return list(self.rows)
+
+    # ------------------------------------------------------------------
+    # Cells
+    # ------------------------------------------------------------------
+
+    def code_at(self, employee_id, date):
+        offset = self.offsets.get(date)
+        if offset is None:
+            return self.outside.get(employee_id, {}).get(date, (self.EMPTY, 0))[0]
+        row = self.rows.get(employee_id)
+        return self.EMPTY if row is None else self.codes[row * self.total_days + offset]
+
+    def status_at(self, employee_id, date):
+        """The day's status, with no status read as ``empty_status``."""
+        return self.statuses[self.code_at(employee_id, date)] or self.empty_status
+
+    def has_status(self, employee_id, date):
+        return self.code_at(employee_id, date) != self.EMPTY
+
+    def set_status(self, employee_id, date, status, color):
+        """Store the status if it outranks the day's current one; returns whether it did."""
+        row = self.row(employee_id)
+        code = self.status_code(status)
+        offset = self.offsets.get(date)
+        if offset is None:
+            cells = self.outside[employee_id]
+            if self.priorities[code] > self.priorities[cells.get(date, (self.EMPTY, 0))[0]]:
+                cells[date] = (code, self.color_id(color))
+                return True
+            return False
+        index = row * self.total_days + offset
+        if self.priorities[code] > self.priorities[self.codes[index]]:
+            self.codes[index] = code
+            self.color_index[index] = self.color_id(color)
+            return True
+        return False
+
+    def put_status(self, employee_id, date, status, color):
+        """Store the status regardless of priority."""
+        row = self.row(employee_id)
+        code, color_id = self.status_code(status), self.color_id(color)
+        offset = self.offsets.get(date)
+        if offset is None:
+            self.outside[employee_id][date] = (code, color_id)
+        else:
+            index = row * self.total_days + offset
+            self.codes[index] = code
+            self.color_index[index] = color_id
+
+    # ------------------------------------------------------------------
+    # NumPy views
+    # ------------------------------------------------------------------
+
+    def status_matrix(self):
+        """
+        Writable ``(employees, days)`` NumPy view of the status codes, rows in
+        ``employee_ids`` order. No rows can be added while a view is alive.
+        """
+        return np.frombuffer(self.codes, dtype=np.uint16).reshape(len(self.rows), self.total_days)
+
+    def color_matrix(self):
+        """Writable NumPy view of the colour ids, shaped like ``status_matrix``."""
+        return np.frombuffer(self.color_index, dtype=np.uint16).reshape(len(self.rows), self.total_days)
+
+    def weekday_columns(self, weekday):
+        """Column offsets of the days in range that fall on ``weekday``."""
+        return np.array([offset for offset, date in enumerate(self.dates) if date.weekday() == weekday], dtype=np.intp)
+
+    # ------------------------------------------------------------------
+    # Edge conversion
+    # ------------------------------------------------------------------
+
+    def to_legacy(self):
+        """``{employee_id: defaultdict(list, {date: [{"status", "color"}]})}`` with only days that have a status."""
+        data = {}
+        total_days = self.total_days
+        for employee_id, row in self.rows.items():
+            cells = defaultdict(list)
+            start = row * total_days
+            codes = self.codes[start:start + total_days]
+            color_ids = self.color_index[start:start + total_days]
+            for offset, code in enumerate(codes):
+                if code:
+                    cells[self.dates[offset]] = [
+                        {"status": self.statuses[code], "color": self.colors[color_ids[offset]]}
+                    ]
+            for date, (code, color_id) in self.outside.get(employee_id, {}).items():
+                cells[date] = [{"status": self.statuses[code], "color": self.colors[color_id]}]
+            data[employee_id] = cells
+        return data
+
+    @property
+    def nbytes(self):
+        """Memory held by the dense matrices."""
+        return (len(self.codes) + len(self.color_index)) * self.codes.itemsize
@@ -1,15 +1,15 @@
-from collections import defaultdict
 from datetime import timedelta
+import numpy as np
 from django.utils.timezone import localtime
-from django.db.models import Count, Q
+from hrms_app.services.holiday_calendar import get_holidays
 from django.conf import settings
 from hrms_app.models import (
-    Holiday,
     AttendanceLog,
     LeaveDay,
     UserTour
 )
-from .report_utils import calculate_daily_tour_durations
+from .attendance_grid import AttendanceGrid
+from .report_utils import expand_tours
 
 
 
@@ -52,12 +52,17 @@ class AttendanceMapper:
     WORKING_STATUSES = {"P", "L", "CL", "CLH", "CO", "SL", "SLH", "STL", "ML", "EL", "LWP", "PAT", "PATH", "FL", "H", "T"}
     ABSENT_STATUSES = {"A", "LWP", "AWOL"}
 
+    # Calendar display: OFF/FL between these (previous, next) statuses is shown as absent
+    DISPLAY_CONVERTIBLE_STATUSES = {"OFF", "FL"}
+    DISPLAY_ABSENT_NEIGHBOURS = {("A", "A"), ("A", "P"), ("P", "A")}
+    DISPLAY_ABSENT_CELL = ({"status": "A", "color": "#FF0000"},)
+
     def __init__(self, start_date_object, end_date_object):
         self.start_date = start_date_object
         self.end_date = end_date_object
         self.total_days = (end_date_object - start_date_object).days + 1
         self.sundays = self._get_sundays()
-        self.attendance_data = defaultdict(lambda: defaultdict(list))
+        self.grid = AttendanceGrid(start_date_object, end_date_object, self.STATUS_HIERARCHY)
         
         # OPTIMIZATION: Cache for office closures (loaded once)
         self._office_closure_cache = None
@@ -72,20 +77,17 @@ class AttendanceMapper:
             if (self.start_date + timedelta(days=i)).weekday() == 6
         }
     
-    def _get_status_for_date(self, employee_data, date):
+    def _get_status_for_date(self, employee_id, date):
         """Get primary status for a date"""
-        if date not in employee_data or not employee_data[date]:
-            return "A"
-        return employee_data[date][0].get("status", "A") or "A"
-    
-    def _should_override_status(self, existing_status, new_status):
-        """Check if new status should override existing based on hierarchy"""
-        existing_priority = self.STATUS_HIERARCHY.get(existing_status, 0)
-        new_priority = self.STATUS_HIERARCHY.get(new_status, 0)
-        return new_priority > existing_priority
+        return self.grid.status_at(employee_id, date)
     
     def map_attendance_data(self, attendance_logs, leave_logs, holidays, tour_logs,detailed=False):
         """Main method to aggregate all attendance data"""
+        grid = self.map_attendance_grid(attendance_logs, leave_logs, holidays, tour_logs, detailed)
+        return grid.to_legacy()
+
+    def map_attendance_grid(self, attendance_logs, leave_logs, holidays, tour_logs, detailed=False):
+        """Same as map_attendance_data, but returns the AttendanceGrid itself."""
         
         # OPTIMIZATION: Pre-load office closures once (avoid repeated queries)
         self._office_closure_cache = self._get_office_closures()
@@ -106,7 +108,50 @@ class AttendanceMapper:
         self._office_closure_cache = None
         self._stl_cache = None
         
-        return dict(self.attendance_data)
+        return self.grid
+
+    @classmethod
+    def build_calendar_rows(cls, attendance_data, employees, days):
+        """
+        Turn mapped attendance data into render-ready calendar rows.
+
+        Returns one ``{"employee": ..., "cells": [...]}`` row per employee with
+        one ``{"date": ..., "statuses": [...]}`` cell per entry of ``days``.
+        Missing days default to absent and the A-OFF-A neighbour rule (OFF/FL
+        shown as A between absences) is already applied, so templates only
+        iterate.
+        """
+        dates = [day.date() if hasattr(day, "date") else day for day in days]
+        one_day = timedelta(days=1)
+
+        def last_status(entries):
+            if isinstance(entries, dict):
+                return entries.get("status", "A")
+            if entries and isinstance(entries[-1], dict):
+                return entries[-1].get("status", "A")
+            return "A"
+
+        rows = []
+        for employee in employees:
+            employee_data = attendance_data.get(employee.id, {}) if attendance_data else {}
+            cells = []
+            for date in dates:
+                entries = employee_data.get(date)
+                if not entries:
+                    statuses = cls.DISPLAY_ABSENT_CELL
+                elif (
+                    last_status(entries) in cls.DISPLAY_CONVERTIBLE_STATUSES
+                    and (
+                        last_status(employee_data.get(date - one_day)),
+                        last_status(employee_data.get(date + one_day)),
+                    ) in cls.DISPLAY_ABSENT_NEIGHBOURS
+                ):
+                    statuses = cls.DISPLAY_ABSENT_CELL
+                else:
+                    statuses = entries if isinstance(entries, list) else [entries]
+                cells.append({"date": date, "statuses": statuses})
+            rows.append({"employee": employee, "cells": cells})
+        return rows
     
     def _get_stl_cache(self, attendance_logs):
         """
@@ -158,17 +203,12 @@ class AttendanceMapper:
             self._set_status(employee_id, log_date, status, color)
     
     def _process_tour_logs(self, tour_logs,detailed):
-        """Process tour logs"""
-        for log in tour_logs:
+        """
+        Process tour logs.
+        OPTIMIZATION: expand_tours prefetches attendance log durations for all tours in one query.
+        """
+        for log, daily_durations in expand_tours(tour_logs, detailed):
             employee_id = log.applied_by.id
-            daily_durations = calculate_daily_tour_durations(
-                log.start_date,
-                log.start_time,
-                log.extended_end_date or log.end_date,
-                log.extended_end_time or log.end_time,
-                detailed,
-            )
-            
             for date, short_code, _ in daily_durations:
                 # self._set_status(employee_id, date, short_code, "#06B900")
                 self._set_status(employee_id, date, short_code, "#06c1c4")
@@ -176,21 +216,19 @@ class AttendanceMapper:
     def _process_holidays(self, holidays):
         """
         Process holidays efficiently.
-        OPTIMIZATION: Batch fetch applicable_users to avoid N+1 queries.
+        OPTIMIZATION: applicable_user_ids comes with the holiday calendar index,
+        so there is no query per holiday.
         """
         for holiday in holidays:
             start = holiday.start_date
             end = holiday.end_date or holiday.start_date
             days = (end - start).days + 1
             
-            # OPTIMIZATION: Use values_list for lighter query (only IDs needed)
-            applicable_users = set(
-                holiday.applicable_users.values_list("id", flat=True)
-            )
+            applicable_users = set(holiday.applicable_user_ids)
             
             # If no users specified, get all employees we've seen
             if not applicable_users:
-                applicable_users = set(self.attendance_data.keys())
+                applicable_users = set(self.grid.employee_ids)
             
             # OPTIMIZATION: Pre-compute date range to avoid repeated timedelta in inner loop
             holiday_dates = [start + timedelta(days=i) for i in range(days)]
@@ -220,9 +258,8 @@ class AttendanceMapper:
             
             # CL/SL (Casual/Sick Leave) has special handling
             if leave_status in ["CL", "SL"]:
-                existing_status = self._get_status_for_date(
-                    self.attendance_data[employee_id], log_date
-                )
+                self.grid.row(employee_id)
+                existing_status = self._get_status_for_date(employee_id, log_date)
                 
                 # FL takes priority over CL
                 if existing_status == "FL":
@@ -235,100 +272,110 @@ class AttendanceMapper:
             self._set_status(employee_id, log_date, status, color)
     
     def _set_status(self, employee_id, date, status, color):
-        """Set status for an employee on a date using hierarchy"""
-        existing_status = self._get_status_for_date(
-            self.attendance_data[employee_id], date
-        )
-        
-        # Only override if new status has higher priority
-        if self._should_override_status(existing_status, status):
-            self.attendance_data[employee_id][date] = [
-                {"status": status, "color": color}
-            ]
+        """Set status for an employee on a date using hierarchy (integer priority compare)"""
+        self.grid.set_status(employee_id, date, status, color)
     
     def _add_sundays(self):
         """
         Add OFF status for Sundays without entries.
-        OPTIMIZATION: Sundays pre-computed in __init__.
+        OPTIMIZATION: one masked assignment over the Sunday columns.
         """
-        for employee_id in self.attendance_data.keys():
-            for sunday in self.sundays:
-                if not self.attendance_data[employee_id][sunday]:
-                    self.attendance_data[employee_id][sunday] = [
-                        {"status": "OFF", "color": "#CCCCCC"}
-                    ]
+        sunday_cols = self.grid.weekday_columns(6)
+        if not self.grid.rows or not sunday_cols.size:
+            return
+        codes = self.grid.status_matrix()
+        rows, cols = np.nonzero(codes[:, sunday_cols] == self.grid.EMPTY)
+        codes[rows, sunday_cols[cols]] = self.grid.status_code("OFF")
+        self.grid.color_matrix()[rows, sunday_cols[cols]] = self.grid.color_id("#CCCCCC")
     
     def _apply_saturday_lwp_rule(self):
         """
         If Saturday is LWP → Sunday must also be LWP (using priority rules).
-        OPTIMIZATION: Use list() to avoid RuntimeError from dict mutation during iteration.
+        Sunday must have a status, and LWP only wins on priority. Days outside
+        the range count too, as long as both have a status.
+        OPTIMIZATION: Saturday columns are compared with the column after them
+        in one pass; only days at or past the range edge are checked one by one.
         """
-        for employee_id, employee_data in self.attendance_data.items():
-            for date, status_list in list(employee_data.items()):
-                
-                # Check if it's Saturday
-                if date.weekday() == 5:
-                    saturday_status = status_list[0]["status"]
+        lwp = self.grid.status_codes.get("LWP")
+        if lwp is None:
+            return
 
-                    # Only apply the rule if Saturday is LWP
-                    if saturday_status == "LWP":
-                        sunday = date + timedelta(days=1)
-
-                        # Sunday must be within range
-                        if sunday in employee_data:
-                            sunday_status = employee_data[sunday][0]["status"]
+        saturday_cols = self.grid.weekday_columns(5)
+        saturday_cols = saturday_cols[saturday_cols + 1 < self.grid.total_days]
+        if self.grid.rows and saturday_cols.size:
+            codes = self.grid.status_matrix()
+            priorities = np.array(self.grid.priorities)
+            sundays = codes[:, saturday_cols + 1]
+            rows, cols = np.nonzero(
+                (codes[:, saturday_cols] == lwp)
+                & (sundays != self.grid.EMPTY)
+                & (priorities[sundays] < priorities[lwp])
+            )
+            codes[rows, saturday_cols[cols] + 1] = lwp
+            self.grid.color_matrix()[rows, saturday_cols[cols] + 1] = self.grid.color_id("#a2a2a2")
 
-                            # Only apply if LWP has higher priority than current Sunday status
-                            if self._should_override_status(sunday_status, "LWP"):
-                                self._set_status(
-                                    employee_id,
-                                    sunday,
-                                    "LWP",
-                                    "#a2a2a2"
-                                )
+        # A Sunday outside the range only has a status if the employee has outside days
+        edge_saturdays = [self.end_date] if self.end_date.weekday() == 5 else []
+        for employee_id, cells in list(self.grid.outside.items()):
+            for date in edge_saturdays + [date for date in cells if date.weekday() == 5]:
+                if self._get_status_for_date(employee_id, date) == "LWP":
+                    sunday = date + timedelta(days=1)
+                    if self.grid.has_status(employee_id, sunday):
+                        self._set_status(employee_id, sunday, "LWP", "#a2a2a2")
 
     def _apply_smart_sunday_logic(self):
         """
         Replace OFF with A when person is regularly absent.
-        OPTIMIZATION: Iterate dates once instead of nested loops.
+        OPTIMIZATION: nearby statuses for every Sunday come from one forward
+        and one backward fill, and the decision is a lookup in a table of
+        _should_mark_absent over every (previous, next) status pair.
         """
-        for employee_id, employee_data in self.attendance_data.items():
-            current_date = self.start_date
-            
-            while current_date <= self.end_date:
-                if (current_date.weekday() == 6 and 
-                    self._get_status_for_date(employee_data, current_date) == "OFF"):
-                    
-                    prev_status = self._get_nearby_status(
-                        employee_data, current_date, direction=-1
-                    )
-                    next_status = self._get_nearby_status(
-                        employee_data, current_date, direction=1
-                    )
-                    
-                    if self._should_mark_absent(prev_status, next_status):
-                        self._set_status(
-                            employee_id, current_date, "A", "#FF0000"
-                        )
-                
-                current_date += timedelta(days=1)
+        off = self.grid.status_codes.get("OFF")
+        sunday_cols = self.grid.weekday_columns(6)
+        if off is None or not self.grid.rows or not sunday_cols.size:
+            return
+
+        codes = self.grid.status_matrix()
+        prev_codes, next_codes = self._get_nearby_status_codes(codes, sunday_cols, off)
+
+        # The extra last entry stands for "no nearby working day"
+        labels = [status or self.grid.empty_status for status in self.grid.statuses] + [None]
+        mark_absent = np.array([
+            [self._should_mark_absent(prev_status, next_status) for next_status in labels]
+            for prev_status in labels
+        ])
+        rows, cols = np.nonzero(
+            (codes[:, sunday_cols] == off) & mark_absent[prev_codes, next_codes]
+        )
+        codes[rows, sunday_cols[cols]] = self.grid.status_code("A")
+        self.grid.color_matrix()[rows, sunday_cols[cols]] = self.grid.color_id("#FF0000")
     
-    def _get_nearby_status(self, employee_data, date, direction=-1, max_days=7):
-        """Get status from nearby working days"""
-        step = -1 if direction == -1 else 1
-        check_date = date + timedelta(days=step)
-        days_checked = 0
-        
-        while (self.start_date <= check_date <= self.end_date and 
-               days_checked < max_days):
-            if check_date.weekday() != 6:
-                status = self._get_status_for_date(employee_data, check_date)
-                if status != "OFF":
-                    return status
-            check_date += timedelta(days=step)
-            days_checked += 1
-        
-        return None
+    def _get_nearby_status_codes(self, codes, sunday_cols, off, max_days=7):
+        """
+        Status codes of the nearest non-Sunday, non-OFF day before and after
+        each Sunday, within ``max_days`` and the range. Where there is none the
+        code is ``len(self.grid.statuses)``. Returns two ``(employees,
+        sundays)`` arrays.
+        """
+        total_days = self.grid.total_days
+        missing = len(self.grid.statuses)
+        columns = np.arange(total_days)
+        is_sunday = np.zeros(total_days, dtype=bool)
+        is_sunday[sunday_cols] = True
+        candidate = (codes != off) & ~is_sunday
+
+        # Latest candidate column at or before each column, then shifted by one
+        latest = np.maximum.accumulate(np.where(candidate, columns, -1), axis=1)
+        prev_cols = np.hstack([np.full((len(codes), 1), -1), latest[:, :-1]])[:, sunday_cols]
+        # Earliest candidate column at or after each column, then shifted by one
+        earliest = np.minimum.accumulate(np.where(candidate, columns, total_days)[:, ::-1], axis=1)[:, ::-1]
+        next_cols = np.hstack([earliest[:, 1:], np.full((len(codes), 1), total_days)])[:, sunday_cols]
+
+        has_prev = (prev_cols >= 0) & (sunday_cols - prev_cols <= max_days)
+        has_next = (next_cols < total_days) & (next_cols - sunday_cols <= max_days)
+        prev_codes = np.take_along_axis(codes, np.clip(prev_cols, 0, total_days - 1), axis=1)
+        next_codes = np.take_along_axis(codes, np.clip(next_cols, 0, total_days - 1), axis=1)
+        return np.where(has_prev, prev_codes, missing), np.where(has_next, next_codes, missing)
     
     def _should_mark_absent(self, prev_status, next_status):
         """Determine if Sunday should be marked absent"""
@@ -382,24 +429,8 @@ def aggregate_attendance_data(employee_ids, start_date_object, end_date_object):
 
 
 def get_holiday_logs(start_date, end_date, employee_ids=None):
-    """Optimized holiday query with prefetch"""
-    from django.db.models import Prefetch
-    
-    holidays = Holiday.objects.filter(
-        start_date__lte=end_date,
-        end_date__gte=start_date
-    ).prefetch_related(
-        Prefetch('applicable_users')
-    )
-    
-    if employee_ids:
-        holidays = holidays.annotate(
-            user_count=Count('applicable_users')
-        ).filter(
-            Q(user_count=0) | Q(applicable_users__id__in=employee_ids)
-        ).distinct()
-    
-    return holidays
+    """Holidays overlapping the range, from the cached holiday calendar index"""
+    return get_holidays(start_date, end_date, employee_ids)
 
 
 def get_attendance_logs(employee_ids, start_date, end_date):
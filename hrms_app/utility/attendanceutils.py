@@ -1,6 +1,7 @@
 from datetime import datetime
 from hrms_app.models import DeviceInformation
-from hrms_app.hrms.utils import call_soap_api
+from hrms_app.services.holiday_calendar import get_holidays
+from hrms_app.services.punch_cache import get_today_check_in_out
 from django.contrib.auth import get_user_model
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _
@@ -34,30 +35,9 @@ def get_check_in_out_times(user):
     if not device_instance:
         return None, None
 
-    # Prepare date range
-    today = datetime.now().date()
-    from_date = f"{today} 00:01"
-    to_date = f"{today} 23:59"
-
-    # Call SOAP API
-    result = call_soap_api(
-        device_instance=device_instance, from_date=from_date, to_date=to_date
-    )
-
-    if not result or emp_code not in result:
-        return None, None
-
-    emp_data = result.get(emp_code, {})
-    emp_result = emp_data.get(today)
-
-    if not emp_result or not isinstance(emp_result, list):
-        return None, None
-
-    # Extract login/logout
-    login_time = emp_result[0]
-    logout_time = emp_result[-1] if len(emp_result) > 1 else None
-
-    return login_time, logout_time
+    # Punches come from the device-level cache refreshed by a periodic task,
+    # so a page view never waits on the device
+    return get_today_check_in_out(device_instance.pk, emp_code)
 
 def get_from_to_datetime():
     """Returns from_datetime (21st of previous month) and to_datetime (20th of current month)."""
@@ -194,21 +174,11 @@ def get_tour_logs(employee_ids, start_date, end_date):
 
 def get_holiday_logs(start_date, end_date, employee_ids=None):
     """
-    Optimization:
-    1. Removed .annotate(Count): This is expensive.
-    2. used Q(applicable_users__isnull=True) to find global holidays.
-    3. prefetch_related: If you need to check which users are assigned later.
+    Holidays starting in the range that are global or assigned to one of
+    ``employee_ids``, from the cached holiday calendar index. Each carries
+    ``applicable_user_ids``, so callers need no query per holiday.
     """
-    # Base filter for date
-    base_query = Q(start_date__range=[start_date, end_date])
-
-    if employee_ids:
-        # Holidays that are Global (no assigned users) OR assigned to these specific employees
-        user_query = Q(applicable_users__isnull=True) | Q(applicable_users__id__in=employee_ids)
-        qs = Holiday.objects.filter(base_query & user_query)
-    else:
-        qs = Holiday.objects.filter(base_query)
-    return qs.distinct().prefetch_related('applicable_users')
+    return get_holidays(start_date, end_date, employee_ids, starting_in_range=True)
 
 
 def str_to_date(value):
@@ -18,7 +18,7 @@ from django.views.generic import (
 )
 from hrms_app.utility import attendanceutils as at
 from hrms_app.hrms.utils import call_soap_api
-from hrms_app.hrms.managers import AttendanceStatusHandler
+from hrms_app.hrms.managers import AttendanceStatusHandler, AttendanceStatusBatchClassifier
 from django.db.models import Q
 from django.shortcuts import get_object_or_404, redirect, render
 from django.contrib.auth.mixins import (
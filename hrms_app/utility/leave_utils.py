@@ -9,6 +9,7 @@ from hrms_app.models import (
     AppSetting
 )
 from hrms_app.hrms.utils import get_non_working_days
+from hrms_app.services.reference_cache import get_app_setting
 from django.conf import settings
 from hrms_app.hrms.utils import *
 import logging
@@ -219,9 +220,7 @@ class LeavePolicyManager:
         )
         gap = (current_date - self.end_date.date()).days + 1
         gap -= non_working_days
-        app_setting = AppSetting.objects.filter(
-            key="CL_SL_WORKING_DAY_LIMIT"
-        ).first()
+        app_setting = get_app_setting("CL_SL_WORKING_DAY_LIMIT")
         if not app_setting:
             return
         if gap <= int(app_setting.value):
@@ -12,30 +12,41 @@ from hrms_app.models import (
 from django.utils.timezone import localtime
 from datetime import datetime, timedelta
 from django.conf import settings
+import xlsxwriter
 
 User = get_user_model()
 
-def get_monthly_presence_html_table(
-    converted_from_datetime, converted_to_datetime, is_active, location, query
+# Row label per cell_data key, in the order each employee's rows are shown
+PRESENCE_ROW_LABELS = {
+    "status": "Status",
+    "in_time": "In Time",
+    "out_time": "Out Time",
+    "total_duration": "Duration",
+    "leave": "Leave",
+    "tour": "Tour",
+    "reg": "Reg",
+}
+
+
+def get_monthly_presence_table(
+    converted_from_datetime, converted_to_datetime, is_active, location, query, chunk_size=None
 ):
-    monthly_presence_data = generate_monthly_presence_data_detailed(
-        converted_from_datetime, converted_to_datetime, is_active, location, query
-    )
+    """
+    Build the detailed presence report once for every output format.
+
+    Returns ``(headers, date_range, employees)`` where ``employees`` lazily
+    yields ``(user, emp_code, cells)`` and ``cells`` holds one cell_data dict
+    per day of ``date_range``. With ``chunk_size`` the data is generated for
+    that many employees at a time, so exports start yielding rows early and
+    never hold the whole range in memory.
+    """
     date_range = [
         (converted_from_datetime + timedelta(days=day))
         for day in range((converted_to_datetime - converted_from_datetime).days + 1)
     ]
-
-    # HTML table construction
     headers = ["Employee Code", "Name", "Attendance"] + [
         f"{day.day}-{day.strftime('%b')}" for day in date_range
     ]
-    table_html = (
-        '<div class="table-container"><table class="rtable table-bordered">'
-        "<thead><tr>"
-        + "".join(f'<th class="sticky-header">{header}</th>' for header in headers)
-        + "</tr></thead><tbody>"
-    )
     users = User.objects.filter(is_active=is_active).select_related("personal_detail")
     if query:
         users = users.filter(
@@ -43,41 +54,128 @@ def get_monthly_presence_html_table(
             | Q(last_name__icontains=query)
             | Q(username__icontains=query)
         )
+    if location:
+        # Filter before chunking so every chunk holds employees that can appear
+        users = users.filter(device_location__in=location.values_list("id", flat=True))
+
+    def get_chunks():
+        if not chunk_size:
+            yield None, users
+            return
+        user_list = list(users)
+        for offset in range(0, len(user_list), chunk_size):
+            chunk = user_list[offset:offset + chunk_size]
+            yield [user.id for user in chunk], chunk
+
+    def employees():
+        for employee_ids, chunk in get_chunks():
+            monthly_presence_data = generate_monthly_presence_data_detailed(
+                converted_from_datetime,
+                converted_to_datetime,
+                is_active,
+                location,
+                query,
+                employee_ids=employee_ids,
+            )
+            for user in chunk:
+                emp_code = user.personal_detail.employee_code
+                if emp_code in monthly_presence_data:
+                    cells = [
+                        get_cell_data(
+                            user, day_date, day_date.strftime("%Y-%m-%d"), monthly_presence_data, emp_code
+                        )
+                        for day_date in date_range
+                    ]
+                    yield user, emp_code, cells
+
+    return headers, date_range, employees()
+
+
+def iter_monthly_presence_rows(
+    converted_from_datetime, converted_to_datetime, is_active, location, query, chunk_size=None
+):
+    """
+    Yield the detailed presence report as plain rows: the header first,
+    then seven rows per employee followed by an empty separator row. Empty
+    cells are ``None``, the same grid the HTML table renders.
+    """
+    headers, _, employees = get_monthly_presence_table(
+        converted_from_datetime, converted_to_datetime, is_active, location, query, chunk_size
+    )
+    yield headers
+    blank_row = [None] * len(headers)
+    for user, emp_code, cells in employees:
+        code = f"KMPCL-{format_emp_code(emp_code)}"
+        name = user.get_full_name()
+        for row_type, label in PRESENCE_ROW_LABELS.items():
+            yield [code, name, label] + [
+                None if cell[row_type] in ("", None) else str(cell[row_type])
+                for cell in cells
+            ]
+        yield blank_row
 
-    for user in users:
-        emp_code = user.personal_detail.employee_code
-        if emp_code in monthly_presence_data:
-            row_data = {
-                "status": f'<tr><td class="sticky-col" rowspan="7">KMPCL-{format_emp_code(emp_code)}</td><td class="sticky-col" rowspan="7">{user.get_full_name()}</td><td>Status</td>',
-                "in_time": "<tr><td>In Time</td>",
-                "out_time": "<tr><td>Out Time</td>",
-                "total_duration": "<tr><td>Duration</td>",
-                "leave": "<tr><td>Leave</td>",
-                "tour": "<tr><td>Tour</td>",
-                "reg": "<tr><td>Reg</td>",
-            }
 
-            for day_date in date_range:
-                day_str = day_date.strftime("%Y-%m-%d")
-                cell_data = get_cell_data(
-                    user, day_date, day_str, monthly_presence_data, emp_code
-                )
-                for row_type in row_data.keys():
-                    style = get_style(row_type, cell_data)
-                    row_data[
-                        row_type
-                    ] += f'<td class="{style}">{cell_data[row_type]}</td>'
-
-            for row in row_data.values():
-                table_html += row + "</tr>"
-            table_html += "<tr></tr>"
+def write_monthly_presence_xlsx(output, rows):
+    """
+    Write rows from ``iter_monthly_presence_rows`` to ``output`` (a path or
+    file object) as an XLSX workbook. The worksheet is written in
+    constant_memory mode, so memory stays flat however many rows there are.
+    """
+    workbook = xlsxwriter.Workbook(output, {"constant_memory": True})
+    worksheet = workbook.add_worksheet("Sheet1")
+    header_format = workbook.add_format({"bold": True, "border": 1, "align": "center", "valign": "top"})
+    rows = iter(rows)
+    worksheet.write_row(0, 0, next(rows), header_format)
+    for row_number, row in enumerate(rows, start=1):
+        for column, value in enumerate(row):
+            if value is not None:
+                worksheet.write_string(row_number, column, value)
+    workbook.close()
+
+
+def get_monthly_presence_html_table(
+    converted_from_datetime, converted_to_datetime, is_active, location, query
+):
+    headers, _, employees = get_monthly_presence_table(
+        converted_from_datetime, converted_to_datetime, is_active, location, query
+    )
+
+    # HTML table construction
+    table_html = (
+        '<div class="table-container"><table class="rtable table-bordered">'
+        "<thead><tr>"
+        + "".join(f'<th class="sticky-header">{header}</th>' for header in headers)
+        + "</tr></thead><tbody>"
+    )
+
+    for user, emp_code, cells in employees:
+        row_data = {
+            "status": f'<tr><td class="sticky-col" rowspan="7">KMPCL-{format_emp_code(emp_code)}</td><td class="sticky-col" rowspan="7">{user.get_full_name()}</td><td>Status</td>',
+            "in_time": "<tr><td>In Time</td>",
+            "out_time": "<tr><td>Out Time</td>",
+            "total_duration": "<tr><td>Duration</td>",
+            "leave": "<tr><td>Leave</td>",
+            "tour": "<tr><td>Tour</td>",
+            "reg": "<tr><td>Reg</td>",
+        }
+
+        for cell_data in cells:
+            for row_type in row_data.keys():
+                style = get_style(row_type, cell_data)
+                row_data[
+                    row_type
+                ] += f'<td class="{style}">{cell_data[row_type]}</td>'
+
+        for row in row_data.values():
+            table_html += row + "</tr>"
+        table_html += "<tr></tr>"
 
     table_html += "</tbody></table></div>"
     return table_html
 
 
 def generate_monthly_presence_data_detailed(
-    converted_from_datetime, converted_to_datetime, is_active, location, query
+    converted_from_datetime, converted_to_datetime, is_active, location, query, employee_ids=None
 ):
     monthly_presence_data = defaultdict(lambda: defaultdict(dict))
     
@@ -91,6 +189,8 @@ def generate_monthly_presence_data_detailed(
         )
     if location:
         employees_filter &= Q(device_location__in=location.values_list("id", flat=True))
+    if employee_ids is not None:
+        employees_filter &= Q(id__in=employee_ids)
     
     employees = (
         User.objects.filter(employees_filter)
@@ -205,10 +305,8 @@ def process_sundays_and_holidays(
     for holiday in holidays:
         holiday_date = holiday.start_date.strftime("%Y-%m-%d")
 
-        # OPTIMIZATION: Use set for O(1) membership checks instead of list
-        applicable_users = set(
-            holiday.applicable_users.values_list("id", flat=True)
-        )
+        # OPTIMIZATION: applicable_user_ids comes with the holiday calendar index (no query)
+        applicable_users = holiday.applicable_user_ids
 
         # If empty -> applies to everyone
         holiday_map[holiday_date] = (
@@ -249,8 +347,49 @@ def process_sundays_and_holidays(
                     }
 
 from datetime import datetime, timedelta
+from functools import lru_cache
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
 from django.utils.timezone import localtime, make_aware, utc
 
+# "%I:%M" for every minute of the day, indexed by hour * 60 + minute
+CLOCK_LABELS = [f"{(hour % 12) or 12:02d}:{minute:02d}" for hour in range(24) for minute in range(60)]
+
+
+def format_clock(value):
+    """Format an aware datetime as local "%I:%M" without going through strftime."""
+    value = localtime(value)
+    return CLOCK_LABELS[value.hour * 60 + value.minute]
+
+
+@lru_cache(maxsize=4096)
+def format_history_clock(value):
+    """Format a UTC timestamp stored in AttendanceLogHistory.previous_data as local "%I:%M"."""
+    return format_clock(make_aware(datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ"), timezone=utc))
+
+
+def get_backend_regularization_history(logs):
+    """
+    Map attendance_log_id -> previous_data of the history entry the report
+    shows for backend-regularized logs: the earliest one, i.e. the punches
+    before the first regularization. One query for all logs.
+    """
+    history = (
+        AttendanceLogHistory.objects.filter(
+            attendance_log__in=logs.filter(regularized_backend=True).values("pk")
+        )
+        .annotate(
+            row_number=Window(
+                RowNumber(),
+                partition_by=F("attendance_log_id"),
+                order_by=[F("modified_at").asc(), F("pk").asc()],
+            )
+        )
+        .filter(row_number=1)
+        .values_list("attendance_log_id", "previous_data")
+    )
+    return dict(history)
+
 
 def process_logs(logs, monthly_presence_data, converted_from_datetime, converted_to_datetime):
     # ----------------------------------
@@ -300,6 +439,11 @@ def process_logs(logs, monthly_presence_data, converted_from_datetime, converted
             "to_time": stl["leave_application__to_time"],
         }
 
+    # ----------------------------------
+    # OPTIMIZATION: Backend regularization history, one query
+    # ----------------------------------
+    history_map = get_backend_regularization_history(logs)
+
     # ----------------------------------
     # MAIN LOOP
     # ----------------------------------
@@ -309,39 +453,15 @@ def process_logs(logs, monthly_presence_data, converted_from_datetime, converted
         date_key = log_date.strftime("%Y-%m-%d")
         is_backend_reg = log.regularized_backend
 
-        history = None
-        if is_backend_reg:
-            history = AttendanceLogHistory.objects.filter(
-                attendance_log=log
-            ).last()
+        prev = history_map.get(log.pk) if is_backend_reg else None
 
         # ----------------------------------
         # ATTENDANCE DATA
         # ----------------------------------
-        if history:
-            prev = history.previous_data
-
-            parsed_in_time = datetime.strptime(
-                prev["start_date"], "%Y-%m-%dT%H:%M:%SZ"
-            )
-            parsed_out_time = datetime.strptime(
-                prev["end_date"], "%Y-%m-%dT%H:%M:%SZ"
-            )
-
-            parsed_in_time = (
-                make_aware(parsed_in_time, timezone=utc)
-                if parsed_in_time.tzinfo is None
-                else parsed_in_time
-            )
-            parsed_out_time = (
-                make_aware(parsed_out_time, timezone=utc)
-                if parsed_out_time.tzinfo is None
-                else parsed_out_time
-            )
-
-            in_time = localtime(parsed_in_time).strftime("%I:%M")
+        if prev:
+            in_time = format_history_clock(prev["start_date"])
             out_time = (
-                localtime(parsed_out_time).strftime("%I:%M")
+                format_history_clock(prev["end_date"])
                 if prev.get("reg_status") != "mis punching"
                 else ""
             )
@@ -350,8 +470,8 @@ def process_logs(logs, monthly_presence_data, converted_from_datetime, converted
             duration = prev.get("duration")
 
         else:
-            in_time = localtime(log.start_date).strftime("%I:%M")
-            out_time = localtime(log.end_date).strftime("%I:%M")
+            in_time = format_clock(log.start_date)
+            out_time = format_clock(log.end_date)
             status = log.att_status_short_code
             duration = log.duration
 
@@ -439,10 +559,7 @@ def process_leaves(leaves, monthly_presence_data):
 
 
 def process_tours(all_tours, monthly_presence_data,detailed):
-    for tour in all_tours:
-        daily_durations = calculate_daily_tour_durations(
-            tour.start_date, tour.start_time, tour.extended_end_date or tour.end_date, tour.extended_end_time or tour.end_time,detailed
-        )
+    for tour, daily_durations in expand_tours(all_tours, detailed):
         emp_code = tour.applied_by.personal_detail.employee_code
         for date, short_code, duration in daily_durations:
             monthly_presence_data[emp_code][date.strftime("%Y-%m-%d")]["tour"] = {
@@ -469,27 +586,70 @@ def get_office_closers(start_date, end_date):
     )
 
 
-def calculate_daily_tour_durations(start_date, start_time, end_date, end_time,detailed):
+def get_tour_log_durations(tours):
+    """
+    Map (employee_id, date) -> attendance log duration for every day covered
+    by ``tours``, in a single query. When an employee has several logs on a
+    day, the first one in AttendanceLog's default ordering wins.
+    """
+    employee_ids = {tour.applied_by_id for tour in tours}
+    if not employee_ids:
+        return {}
+    first_day = min(tour.start_date for tour in tours)
+    last_day = max(tour.extended_end_date or tour.end_date for tour in tours)
+    logs = AttendanceLog.objects.filter(
+        applied_by_id__in=employee_ids,
+        start_date__date__range=(first_day, last_day),
+    ).values_list("applied_by_id", "start_date", "duration")
+
+    log_durations = {}
+    for employee_id, start_date, duration in logs:
+        log_durations.setdefault(
+            (employee_id, localtime(start_date).date()),
+            timedelta(hours=duration.hour, minutes=duration.minute, seconds=duration.second)
+            if duration
+            else timedelta(hours=0),
+        )
+    return log_durations
+
+
+def expand_tours(tours, detailed=False):
+    """
+    Expand tours into daily T/TH codes, yielding ``(tour, daily_durations)``.
+    Attendance log durations for all tours are loaded up front by
+    ``get_tour_log_durations``, so expansion issues no per-tour queries.
+    """
+    tours = list(tours)
+    log_durations = get_tour_log_durations(tours)
+    for tour in tours:
+        yield tour, calculate_daily_tour_durations(
+            tour.start_date,
+            tour.start_time,
+            tour.extended_end_date or tour.end_date,
+            tour.extended_end_time or tour.end_time,
+            detailed,
+            log_durations=log_durations,
+            employee_id=tour.applied_by_id,
+        )
+
+
+def calculate_daily_tour_durations(
+    start_date, start_time, end_date, end_time, detailed, log_durations=None, employee_id=None
+):
     # Combine date and time into datetime objects
     start_datetime = datetime.combine(start_date, start_time or datetime.min.time())
     end_datetime = datetime.combine(end_date, end_time or datetime.min.time())
+    # (employee_id, date) -> duration of that day's attendance log
+    log_durations = log_durations or {}
     # Initialize the current datetime to the start datetime
     current_datetime = start_datetime
     daily_durations = []
     while current_datetime.date() <= end_datetime.date():
+        # Add attendance log duration if it exists, default duration is 0
+        log_duration = log_durations.get(
+            (employee_id, current_datetime.date()), timedelta(hours=0)
+        )
         # Calculate the end of the current day
-        attendance_log = AttendanceLog.objects.filter(
-            start_date__date=current_datetime.date()
-        ).first()
-        # Initialize log duration
-        log_duration = timedelta(hours=0)  # Default duration is 0
-        # Add attendance log duration if it exists
-        if attendance_log and attendance_log.duration:
-            log_duration = timedelta(
-                hours=attendance_log.duration.hour,
-                minutes=attendance_log.duration.minute,
-                seconds=attendance_log.duration.second,
-            )
         end_of_day = datetime.combine(current_datetime.date(), datetime.max.time())
         # Determine the actual end time for the current day
         actual_end_time = min(end_of_day, end_datetime)
@@ -32,6 +32,7 @@ from hrms_app.choices.leave import LeaveAccrualPeriod
 from hrms_app.models import LeaveApplication, LeaveType
 from hrms_app.forms.leave_form import LeaveApplicationForm
 from hrms_app.services.leave_service import LeaveDomainService
+from hrms_app.services.reference_cache import get_leave_type
 
 
 class ApplyOrUpdateLeaveView(LoginRequiredMixin, SuccessMessageMixin, FormView):
@@ -132,7 +133,7 @@ class ApplyOrUpdateLeaveView(LoginRequiredMixin, SuccessMessageMixin, FormView):
             if self.object
             else self.kwargs.get("leave_type")
         )
-        leave_type = LeaveType.objects.filter(id=leave_type_id).first()
+        leave_type = get_leave_type(leave_type_id)
 
         # ── Defaults ──────────────────────────────────────────────────────
         today                   = timezone.now().date()
@@ -18,6 +18,7 @@ from django.contrib.contenttypes.models import ContentType
 from django.contrib.auth import get_user_model
 from django.utils.timezone import make_aware
 from ..utility.attendance_mapper import aggregate_attendance_data
+from ..services.leave_balance_summary import invalidate_leave_balance_summary
 
 User = get_user_model()
 
@@ -93,6 +94,8 @@ class ForwardLeaveBalanceView(View):
 
                 # Bulk create new entries
                 LeaveBalanceOpenings.objects.bulk_create(filtered_new_entries)
+                # bulk_create skips the model signals
+                invalidate_leave_balance_summary(entry.user_id for entry in filtered_new_entries)
                 for entry in filtered_new_entries:
                     log_admin_action(
                         request.user,
@@ -11,21 +11,26 @@ from django.utils.translation import gettext_lazy as _
 import logging
 from django.db.models import Q
 User = get_user_model()
-from django.http import HttpResponse
+from django.core.cache import cache
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 import pandas as pd
 from django.utils.timezone import make_aware
 from datetime import datetime
 
-from hrms_app.utility.attendanceutils import (
-    get_attendance_logs,
-    get_tour_logs,
-    get_holiday_logs,
-    get_days_in_month,
-    get_non_stl_leave_logs,
+from hrms_app.utility.attendanceutils import get_days_in_month
+from ..utility.report_utils import (
+    get_monthly_presence_html_table,
+    iter_monthly_presence_rows,
+    write_monthly_presence_xlsx,
 )
-from ..utility.report_utils import get_monthly_presence_html_table
+from ..services import AttendanceCacheService, AttendanceRevision
 from ..utility.attendance_mapper import AttendanceMapper
+import csv
 import io
+import tempfile
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4, landscape
 from reportlab.lib.units import mm
@@ -84,25 +89,45 @@ class MonthAttendanceReportView(LoginRequiredMixin, TemplateView):
             return {
                 "form": form,
                 "error": "No employees found with the selected filters.",
-                "attendance_data": {},
                 "days_in_month": [],
                 "employees": [],
             }
         
-        # 4. Fetch all required data (optimized queries)
-        attendance_data = self._get_attendance_data(
-            employee_ids,
-            converted_from_datetime,
-            converted_to_datetime,
+        days_in_month = get_days_in_month(
+            converted_from_datetime, converted_to_datetime
         )
-        
+
+        # 4. Rendered table, cached per filter set and attendance revision
+        cache_key = AttendanceRevision.make_key(
+            "attendance_report_table",
+            location=location,
+            from_date=from_date,
+            to_date=to_date,
+            active=active,
+        )
+        attendance_table = cache.get(cache_key)
+        if attendance_table is None:
+            attendance_data = self._get_attendance_data(
+                employee_ids,
+                converted_from_datetime,
+                converted_to_datetime,
+            )
+            attendance_table = render_to_string(
+                "hrms_app/reports/present_absent_table.html",
+                {
+                    "days_in_month": days_in_month,
+                    "attendance_rows": AttendanceMapper.build_calendar_rows(
+                        attendance_data, employees, days_in_month
+                    ),
+                },
+            )
+            cache.set(cache_key, attendance_table, settings.REPORT_CACHE_TIMEOUT)
+
         # 5. Build context
         return {
             "form": form,
-            "attendance_data": attendance_data,
-            "days_in_month": get_days_in_month(
-                converted_from_datetime, converted_to_datetime
-            ),
+            "attendance_table": attendance_table,
+            "days_in_month": days_in_month,
             "employees": employees,
             "from_date": converted_from_datetime,
             "to_date": converted_to_datetime,
@@ -111,29 +136,15 @@ class MonthAttendanceReportView(LoginRequiredMixin, TemplateView):
 
     def _get_attendance_data(self, employee_ids, start_date, end_date):
         """
-        Fetch and process all attendance data using optimized mapper.
-        This replaces the old map_attendance_data call.
+        Fetch the (employee x day) grid, served from AttendanceCache where
+        it is fresh and mapped on the fly for the rest.
         """
-        
-        # Fetch all data with optimized queries
-        attendance_logs = get_attendance_logs(employee_ids, start_date, end_date)
-        leave_logs = get_non_stl_leave_logs(employee_ids, start_date, end_date)
-        tour_logs = get_tour_logs(employee_ids, start_date, end_date)
-        holidays = get_holiday_logs(start_date, end_date, employee_ids)
-        
         # Convert start_date and end_date to date objects if they're datetime
         start_date_obj = start_date.date() if hasattr(start_date, 'date') else start_date
         end_date_obj = end_date.date() if hasattr(end_date, 'date') else end_date
-        mapper = AttendanceMapper(start_date_obj, end_date_obj)
-        attendance_data = mapper.map_attendance_data(
-            attendance_logs=attendance_logs,
-            leave_logs=leave_logs,
-            holidays=holidays,
-            tour_logs=tour_logs,
-            detailed=False,
+        return AttendanceCacheService.get_attendance_grid(
+            employee_ids, start_date_obj, end_date_obj
         )
-        
-        return attendance_data
 
     def _get_filtered_employees(self, location, active):
         """Get employees based on filters"""
@@ -320,6 +331,13 @@ def _build_attendance_pdf(df: pd.DataFrame) -> bytes:
     return buf.read()
 
 
+class _Echo:
+    """File-like object for csv.writer that returns each line instead of buffering it."""
+
+    def write(self, value):
+        return value
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 #  Django view
 # ─────────────────────────────────────────────────────────────────────────────
@@ -335,10 +353,14 @@ class DetailedMonthlyPresenceView(LoginRequiredMixin, TemplateView):
         context = super().get_context_data(**kwargs)
         form = AttendanceReportFilterForm(self.request.GET)
         if form.is_valid():
-            table_data = self._get_filtered_table_data(
-                form.cleaned_data,
-                self.request.GET.get("q", ""),
-            )
+            cache_key = self._get_cache_key("detailed_presence_table", form.cleaned_data)
+            table_data = cache.get(cache_key)
+            if table_data is None:
+                table_data = self._get_filtered_table_data(
+                    form.cleaned_data,
+                    self.request.GET.get("q", ""),
+                )
+                cache.set(cache_key, table_data, settings.REPORT_CACHE_TIMEOUT)
             context.update({
                 "html_table": table_data,
                 "form":       form,
@@ -362,6 +384,18 @@ class DetailedMonthlyPresenceView(LoginRequiredMixin, TemplateView):
             query=query,
         )
 
+    def _get_cache_key(self, namespace, form_data):
+        """Key for this filter set at the current attendance revision."""
+        location = form_data.get("location")
+        return AttendanceRevision.make_key(
+            namespace,
+            location=sorted(location.values_list("pk", flat=True)) if location else None,
+            from_date=form_data.get("from_date"),
+            to_date=form_data.get("to_date"),
+            active=form_data.get("active"),
+            query=self.request.GET.get("q", ""),
+        )
+
     def _get_breadcrumb_urls(self):
         return [
             ("dashboard",                   {"label": "Dashboard"}),
@@ -371,48 +405,95 @@ class DetailedMonthlyPresenceView(LoginRequiredMixin, TemplateView):
     # ── GET handler ───────────────────────────────────────────────────────────
 
     def get(self, request, *args, **kwargs):
-        if request.GET.get("export") == "true":
+        export = request.GET.get("export")
+        if export in ("true", "csv"):
             form = AttendanceReportFilterForm(request.GET)
             if form.is_valid():
-                return self._export_table_data(form.cleaned_data)
+                # Exports only change with the attendance revision, so repeat
+                # downloads are answered with 304 Not Modified
+                cache_key = self._get_cache_key(f"detailed_presence_export_{export}", form.cleaned_data)
+                etag = AttendanceRevision.make_etag(cache_key)
+                last_modified = AttendanceRevision.last_modified()
+                response = get_conditional_response(
+                    request, etag=etag, last_modified=last_modified
+                )
+                if response is None:
+                    if export == "csv":
+                        response = self._export_table_data_csv(form.cleaned_data)
+                    else:
+                        response = self._export_table_data(form.cleaned_data, cache_key)
+                response["ETag"] = etag
+                response["Last-Modified"] = http_date(last_modified)
+                patch_cache_control(response, private=True, no_cache=True)
+                return response
 
         return super().get(request, *args, **kwargs)
 
-    # ── Excel export (unchanged) ──────────────────────────────────────────────
+    # ── Excel export ──────────────────────────────────────────────────────────
+
+    # Exports larger than this spill from memory to an anonymous temp file
+    EXPORT_SPOOL_MAX_SIZE = 10 * 1024 * 1024
 
-    def _export_table_data(self, form_data):
-        table_data = self._get_filtered_table_data(
-            form_data,
-            self.request.GET.get("q", ""),
+    def _get_presence_rows(self, form_data):
+        return iter_monthly_presence_rows(
+            converted_from_datetime=form_data.get("from_date"),
+            converted_to_datetime=form_data.get("to_date"),
+            is_active=form_data.get("active"),
+            location=form_data.get("location"),
+            query=self.request.GET.get("q", ""),
+            chunk_size=settings.REPORT_EXPORT_CHUNK_SIZE,
         )
-        df = pd.read_html(table_data)[0]
+
+    def _export_table_data(self, form_data, cache_key=None):
         filename = (
             f"monthly_presence_data_from_"
             f"{form_data['from_date']}_to_{form_data['to_date']}.xlsx"
         )
-        with pd.ExcelWriter(filename, engine="xlsxwriter") as excel_writer:
-            df.to_excel(excel_writer, index=False, sheet_name="Sheet1")
-
-        with open(filename, "rb") as excel_file:
-            response = HttpResponse(
-                excel_file.read(),
-                content_type=(
-                    "application/vnd.openxmlformats-officedocument"
-                    ".spreadsheetml.sheet"
-                ),
-            )
-            response["Content-Disposition"] = f"attachment; filename={filename}"
-            return response
+        content_type = (
+            "application/vnd.openxmlformats-officedocument"
+            ".spreadsheetml.sheet"
+        )
+        content = cache.get(cache_key) if cache_key else None
+        if content is not None:
+            response = HttpResponse(content, content_type=content_type)
+        else:
+            # Rows go straight into the workbook; nothing is written to the CWD,
+            # so concurrent exports of the same range cannot clobber each other
+            buffer = tempfile.SpooledTemporaryFile(max_size=self.EXPORT_SPOOL_MAX_SIZE)
+            write_monthly_presence_xlsx(buffer, self._get_presence_rows(form_data))
+            if cache_key and buffer.tell() <= settings.REPORT_EXPORT_CACHE_MAX_SIZE:
+                buffer.seek(0)
+                cache.set(cache_key, buffer.read(), settings.REPORT_CACHE_TIMEOUT)
+            buffer.seek(0)
+            response = FileResponse(buffer, content_type=content_type)
+        response["Content-Disposition"] = f"attachment; filename={filename}"
+        return response
+
+    # ── CSV export ────────────────────────────────────────────────────────────
+
+    def _export_table_data_csv(self, form_data):
+        filename = (
+            f"monthly_presence_data_from_"
+            f"{form_data['from_date']}_to_{form_data['to_date']}.csv"
+        )
+        writer = csv.writer(_Echo())
+        response = StreamingHttpResponse(
+            (
+                writer.writerow(["" if value is None else value for value in row])
+                for row in self._get_presence_rows(form_data)
+            ),
+            content_type="text/csv",
+        )
+        response["Content-Disposition"] = f"attachment; filename={filename}"
+        return response
 
     # ── PDF export ────────────────────────────────────────────────────────────
 
     def _export_table_data_pdf(self, form_data):
-        # 1. Fetch the HTML table and parse it into a DataFrame
-        table_data = self._get_filtered_table_data(
-            form_data,
-            self.request.GET.get("q", ""),
-        )
-        df = pd.read_html(table_data)[0]
+        # 1. Build the DataFrame from the report rows
+        rows = self._get_presence_rows(form_data)
+        headers = next(rows)
+        df = pd.DataFrame(list(rows), columns=headers)
         df = df.fillna("")  
         # 2. Build PDF entirely in memory — no temp files, no LibreOffice
         pdf_bytes = _build_attendance_pdf(df)
@@ -7,6 +7,14 @@ from django.db import models
 import random
 from ..choices.leave import LeaveAccrualPeriod
 from django.utils.timezone import make_aware
+from ..services import AttendanceCacheService
+from ..utility.attendance_mapper import AttendanceMapper
+from ..services.reference_cache import (
+    get_app_setting,
+    get_attendance_setting,
+    get_leave_type,
+    get_status_color,
+)
 def custom_permission_denied(request, exception=None):
     error_message = (
         str(exception)
@@ -124,6 +132,9 @@ class DashboardView(LoginRequiredMixin, TemplateView):
             employees, from_datetime, to_datetime
         )
         context["employees"] = employees
+        context["attendance_rows"] = AttendanceMapper.build_calendar_rows(
+            context["attendance_data"], employees, context["days_in_month"]
+        )
         context["title"] = self.title
         context["from_datetime"] = from_datetime
         context["to_datetime"] = to_datetime
@@ -193,9 +204,15 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         Fetch and process all attendance data using optimized mapper.
         This replaces the old map_attendance_data call.
         """
-        from ..utility.attendance_mapper import AttendanceMapper
         employee_ids = list(employees.values_list("id", flat=True))
 
+        # Serve the precomputed grid when the whole period is cached
+        cached_data = AttendanceCacheService.get_cached_attendance(
+            employee_ids, from_datetime.date(), to_datetime.date()
+        )
+        if cached_data is not None:
+            return cached_data
+
         # Fetch attendance-related logs
         attendance_logs = at.get_attendance_logs(
             employee_ids, from_datetime, to_datetime
@@ -573,7 +590,7 @@ class ApplyOrUpdateLeaveView(
             self.object.leave_type.id if self.object else self.kwargs.get("leave_type")
         )
 
-        leave_type = LeaveType.objects.filter(id=leave_type_id).first()
+        leave_type = get_leave_type(leave_type_id)
 
         current_period_balance = 0
         selected_period_balance = 0
@@ -1170,7 +1187,7 @@ class EventDetailPageView(ModelPermissionRequiredMixin, UpdateView):
 
     
     def _get_app_setting(self, key, default=None):
-        setting = AppSetting.objects.filter(key=key).first()
+        setting = get_app_setting(key)
         return setting if setting else default
 
     def _get_regularization_limit(self):
@@ -1326,12 +1343,10 @@ class AttendanceLogActionView(ModelPermissionRequiredMixin, View):
     def fetch_static_data(self):
         """Fetch static data used in attendance calculations."""
         return {
-            "half_day_color": AttendanceStatusColor.objects.get(
-                status=settings.HALF_DAY
-            ),
-            "present_color": AttendanceStatusColor.objects.get(status=settings.PRESENT),
-            "absent_color": AttendanceStatusColor.objects.get(status=settings.ABSENT),
-            "asettings": AttendanceSetting.objects.first(),
+            "half_day_color": get_status_color(settings.HALF_DAY),
+            "present_color": get_status_color(settings.PRESENT),
+            "absent_color": get_status_color(settings.ABSENT),
+            "asettings": get_attendance_setting(),
         }
 
     def get_users(self, username):
@@ -1366,14 +1381,15 @@ class AttendanceLogActionView(ModelPermissionRequiredMixin, View):
         reason = form_data["reason"]
         self.update_log_dates(log)
 
-        status_handler = AttendanceStatusHandler(
-            self.get_user_shift(log.applied_by),
+        classifier = AttendanceStatusBatchClassifier(
             static_data["asettings"].full_day_hours,
             static_data["half_day_color"],
             static_data["present_color"],
             static_data["absent_color"],
         )
-        status_data = self.calculate_status_data(log, static_data, status_handler)
+        status_data = self.calculate_status_data(
+            log, self.get_user_shift(log.applied_by), classifier
+        )
         self.update_log_status(log, status_data)
 
         log.regularized = True
@@ -1392,22 +1408,11 @@ class AttendanceLogActionView(ModelPermissionRequiredMixin, View):
             log.end_date = log.to_date
         log.save()
 
-    def calculate_status_data(self, log, static_data, status_handler):
+    def calculate_status_data(self, log, user_shift, classifier):
         """Calculate the attendance status and return necessary data."""
         log_start_date = localtime(log.start_date)
         log_end_date = localtime(log.end_date)
-        total_duration = log_end_date - log_start_date
-        user_expected_logout_time = log_start_date + timedelta(
-            hours=static_data["asettings"].full_day_hours
-        )
-
-        return status_handler.determine_attendance_status(
-            log_start_date,
-            log_end_date,
-            total_duration,
-            user_expected_logout_time.time(),
-            user_expected_logout_time,
-        )
+        return classifier.classify([log_start_date], [log_end_date], [user_shift])[0]
 
     def update_log_status(self, log, status_data):
         """Update the log with the calculated status data."""